@@ -0,0 +1,90 @@
+"""Compares Base64EncodeStream and BatchedBase64EncodeStream wrapped in a JSONStream, as GitHub blob
+uploads are. Reports throughput and the longest the event loop went without running a ticker task,
+which is how long other requests would have been stalled.
+
+    python benchmarks/base64_encode.py --size 64 --chunk 65536
+"""
+import time
+import asyncio
+import argparse
+
+from waterbutler.core import streams
+
+
+class MemoryStream(streams.BaseStream):
+    """Hands out slices of a bytes object, unlike StringStream it doesn't shift a buffer per read"""
+
+    def __init__(self, data):
+        super().__init__()
+        self.data = memoryview(data)
+        self.position = 0
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @asyncio.coroutine
+    def _read(self, n=-1):
+        end = len(self.data) if n < 0 else self.position + n
+        chunk = bytes(self.data[self.position:end])
+        self.position += len(chunk)
+        if self.position >= len(self.data):
+            self.feed_eof()
+        return chunk
+
+
+@asyncio.coroutine
+def ticker(stalls, interval=0.001):
+    last = time.perf_counter()
+    while True:
+        yield from asyncio.sleep(interval)
+        now = time.perf_counter()
+        stalls.append(now - last - interval)
+        last = now
+
+
+@asyncio.coroutine
+def consume(stream, chunk_size):
+    total = 0
+    chunk = yield from stream.read(chunk_size)
+    while chunk:
+        total += len(chunk)
+        chunk = yield from stream.read(chunk_size)
+    return total
+
+
+def run(loop, encoder, data, chunk_size):
+    blob = streams.JSONStream({
+        'encoding': 'base64',
+        'content': encoder(MemoryStream(data)),
+    })
+    expected = blob.size
+
+    stalls = []
+    tick = asyncio.async(ticker(stalls))
+    start = time.perf_counter()
+    total = loop.run_until_complete(consume(blob, chunk_size))
+    elapsed = time.perf_counter() - start
+    tick.cancel()
+
+    return elapsed, max(stalls or [0]), total == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=64, help='payload size in MB')
+    parser.add_argument('--chunk', type=int, default=65536, help='consumer read size in bytes')
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    data = bytes(range(256)) * (args.size * 4096)
+
+    for encoder in (streams.Base64EncodeStream, streams.BatchedBase64EncodeStream):
+        elapsed, stall, exact = run(loop, encoder, data, args.chunk)
+        print('{:<28} {:7.1f} MB/s  longest loop stall {:6.1f}ms  exact size: {}'.format(
+            encoder.__name__, args.size / elapsed, stall * 1000, exact
+        ))
+
+
+if __name__ == '__main__':
+    main()
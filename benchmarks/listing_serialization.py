@@ -0,0 +1,95 @@
+"""Measures how fast a v1 folder listing is serialized, from provider metadata to the response body.
+
+Compares the current path against the previous one, which built a furl for every link, hashed the
+etag on every serialization and encoded the response with tornado's json_encode.
+
+    python benchmarks/listing_serialization.py --entries 10000 --runs 5
+"""
+import time
+import hashlib
+import argparse
+
+import furl
+import tornado.escape
+
+from waterbutler.server import utils
+from waterbutler.server import settings
+from waterbutler.providers.s3.metadata import S3FileMetadata
+from waterbutler.providers.s3.metadata import S3FolderMetadata
+
+
+class LegacyMixin:
+    __slots__ = ()
+
+    def serialized(self):
+        ret = super().serialized()
+        ret['etag'] = hashlib.sha256('{}::{}'.format(self.provider, self.etag).encode('utf-8')).hexdigest()
+        return ret
+
+    def _entity_url(self, resource):
+        url = furl.furl(settings.DOMAIN)
+        segments = ['v1', 'resources', resource, 'providers', self.provider]
+        segments += self.path.split('/')[1:]
+        url.path.segments.extend(segments)
+        return url.url
+
+
+class LegacyFileMetadata(LegacyMixin, S3FileMetadata):
+    __slots__ = ()
+
+
+class LegacyFolderMetadata(LegacyMixin, S3FolderMetadata):
+    __slots__ = ()
+
+
+def make_listing(entries, file_class, folder_class):
+    folders = [
+        folder_class({'Prefix': 'photos/album {:04d}/'.format(x)})
+        for x in range(entries // 10)
+    ]
+    files = [
+        file_class({
+            'Key': 'photos/IMG_{:06d}.jpg'.format(x),
+            'Size': str(x * 1024),
+            'ETag': '"{}"'.format(hashlib.md5(str(x).encode()).hexdigest()),
+            'LastModified': '2015-06-01T12:00:00.000Z',
+        })
+        for x in range(entries - len(folders))
+    ]
+    return folders + files
+
+
+def legacy(listing, resource):
+    return tornado.escape.json_encode({'data': [x.json_api_serialized(resource) for x in listing]})
+
+
+def current(listing, resource):
+    return utils.json_encode({'data': [x.json_api_serialized(resource) for x in listing]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=10000, help='number of entries in the listing')
+    parser.add_argument('--runs', type=int, default=5, help='serializations per variant, the best is kept')
+    args = parser.parse_args()
+
+    for name, serialize, classes in (
+        ('legacy', legacy, (LegacyFileMetadata, LegacyFolderMetadata)),
+        ('current', current, (S3FileMetadata, S3FolderMetadata)),
+    ):
+        best, size = None, 0
+        for _ in range(args.runs):
+            # Fresh metadata every run, as every request gets, so no etag is already cached
+            listing = make_listing(args.entries, *classes)
+            start = time.perf_counter()
+            size = len(serialize(listing, 'n0d3z'))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        print('{:<8} {:9.0f} entries/s  {:7.1f}ms per listing  {:6.1f}KB'.format(
+            name, args.entries / best, best * 1000, size / 1024
+        ))
+
+
+if __name__ == '__main__':
+    main()
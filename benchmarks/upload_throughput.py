@@ -0,0 +1,136 @@
+"""Measures request body throughput from a client through the v1 upload path into a provider.
+
+The provider is a stub that reads and discards the stream, so the numbers reflect WaterButler's own
+overhead: tornado's body handling, the request pipe and RequestStreamReader.
+
+    python benchmarks/upload_throughput.py --size 512 --chunk 65536 --runs 3
+"""
+import time
+import asyncio
+import argparse
+from unittest import mock
+
+import tornado.gen
+import tornado.httpclient
+import tornado.platform.asyncio
+
+from waterbutler.core import provider
+from waterbutler.core import metadata
+from waterbutler.core.path import WaterButlerPath
+from waterbutler.server import settings
+from waterbutler.server.app import make_app
+from waterbutler.server.api.v1.provider import ProviderHandler
+
+
+class StubFileMetadata(metadata.BaseFileMetadata):
+    provider = 'stub'
+    name = 'upload.bin'
+    path = '/upload.bin'
+    size = None
+    modified = None
+    etag = 'stub'
+    content_type = None
+
+    def __init__(self):
+        super().__init__({})
+
+
+class StubProvider(provider.BaseProvider):
+    """Reads uploads in CHUNK_SIZE pieces and throws them away"""
+    NAME = 'stub'
+
+    @asyncio.coroutine
+    def validate_v1_path(self, path, **kwargs):
+        return WaterButlerPath(path)
+
+    @asyncio.coroutine
+    def validate_path(self, path, **kwargs):
+        return WaterButlerPath(path)
+
+    @asyncio.coroutine
+    def upload(self, stream, path, **kwargs):
+        received = 0
+        chunk = yield from stream.read(settings.CHUNK_SIZE)
+        while chunk:
+            received += len(chunk)
+            chunk = yield from stream.read(settings.CHUNK_SIZE)
+        assert received == stream.size, (received, stream.size)
+        return StubFileMetadata(), True
+
+    @asyncio.coroutine
+    def exists(self, path, **kwargs):
+        return False
+
+    def download(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def delete(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def metadata(self, *args, **kwargs):
+        raise NotImplementedError
+
+
+@asyncio.coroutine
+def fake_auth(*args, **kwargs):
+    return {'auth': {}, 'credentials': {}, 'settings': {}, 'callback_url': 'http://localhost'}
+
+
+def body_producer(total, chunk_size):
+    block = b'\0' * chunk_size
+
+    @tornado.gen.coroutine
+    def produce(write):
+        remaining = total
+        while remaining > 0:
+            piece = block if remaining >= chunk_size else block[:remaining]
+            yield write(piece)
+            remaining -= len(piece)
+
+    return produce
+
+
+@tornado.gen.coroutine
+def run(port, total, chunk_size):
+    client = tornado.httpclient.AsyncHTTPClient(max_body_size=total + 1)
+    request = tornado.httpclient.HTTPRequest(
+        'http://127.0.0.1:{}/v1/resources/bench/providers/stub/upload.bin'.format(port),
+        method='PUT',
+        headers={'Content-Length': str(total)},
+        body_producer=body_producer(total, chunk_size),
+        request_timeout=600,
+    )
+    start = time.perf_counter()
+    response = yield client.fetch(request)
+    elapsed = time.perf_counter() - start
+    assert response.code == 201, response.code
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=256, help='upload size in MB')
+    parser.add_argument('--chunk', type=int, default=65536, help='client write size in bytes')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=7778)
+    args = parser.parse_args()
+
+    tornado.platform.asyncio.AsyncIOMainLoop().install()
+    loop = asyncio.get_event_loop()
+
+    stub = StubProvider({}, {}, {})
+    with mock.patch('waterbutler.server.api.v1.provider.auth_handler.get', fake_auth), \
+            mock.patch('waterbutler.core.utils.make_provider', return_value=stub), \
+            mock.patch.object(ProviderHandler, '_send_hook'):
+        make_app(debug=False).listen(args.port, address='127.0.0.1', max_body_size=args.size * 1024 ** 2 + 1)
+
+        total = args.size * 1024 ** 2
+        for i in range(args.runs):
+            elapsed = loop.run_until_complete(
+                tornado.platform.asyncio.to_asyncio_future(run(args.port, total, args.chunk))
+            )
+            print('run {}: {} MB in {:.2f}s, {:.1f} MB/s'.format(i + 1, args.size, elapsed, args.size / elapsed))
+
+
+if __name__ == '__main__':
+    main()
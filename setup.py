@@ -39,6 +39,9 @@ setup(
         'waterbutler.auth': [
             'osf = waterbutler.auth.osf:OsfAuthHandler',
         ],
+        'waterbutler.cache': [
+            'memory = waterbutler.core.cache:MemoryCache',
+        ],
         'waterbutler.providers': [
             'cloudfiles = waterbutler.providers.cloudfiles:CloudFilesProvider',
             'dropbox = waterbutler.providers.dropbox:DropboxProvider',
@@ -40,13 +40,17 @@ def test(verbose=False):
 
 
 @task
-def celery(loglevel='INFO', hostname='%h'):
+def celery(loglevel='INFO', hostname='%h', queues=None, concurrency=None):
     from waterbutler.tasks.app import app
     command = ['worker']
     if loglevel:
         command.extend(['--loglevel', loglevel])
     if hostname:
         command.extend(['--hostname', hostname])
+    if queues:
+        command.extend(['--queues', queues])
+    if concurrency:
+        command.extend(['--concurrency', str(concurrency)])
     app.worker_main(command)
 
 
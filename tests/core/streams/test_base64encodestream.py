@@ -52,3 +52,85 @@ class TestBase64Stream:
 
         assert len(expected) == int(stream.size)
 
+
+class TrickleStream(streams.StringStream):
+    """Never returns more than 2 bytes per read"""
+
+    def _read(self, n=-1):
+        return (yield from super()._read(2 if n < 0 else min(n, 2)))
+
+
+class TestBatchedBase64Stream:
+
+    @async
+    def test_doesnt_crash_with_none(self):
+        stream = streams.BatchedBase64EncodeStream(streams.StringStream(b''))
+        data = yield from stream.read()
+
+        assert data == b''
+        assert stream.at_eof()
+
+    @async
+    def test_read(self):
+        data = b'this is a test'
+        expected = base64.b64encode(data)
+        stream = streams.BatchedBase64EncodeStream(streams.StringStream(data))
+
+        actual = yield from stream.read()
+
+        assert expected == actual
+
+    @async
+    def test_chunking(self):
+        data = b'the ode to carp'
+        expected = base64.b64encode(data)
+
+        for batch_size in range(3, 12):
+            for chunk_size in range(1, 10):
+                stream = streams.BatchedBase64EncodeStream(streams.StringStream(data), batch_size=batch_size)
+
+                actual = b''
+                while not stream.at_eof():
+                    chunk = yield from stream.read(chunk_size)
+                    assert len(chunk) <= chunk_size
+                    actual += chunk
+
+                assert actual == expected
+
+    @async
+    def test_short_reads_carry_over(self):
+        data = b'the ode to carp, the ode to carp'
+        expected = base64.b64encode(data)
+        stream = streams.BatchedBase64EncodeStream(TrickleStream(data), batch_size=9)
+
+        actual = yield from stream.read()
+
+        assert actual == expected
+
+    @async
+    def test_large_batches(self):
+        data = bytes(range(256)) * 4096
+        stream = streams.BatchedBase64EncodeStream(streams.StringStream(data), batch_size=300000)
+
+        actual = yield from stream.read()
+
+        assert actual == base64.b64encode(data)
+
+    def test_size(self):
+        for length in range(0, 20):
+            data = b'x' * length
+            stream = streams.BatchedBase64EncodeStream(streams.StringStream(data))
+
+            assert stream.size == len(base64.b64encode(data))
+            assert isinstance(stream.size, int)
+
+    def test_size_unknown(self):
+        source = streams.StringStream(b'data')
+        source._size = None
+
+        assert streams.BatchedBase64EncodeStream(source).size is None
+
+    def test_batch_size_aligned(self):
+        stream = streams.BatchedBase64EncodeStream(streams.StringStream(b''), batch_size=10)
+
+        assert stream.batch_size == 9
@@ -0,0 +1,78 @@
+import pytest
+
+import asyncio
+
+from tests.utils import async
+
+from waterbutler.core import streams
+
+
+class TestBufferedPipe:
+
+    @async
+    def test_read(self):
+        pipe = streams.BufferedPipe()
+        pipe.write(b'freddie ')
+        pipe.write(b'brian')
+        pipe.write_eof()
+
+        assert (yield from pipe.read()) == b'freddie brian'
+        assert pipe.at_eof()
+
+    @async
+    def test_readexactly(self):
+        pipe = streams.BufferedPipe()
+        pipe.write(b'freddie brian')
+        pipe.write_eof()
+
+        assert (yield from pipe.readexactly(7)) == b'freddie'
+        with pytest.raises(asyncio.IncompleteReadError) as exc:
+            yield from pipe.readexactly(10)
+
+        assert exc.value.partial == b' brian'
+
+    @async
+    def test_drain_below_high_water(self):
+        pipe = streams.BufferedPipe(high_water=10)
+        pipe.write(b'0123456789')
+
+        yield from asyncio.wait_for(pipe.drain(), 1)
+
+    @async
+    def test_drain_blocks_until_low_water(self):
+        pipe = streams.BufferedPipe(high_water=10, low_water=4)
+        pipe.write(b'0123456789abcdef')
+
+        drain = asyncio.async(pipe.drain())
+        yield from asyncio.sleep(0)
+        assert not drain.done()
+
+        yield from pipe.read(8)
+        yield from asyncio.sleep(0)
+        assert not drain.done()
+
+        yield from pipe.readexactly(4)
+        yield from asyncio.sleep(0)
+        assert drain.done()
+        assert pipe.buffered == 4
+
+    @async
+    def test_close_releases_producer(self):
+        pipe = streams.BufferedPipe(high_water=4)
+        pipe.write(b'0123456789')
+
+        drain = asyncio.async(pipe.drain())
+        yield from asyncio.sleep(0)
+        assert not drain.done()
+
+        pipe.close()
+        yield from asyncio.sleep(0)
+        assert drain.done()
+
+        pipe.write(b'discarded')
+        assert pipe.buffered == 0
+        yield from asyncio.wait_for(pipe.drain(), 1)
+
+    def test_default_low_water(self):
+        pipe = streams.BufferedPipe(high_water=100)
+        assert pipe.low_water == 25
@@ -0,0 +1,47 @@
+import socket
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import streams
+from waterbutler.core import exceptions
+
+
+@pytest.fixture
+def file_stream(tmpdir):
+    path = tmpdir.join('freddie')
+    path.write_binary(b'Under pressure')
+    return streams.FileStreamReader(open(str(path), 'rb'))
+
+
+@pytest.fixture
+def sockets(request):
+    sock, peer = socket.socketpair()
+    sock.setblocking(False)
+    request.addfinalizer(sock.close)
+    request.addfinalizer(peer.close)
+    return sock, peer
+
+
+class TestFileStreamReader:
+
+    @async
+    def test_sendfile(self, file_stream, sockets):
+        sock, peer = sockets
+
+        assert (yield from file_stream.sendfile(sock, offset=6)) == 8
+        assert peer.recv(100) == b'pressure'
+
+    @async
+    def test_sendfile_short_file(self, file_stream, sockets):
+        with pytest.raises(exceptions.DownloadError):
+            yield from file_stream.sendfile(sockets[0], count=100)
+
+    @async
+    def test_sendfile_disconnected(self, file_stream, sockets):
+        sock, peer = sockets
+        peer.close()
+
+        with pytest.raises(ConnectionError):
+            yield from file_stream.sendfile(sock)
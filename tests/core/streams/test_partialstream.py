@@ -0,0 +1,48 @@
+from tests.utils import async
+
+from waterbutler.core import streams
+
+
+class TestPartialStreamReader:
+
+    @async
+    def test_reads_range(self):
+        stream = streams.PartialStreamReader(streams.StringStream(b'0123456789'), 2, 5, 10)
+
+        assert (yield from stream.read()) == b'2345'
+        assert stream.at_eof()
+
+    @async
+    def test_reads_in_chunks(self):
+        stream = streams.PartialStreamReader(streams.StringStream(b'0123456789'), 1, 8, 10)
+
+        chunks = []
+        chunk = yield from stream.read(3)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from stream.read(3)
+
+        assert chunks == [b'123', b'456', b'78']
+
+    @async
+    def test_reads_through_end(self):
+        stream = streams.PartialStreamReader(streams.StringStream(b'0123456789'), 7, 9, 10)
+
+        assert (yield from stream.read()) == b'789'
+
+    @async
+    def test_short_source(self):
+        stream = streams.PartialStreamReader(streams.StringStream(b'01234'), 3, 9, 10)
+
+        assert (yield from stream.read()) == b'34'
+        assert stream.at_eof()
+
+    def test_reports_range(self):
+        source = streams.StringStream(b'0123456789')
+        source.content_type = 'text/plain'
+        stream = streams.PartialStreamReader(source, 2, 5, 10)
+
+        assert stream.partial is True
+        assert stream.size == 4
+        assert stream.content_range == 'bytes 2-5/10'
+        assert stream.content_type == 'text/plain'
@@ -0,0 +1,18 @@
+from unittest import mock
+
+from tornado import httputil
+
+from waterbutler.core import streams
+
+
+class TestRequestStreamReader:
+
+    def test_size(self):
+        request = mock.Mock(headers=httputil.HTTPHeaders({'Content-Length': '1337'}))
+
+        assert streams.RequestStreamReader(request, mock.Mock()).size == 1337
+
+    def test_size_chunked(self):
+        request = mock.Mock(headers=httputil.HTTPHeaders({'Transfer-Encoding': 'chunked'}))
+
+        assert streams.RequestStreamReader(request, mock.Mock()).size is None
@@ -0,0 +1,134 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import streams
+from waterbutler.core import exceptions
+
+
+DATA = bytes(range(256)) * 40
+
+
+class RangeFetcher:
+
+    def __init__(self, data, partial=True, delay=0):
+        self.data = data
+        self.delay = delay
+        self.partial = partial
+        self.ranges = []
+        self.responses = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @asyncio.coroutine
+    def __call__(self, range=None):
+        self.ranges.append(range)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        yield from asyncio.sleep(self.delay)
+        self.in_flight -= 1
+
+        if not self.partial:
+            return streams.StringStream(self.data)
+
+        start, end = range
+        stream = streams.StringStream(self.data[start:end + 1])
+        stream.partial = True
+        stream.response = mock.Mock()
+        self.responses.append(stream.response)
+        return stream
+
+
+class TestSegmentedStreamReader:
+
+    @async
+    def test_reads_in_order(self):
+        fetch = RangeFetcher(DATA)
+        stream = streams.SegmentedStreamReader(fetch, len(DATA), segment_size=1000, concurrency=3)
+
+        assert (yield from stream.read()) == DATA
+        assert stream.at_eof()
+        assert fetch.ranges[0] == (0, 999)
+        assert fetch.ranges[-1] == (10000, 10239)
+        assert len(fetch.ranges) == 11
+
+    @async
+    def test_reads_in_chunks(self):
+        fetch = RangeFetcher(DATA)
+        stream = streams.SegmentedStreamReader(fetch, len(DATA), segment_size=1000, concurrency=3)
+
+        data = b''
+        chunk = yield from stream.read(333)
+        while chunk:
+            assert len(chunk) <= 333
+            data += chunk
+            chunk = yield from stream.read(333)
+
+        assert data == DATA
+
+    @async
+    def test_bounds_concurrency(self):
+        fetch = RangeFetcher(DATA)
+        stream = streams.SegmentedStreamReader(fetch, len(DATA), segment_size=100, concurrency=4)
+
+        yield from stream.read()
+
+        assert fetch.max_in_flight <= 4
+        assert len(stream._pending) == 0
+
+    @async
+    def test_rejects_full_responses(self):
+        stream = streams.SegmentedStreamReader(RangeFetcher(DATA, partial=False), len(DATA), segment_size=1000)
+
+        with pytest.raises(exceptions.DownloadError):
+            yield from stream.read()
+
+    @async
+    def test_rejects_short_segments(self):
+        stream = streams.SegmentedStreamReader(RangeFetcher(DATA[:1500]), len(DATA), segment_size=1000, concurrency=1)
+
+        assert len((yield from stream.read(1000))) == 1000
+
+        with pytest.raises(exceptions.DownloadError):
+            yield from stream.read(1000)
+
+    @async
+    def test_closes_short_responses(self):
+        fetch = RangeFetcher(DATA[:1500])
+        stream = streams.SegmentedStreamReader(fetch, len(DATA), segment_size=1000, concurrency=1)
+
+        yield from stream.read(1000)
+
+        with pytest.raises(exceptions.DownloadError):
+            yield from stream.read(1000)
+
+        assert fetch.responses[0].close.called is False
+        assert fetch.responses[1].close.called is True
+
+    @async
+    def test_holds_at_most_concurrency_segments(self):
+        fetch = RangeFetcher(DATA)
+        stream = streams.SegmentedStreamReader(fetch, len(DATA), segment_size=1000, concurrency=3)
+
+        chunk = yield from stream.read(500)
+        while chunk:
+            assert len(stream._pending) + bool(stream._segment) <= 3
+            chunk = yield from stream.read(500)
+
+    @async
+    def test_cancel(self):
+        fetch = RangeFetcher(DATA, delay=0.01)
+        stream = streams.SegmentedStreamReader(fetch, len(DATA), segment_size=1000, concurrency=3)
+
+        # The fourth segment is requested once the first has been read
+        yield from stream.read(1000)
+        yield from stream.read(10)
+        in_flight = stream._pending[-1]
+        stream.cancel()
+        yield from asyncio.sleep(0)
+
+        assert len(stream._pending) == 0
+        assert in_flight.cancelled()
@@ -0,0 +1,94 @@
+import pytest
+
+from tests.utils import async
+
+from waterbutler.core import streams
+
+
+class TestSpooledStream:
+
+    @async
+    def test_read(self):
+        data = b'freddie brian john roger'
+        stream = streams.SpooledStream(streams.StringStream(data))
+
+        assert (yield from stream.read()) == data
+        assert stream.at_eof()
+
+    @async
+    def test_chunked_read(self):
+        data = b'freddie brian john roger'
+        stream = streams.SpooledStream(streams.StringStream(data))
+
+        chunks = []
+        chunk = yield from stream.read(5)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from stream.read(5)
+
+        assert b''.join(chunks) == data
+        assert all(len(x) <= 5 for x in chunks)
+
+    @async
+    def test_size_known_after_spool(self):
+        data = b'freddie brian john roger'
+        source = streams.StringStream(data)
+        source._size = None
+        stream = streams.SpooledStream(source)
+
+        assert stream.size is None
+        yield from stream.spool()
+        assert stream.size == len(data)
+
+    @async
+    def test_small_stays_in_memory(self):
+        stream = streams.SpooledStream(streams.StringStream(b'tiny'), max_memory=10)
+        yield from stream.spool()
+
+        assert stream.in_memory is True
+
+    @async
+    def test_large_rolls_to_disk(self, tmpdir):
+        data = b'x' * 100
+        stream = streams.SpooledStream(streams.StringStream(data), max_memory=10, spool_dir=str(tmpdir))
+        yield from stream.spool()
+
+        assert stream.in_memory is False
+        assert stream.size == 100
+        assert (yield from stream.read()) == data
+
+    @async
+    def test_rewind(self):
+        data = b'freddie brian john roger'
+        stream = streams.SpooledStream(streams.StringStream(data))
+
+        assert (yield from stream.read()) == data
+        assert (yield from stream.read()) == b''
+
+        stream.rewind()
+
+        assert not stream.at_eof()
+        assert (yield from stream.read()) == data
+
+    @async
+    def test_rewind_from_disk(self, tmpdir):
+        data = b'0123456789' * 10
+        stream = streams.SpooledStream(streams.StringStream(data), max_memory=10, spool_dir=str(tmpdir))
+
+        assert (yield from stream.read(40)) == data[:40]
+        stream.rewind()
+        assert (yield from stream.read()) == data
+
+    def test_rewind_requires_spool(self):
+        stream = streams.SpooledStream(streams.StringStream(b'data'))
+
+        with pytest.raises(AssertionError):
+            stream.rewind()
+
+    @async
+    def test_close_removes_spool_file(self, tmpdir):
+        stream = streams.SpooledStream(streams.StringStream(b'x' * 100), max_memory=10, spool_dir=str(tmpdir))
+        yield from stream.spool()
+        stream.close()
+
+        assert tmpdir.listdir() == []
@@ -0,0 +1,109 @@
+import pytest
+
+import asyncio
+import hashlib
+
+from tests.utils import async
+
+from waterbutler.core import streams
+from waterbutler.core import settings
+
+
+@asyncio.coroutine
+def consume(stream, chunk_size=-1, delay=0):
+    data = b''
+    while not stream.at_eof():
+        chunk = yield from stream.read(chunk_size)
+        yield from asyncio.sleep(delay)
+        data += chunk
+    return data
+
+
+class TestTeeStream:
+
+    @async
+    def test_every_branch_gets_everything(self):
+        source = streams.StringStream(b'freddie brian roger john' * 10000)
+        tee = streams.TeeStream(source, high_water=1024)
+
+        results = yield from tee.run(consume, consume, consume)
+
+        assert results == [b'freddie brian roger john' * 10000] * 3
+
+    @async
+    def test_source_is_read_once(self):
+        source = streams.StringStream(b'freddie brian')
+        writer = streams.HashStreamWriter(hashlib.md5)
+        source.add_writer('md5', writer)
+
+        yield from streams.TeeStream(source).run(consume, consume)
+
+        assert writer.hexdigest == hashlib.md5(b'freddie brian').hexdigest()
+
+    def test_branch_metadata(self):
+        source = streams.StringStream(b'freddie brian')
+        branch = streams.TeeStream(source).branch()
+
+        assert branch.size == 13
+        assert branch.name is None
+        assert branch.content_type == 'application/octet-stream'
+
+    @async
+    def test_slowest_branch_sets_pace(self):
+        data = b'x' * settings.CHUNK_SIZE * 8
+        source = streams.StringStream(data)
+        hasher = streams.HashStreamWriter(hashlib.md5)
+        source.add_writer('md5', hasher)
+        tee = streams.TeeStream(source, high_water=1024)
+        fast, slow = tee.branch(), tee.branch()
+
+        pump = asyncio.async(tee.pump())
+        fast_task = asyncio.async(consume(fast))
+        yield from asyncio.sleep(0.01)
+
+        # Nothing past the first chunk is read until the slow branch catches up
+        assert not fast_task.done()
+        assert source.at_eof() is False
+        assert slow.pipe.buffered == settings.CHUNK_SIZE
+
+        slow_data = yield from consume(slow)
+        yield from pump
+
+        assert slow_data == data
+        assert (yield from fast_task) == data
+        assert hasher.hexdigest == hashlib.md5(data).hexdigest()
+
+    @async
+    def test_closed_branch_is_skipped(self):
+        source = streams.StringStream(b'freddie brian' * 10000)
+        tee = streams.TeeStream(source, high_water=1024)
+        gone, kept = tee.branch(), tee.branch()
+        gone.close()
+
+        data, _ = yield from asyncio.gather(consume(kept), tee.pump())
+
+        assert data == b'freddie brian' * 10000
+
+    @async
+    def test_consumer_failure(self):
+        source = streams.StringStream(b'freddie brian' * 10000)
+
+        @asyncio.coroutine
+        def fail(stream):
+            yield from stream.read(10)
+            raise ValueError('Nope')
+
+        with pytest.raises(ValueError):
+            yield from asyncio.wait_for(streams.TeeStream(source, high_water=1024).run(consume, fail), 1)
+
+    @async
+    def test_source_failure(self):
+        class Broken(streams.StringStream):
+            @asyncio.coroutine
+            def _read(self, n=-1):
+                raise OSError('Gone')
+
+        tee = streams.TeeStream(Broken(b'freddie brian'))
+
+        with pytest.raises(OSError):
+            yield from asyncio.wait_for(tee.run(consume, consume), 1)
@@ -1,3 +1,5 @@
+import pytest
+
 import io
 import os
 import tempfile
@@ -118,4 +120,96 @@ class TestZipStreamReader:
         assert zip.testzip() is None
 
         for file in files:
-            assert zip.open(file['filename']).read() == file['contents']
\ No newline at end of file
+            assert zip.open(file['filename']).read() == file['contents']
+
+class TestSizedZipStreamReader:
+
+    @async
+    def test_single_file(self):
+        file = ('filename.extension', streams.StringStream('[File Content]'))
+
+        stream = streams.SizedZipStreamReader(file)
+        size = stream.size
+
+        data = yield from stream.read()
+
+        assert len(data) == size
+
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        # Verify CRCs
+        assert zip.testzip() is None
+        assert zip.open('filename.extension').read() == b'[File Content]'
+
+    @async
+    def test_empty_file(self):
+        stream = streams.SizedZipStreamReader(('empty.txt', streams.StringStream('')))
+        size = stream.size
+
+        data = yield from stream.read()
+
+        assert len(data) == size
+        assert zipfile.ZipFile(io.BytesIO(data)).read('empty.txt') == b''
+
+    @async
+    def test_multiple_large_files_chunked(self):
+        contents = [os.urandom(2**17 + index) for index in range(3)]
+        stream = streams.SizedZipStreamReader(*(
+            ('file{}.ext'.format(index), streams.StringStream(content))
+            for index, content in enumerate(contents)
+        ))
+        size = stream.size
+
+        data = b''
+        chunk = yield from stream.read(1000)
+        while chunk:
+            data += chunk
+            chunk = yield from stream.read(1000)
+
+        assert len(data) == size
+
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert zip.testzip() is None
+        for index, content in enumerate(contents):
+            assert zip.read('file{}.ext'.format(index)) == content
+
+    @async
+    def test_zip64(self, monkeypatch):
+        # Rather than stream gigabytes, lower the point past which zip64 fields are used
+        monkeypatch.setattr(zipfile, 'ZIP64_LIMIT', 1000)
+        contents = [os.urandom(2000), b'small']
+        stream = streams.SizedZipStreamReader(*(
+            ('file{}.ext'.format(index), streams.StringStream(content))
+            for index, content in enumerate(contents)
+        ))
+        size = stream.size
+
+        data = yield from stream.read()
+
+        assert len(data) == size
+        assert zipfile.stringEndArchive64 in data
+
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert zip.testzip() is None
+        assert zip.getinfo('file1.ext').header_offset > 1000
+        for index, content in enumerate(contents):
+            assert zip.read('file{}.ext'.format(index)) == content
+
+    def test_requires_size(self):
+        file_stream = streams.StringStream('[File Content]')
+        file_stream._size = None
+
+        with pytest.raises(ValueError):
+            streams.SizedZipStreamReader(('filename.extension', file_stream))
+
+    @async
+    def test_short_stream(self):
+        file_stream = streams.StringStream('[File Content]')
+        file_stream._size = 100
+
+        stream = streams.SizedZipStreamReader(('filename.extension', file_stream))
+
+        with pytest.raises(ValueError):
+            yield from stream.read()
@@ -0,0 +1,173 @@
+import pytest
+
+from tests import utils
+from tests.utils import async
+
+from waterbutler.core import cache
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
+
+
+@pytest.fixture
+def provider():
+    provider = utils.MockProvider(settings={'bucket': 'freddie'})
+    provider.metadata.return_value = ['metadata']
+    provider.validate_v1_path.return_value = WaterButlerPath('/folder/')
+    return provider
+
+
+@pytest.fixture
+def metadata_cache():
+    return cache.MetadataCache(cache.MemoryCache(max_entries=100), ttl=60, ttls={})
+
+
+class TestMemoryCache:
+
+    @async
+    def test_get_set_delete(self):
+        backend = cache.MemoryCache(max_entries=10)
+
+        assert (yield from backend.get('brian')) is None
+
+        yield from backend.set('brian', 'may')
+        assert (yield from backend.get('brian')) == 'may'
+
+        yield from backend.delete('brian', 'roger')
+        assert (yield from backend.get('brian')) is None
+
+    @async
+    def test_expires(self, monkeypatch):
+        backend = cache.MemoryCache(max_entries=10)
+        monkeypatch.setattr(cache.time, 'monotonic', lambda: 100)
+
+        yield from backend.set('brian', 'may', ttl=10)
+        assert (yield from backend.get('brian')) == 'may'
+
+        monkeypatch.setattr(cache.time, 'monotonic', lambda: 110)
+        assert (yield from backend.get('brian')) is None
+        assert len(backend) == 0
+
+    @async
+    def test_evicts_least_recently_used(self):
+        backend = cache.MemoryCache(max_entries=2)
+
+        yield from backend.set('freddie', 1)
+        yield from backend.set('brian', 2)
+        yield from backend.get('freddie')
+        yield from backend.set('roger', 3)
+
+        assert len(backend) == 2
+        assert (yield from backend.get('brian')) is None
+        assert (yield from backend.get('freddie')) == 1
+        assert (yield from backend.get('roger')) == 3
+
+
+class TestMetadataCache:
+
+    @async
+    def test_metadata_cached(self, provider, metadata_cache):
+        path = WaterButlerPath('/folder/')
+
+        assert (yield from metadata_cache.metadata(provider, path)) == ['metadata']
+        assert (yield from metadata_cache.metadata(provider, path)) == ['metadata']
+
+        provider.metadata.assert_called_once_with(path, revision=None)
+
+    @async
+    def test_revisions_cached_apart(self, provider, metadata_cache):
+        path = WaterButlerPath('/file.txt')
+
+        yield from metadata_cache.metadata(provider, path)
+        yield from metadata_cache.metadata(provider, path, revision='abc')
+
+        assert provider.metadata.call_count == 2
+
+    @async
+    def test_validate_v1_path_cached(self, provider, metadata_cache):
+        assert (yield from metadata_cache.validate_v1_path(provider, '/folder/')) == WaterButlerPath('/folder/')
+        yield from metadata_cache.validate_v1_path(provider, '/folder/')
+
+        provider.validate_v1_path.assert_called_once_with('/folder/')
+
+    @async
+    def test_scoped_to_credentials(self, provider, metadata_cache):
+        other = utils.MockProvider(settings={'bucket': 'freddie'}, creds={'token': 'other'})
+        path = WaterButlerPath('/folder/')
+
+        yield from metadata_cache.metadata(provider, path)
+        yield from metadata_cache.metadata(other, path)
+
+        assert provider.metadata.called
+        assert other.metadata.called
+
+    @async
+    def test_failures_not_cached(self, provider, metadata_cache):
+        path = WaterButlerPath('/file.txt')
+        provider.metadata.side_effect = exceptions.NotFoundError('/file.txt')
+
+        for _ in range(2):
+            with pytest.raises(exceptions.NotFoundError):
+                yield from metadata_cache.metadata(provider, path)
+
+        assert provider.metadata.call_count == 2
+
+    @async
+    def test_disabled_by_ttl(self, provider, metadata_cache):
+        metadata_cache.ttls = {provider.NAME: 0}
+        path = WaterButlerPath('/folder/')
+
+        yield from metadata_cache.metadata(provider, path)
+        yield from metadata_cache.metadata(provider, path)
+
+        assert provider.metadata.call_count == 2
+        assert len(metadata_cache.backend) == 0
+
+    @async
+    def test_invalidate(self, provider, metadata_cache):
+        paths = [WaterButlerPath('/folder/'), WaterButlerPath('/folder/sub/file.txt'), WaterButlerPath('/other.txt')]
+
+        for path in paths:
+            yield from metadata_cache.metadata(provider, path)
+        yield from metadata_cache.metadata(provider, paths[1], revision='abc')
+        yield from metadata_cache.validate_v1_path(provider, '/folder/')
+
+        yield from metadata_cache.invalidate(provider)
+
+        for path in paths:
+            yield from metadata_cache.metadata(provider, path)
+        yield from metadata_cache.metadata(provider, paths[1], revision='abc')
+        yield from metadata_cache.validate_v1_path(provider, '/folder/')
+
+        # Revisions and path to id mappings are dropped along with everything else
+        assert provider.metadata.call_count == 8
+        assert provider.validate_v1_path.call_count == 2
+
+    @async
+    def test_invalidate_scoped(self, provider, metadata_cache):
+        other = utils.MockProvider(settings={'bucket': 'brian'})
+        path = WaterButlerPath('/folder/')
+
+        yield from metadata_cache.metadata(provider, path)
+        yield from metadata_cache.invalidate(other)
+        yield from metadata_cache.metadata(provider, path)
+
+        assert provider.metadata.call_count == 1
+
+    @async
+    def test_returns_copies(self, provider, metadata_cache):
+        first = yield from metadata_cache.validate_v1_path(provider, '/folder/')
+        first.rename('renamed')
+
+        second = yield from metadata_cache.validate_v1_path(provider, '/folder/')
+        assert second == WaterButlerPath('/folder/')
+        assert second is not first
+
+    @async
+    def test_evicted_generation_orphans_entries(self, provider, metadata_cache):
+        path = WaterButlerPath('/folder/')
+        yield from metadata_cache.metadata(provider, path)
+
+        yield from metadata_cache.backend.delete(metadata_cache._generation_key(provider))
+        yield from metadata_cache.metadata(provider, path)
+
+        assert provider.metadata.call_count == 2
@@ -93,6 +93,31 @@ class TestBaseMetadata:
             'size': 1337,
         }
 
+    def test_etag_hashed_once(self):
+        file_metadata = utils.MockFileMetadata()
+        etag = hashlib.sha256('{}::{}'.format('mock', 'etag').encode('utf-8')).hexdigest()
+
+        with mock.patch('hashlib.sha256', wraps=hashlib.sha256) as sha256:
+            assert file_metadata.serialized()['etag'] == etag
+            assert file_metadata.json_api_serialized('n0d3z')['attributes']['etag'] == etag
+
+        assert sha256.call_count == 1
+
+    def test_entity_url_quoting(self, monkeypatch):
+        monkeypatch.setattr(metadata.settings, 'DOMAIN', 'https://files.example.com/wb')
+        file_metadata = utils.MockFileMetadata()
+
+        for path, quoted in (
+            ('/Foo.name', '/Foo.name'),
+            ('/dir/with space?&#.txt', '/dir/with%20space%3F&%23.txt'),
+            ('/ünïcode/', '/%C3%BCn%C3%AFcode/'),
+            ('/already%20quoted', '/already%20quoted'),
+        ):
+            with mock.patch.object(utils.MockFileMetadata, 'path', path):
+                assert file_metadata._entity_url('n0d3z') == (
+                    'https://files.example.com/wb/v1/resources/n0d3z/providers/mock' + quoted
+                )
+
     def test_file_revision_json_api_serialize(self):
         file_revision_metadata = utils.MockFileRevisionMetadata()
         serialized = file_revision_metadata.json_api_serialized()
@@ -3,6 +3,8 @@ import pytest
 from tests import utils
 from unittest import mock
 from tests.utils import async
+from waterbutler.core import streams
+from waterbutler.core import settings
 from waterbutler.core import metadata
 from waterbutler.core import exceptions
 
@@ -333,6 +335,55 @@ class TestCopy:
         provider1.download.assert_called_once_with(src_path)
         provider1.upload.assert_called_once_with('Download return', dest_path)
 
+    @async
+    def test_copy_segments_large_ranged_downloads(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'SEGMENTED_DOWNLOAD_THRESHOLD', 1000)
+        src_path = yield from provider1.validate_path('/source/path')
+        dest_path = yield from provider1.validate_path('/destination/path')
+
+        provider1.can_download_ranges = mock.Mock(return_value=True)
+        provider1.metadata = utils.MockCoroutine(return_value=utils.MockFileMetadata())
+        provider1.upload = utils.MockCoroutine(return_value='Upload return')
+
+        ret = yield from provider1.copy(provider1, src_path, dest_path)
+
+        assert ret == 'Upload return'
+        stream = provider1.upload.call_args[0][0]
+        assert isinstance(stream, streams.SegmentedStreamReader)
+        assert stream.size == 1337
+
+    @async
+    def test_copy_cancels_segments_when_upload_fails(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'SEGMENTED_DOWNLOAD_THRESHOLD', 1000)
+        src_path = yield from provider1.validate_path('/source/path')
+        dest_path = yield from provider1.validate_path('/destination/path')
+
+        provider1.can_download_ranges = mock.Mock(return_value=True)
+        provider1.metadata = utils.MockCoroutine(return_value=utils.MockFileMetadata())
+        provider1.upload = utils.MockCoroutine(side_effect=exceptions.UploadError('Boom'))
+
+        with mock.patch.object(streams.SegmentedStreamReader, 'cancel') as cancel:
+            with pytest.raises(exceptions.UploadError):
+                yield from provider1.copy(provider1, src_path, dest_path)
+
+        cancel.assert_called_once_with()
+
+    @async
+    def test_copy_does_not_segment_small_files(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'SEGMENTED_DOWNLOAD_THRESHOLD', 2000)
+        src_path = yield from provider1.validate_path('/source/path')
+        dest_path = yield from provider1.validate_path('/destination/path')
+
+        provider1.can_download_ranges = mock.Mock(return_value=True)
+        provider1.metadata = utils.MockCoroutine(return_value=utils.MockFileMetadata())
+        provider1.upload = utils.MockCoroutine(return_value='Upload return')
+        provider1.download = utils.MockCoroutine(return_value='Download return')
+
+        yield from provider1.copy(provider1, src_path, dest_path)
+
+        provider1.download.assert_called_once_with(src_path)
+        provider1.upload.assert_called_once_with('Download return', dest_path)
+
 
 class TestMove:
     @async
@@ -482,3 +533,61 @@ class TestMove:
         assert 'bytes=10-' == provider1._build_range_header((10, None))
         assert 'bytes=10-100' == provider1._build_range_header((10, 100))
         assert 'bytes=-255' == provider1._build_range_header((None, 255))
+
+    def test_resolve_range(self, provider1):
+        assert provider1._resolve_range((0, None), 10) == (0, 9)
+        assert provider1._resolve_range((2, 5), 10) == (2, 5)
+        assert provider1._resolve_range((2, 100), 10) == (2, 9)
+        assert provider1._resolve_range((None, 3), 10) == (7, 9)
+        assert provider1._resolve_range((None, 100), 10) == (0, 9)
+
+    def test_resolve_range_not_satisfiable(self, provider1):
+        for range in ((10, None), (5, 4), (None, 0)):
+            with pytest.raises(exceptions.DownloadError) as e:
+                provider1._resolve_range(range, 10)
+
+            assert e.value.code == 416
+
+    @async
+    def test_apply_range(self, provider1):
+        stream = provider1.apply_range(streams.StringStream(b'0123456789'), (None, 3))
+
+        assert stream.partial is True
+        assert stream.size == 3
+        assert stream.content_range == 'bytes 7-9/10'
+        assert (yield from stream.read()) == b'789'
+
+    def test_apply_range_leaves_partial_streams(self, provider1):
+        stream = mock.Mock(partial=True, size=4)
+
+        assert provider1.apply_range(stream, (2, 5)) is stream
+
+
+class TestMetadataPage:
+
+    @async
+    def test_pages_through_listing(self, provider1):
+        provider1.metadata = utils.MockCoroutine(return_value=list(range(5)))
+
+        children, cursor = yield from provider1.metadata_page('somepath', size=2)
+        assert (children, cursor) == ([0, 1], '2')
+
+        children, cursor = yield from provider1.metadata_page('somepath', cursor=cursor, size=2)
+        assert (children, cursor) == ([2, 3], '4')
+
+        children, cursor = yield from provider1.metadata_page('somepath', cursor=cursor, size=2)
+        assert (children, cursor) == ([4], None)
+
+    @async
+    def test_no_size(self, provider1):
+        provider1.metadata = utils.MockCoroutine(return_value=list(range(5)))
+
+        assert (yield from provider1.metadata_page('somepath', cursor='1')) == ([1, 2, 3, 4], None)
+
+    @async
+    def test_invalid_cursor(self, provider1):
+        provider1.metadata = utils.MockCoroutine(return_value=list(range(5)))
+
+        for cursor in ('nope', '-1'):
+            with pytest.raises(exceptions.InvalidParameters):
+                yield from provider1.metadata_page('somepath', cursor=cursor, size=2)
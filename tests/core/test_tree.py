@@ -0,0 +1,111 @@
+import pytest
+
+import asyncio
+from unittest import mock
+
+from tests import utils
+from tests.utils import async
+
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
+
+
+TREE = {
+    '/': ['a/', 'b/', 'top.txt'],
+    '/a/': ['a/deep/', 'a/one.txt'],
+    '/a/deep/': ['a/deep/two.txt'],
+    '/b/': [],
+}
+
+
+def entry(name):
+    kind = 'folder' if name.endswith('/') else 'file'
+    item = mock.Mock(path='/' + name, kind=kind, is_folder=kind == 'folder')
+    # name is taken by Mock itself
+    item.name = name.rstrip('/').split('/')[-1]
+    return item
+
+
+class TreeProvider(utils.MockProvider1):
+
+    def __init__(self, tree, delay=0):
+        super().__init__({}, {}, {})
+        self.tree = tree
+        self.delay = delay
+        self.listing = 0
+        self.most_listing = 0
+
+    @asyncio.coroutine
+    def metadata(self, path, **kwargs):
+        self.listing += 1
+        self.most_listing = max(self.listing, self.most_listing)
+        yield from asyncio.sleep(self.delay)
+        self.listing -= 1
+
+        if str(path) not in self.tree:
+            raise exceptions.MetadataError('Not found', code=404)
+        return [entry(name) for name in self.tree[str(path)]]
+
+
+@asyncio.coroutine
+def drain(walker):
+    paths = []
+    item = yield from walker.next()
+    while item is not None:
+        paths.append(item.path)
+        item = yield from walker.next()
+    return paths
+
+
+class TestTreeWalker:
+
+    @async
+    def test_lists_every_descendant(self):
+        provider = TreeProvider(TREE)
+
+        paths = yield from drain(provider.walk(WaterButlerPath('/')))
+
+        assert sorted(paths) == ['/a/', '/a/deep/', '/a/deep/two.txt', '/a/one.txt', '/b/', '/top.txt']
+
+    @async
+    def test_max_depth(self):
+        provider = TreeProvider(TREE)
+
+        paths = yield from drain(provider.walk(WaterButlerPath('/'), max_depth=2))
+
+        assert sorted(paths) == ['/a/', '/a/deep/', '/a/one.txt', '/b/', '/top.txt']
+
+    @async
+    def test_bounded_concurrency(self):
+        tree = {'/': ['{}/'.format(x) for x in range(10)]}
+        tree.update({'/{}/'.format(x): [] for x in range(10)})
+        provider = TreeProvider(tree, delay=0.01)
+        walker = provider.walk(WaterButlerPath('/'))
+        walker.concurrency = 3
+
+        paths = yield from drain(walker)
+
+        assert len(paths) == 10
+        assert provider.most_listing == 3
+
+    @async
+    def test_raises_listing_errors(self):
+        provider = TreeProvider({'/': ['a/', 'top.txt']})
+        walker = provider.walk(WaterButlerPath('/'))
+
+        with pytest.raises(exceptions.MetadataError):
+            yield from drain(walker)
+
+        assert (yield from walker.next()) is None
+
+    @async
+    def test_close(self):
+        provider = TreeProvider(TREE)
+        walker = provider.walk(WaterButlerPath('/'))
+
+        assert (yield from walker.next()) is not None
+        walker.close()
+        yield from asyncio.sleep(0)
+
+        assert walker._walker.cancelled()
+        assert (yield from walker.next()) is None
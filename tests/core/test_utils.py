@@ -4,8 +4,10 @@ from unittest import mock
 import pytest
 
 from tests.utils import async
+from tests.utils import MockCoroutine
 
 from waterbutler.core import utils
+from waterbutler.core import exceptions
 
 
 class TestAsyncRetry:
@@ -92,3 +94,40 @@ class TestAsyncRetry:
         yield from asyncio.sleep(.1)
 
         assert mock_func.call_count == 18
+
+
+class TestRetry:
+
+    @async
+    def test_retries_until(self):
+        func = MockCoroutine(side_effect=[exceptions.UploadError('Foo'), 'Bar'])
+
+        assert (yield from utils.retry(func, 'Part 1', backoff=0)) == 'Bar'
+        assert [call[0] for call in func.call_args_list] == [(0, ), (1, )]
+
+    @async
+    def test_gives_up(self):
+        func = MockCoroutine(side_effect=exceptions.UploadError('Foo'))
+
+        with pytest.raises(exceptions.UploadError):
+            yield from utils.retry(func, 'Part 1', retries=2, backoff=0)
+
+        assert func.call_count == 3
+
+    @async
+    def test_retry_on(self):
+        func = MockCoroutine(side_effect=[exceptions.UploadError('Foo', code=404), 'Bar'])
+
+        with pytest.raises(exceptions.UploadError):
+            yield from utils.retry(func, 'Part 1', retry_on=utils.is_transient, backoff=0)
+
+        assert func.call_count == 1
+
+    @async
+    def test_other_errors_raised(self):
+        func = MockCoroutine(side_effect=[KeyError('Foo'), 'Bar'])
+
+        with pytest.raises(KeyError):
+            yield from utils.retry(func, 'Part 1', backoff=0)
+
+        assert func.call_count == 1
@@ -9,9 +9,11 @@ import aiohttpretty
 
 from waterbutler.core import streams
 from waterbutler.core import exceptions
+from waterbutler.core import settings as core_settings
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.box import BoxProvider
+from waterbutler.providers.box import settings as box_settings
 from waterbutler.providers.box.metadata import BoxRevision
 from waterbutler.providers.box.metadata import BoxFileMetadata
 from waterbutler.providers.box.metadata import BoxFolderMetadata
@@ -394,6 +396,59 @@ class TestUpload:
         assert created is False
         assert aiohttpretty.has_call(method='POST', uri=upload_url)
 
+    def upload_session(self):
+        return {
+            'id': 'session',
+            'part_size': 16,
+            'total_parts': 3,
+            'session_endpoints': {
+                'upload_part': 'https://upload.box.com/api/2.0/files/upload_sessions/session',
+                'commit': 'https://upload.box.com/api/2.0/files/upload_sessions/session/commit',
+                'abort': 'https://upload.box.com/api/2.0/files/upload_sessions/session',
+            },
+        }
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_chunked(self, provider, file_metadata, file_stream, monkeypatch):
+        monkeypatch.setattr(box_settings, 'CHUNKED_UPLOAD_THRESHOLD', 10)
+        path = WaterButlerPath('/newfile', _ids=(provider.folder, None))
+        session = self.upload_session()
+
+        session_url = provider._build_upload_url('files', 'upload_sessions')
+        aiohttpretty.register_json_uri('POST', session_url, status=201, body=session)
+        aiohttpretty.register_json_uri('PUT', session['session_endpoints']['upload_part'], body={
+            'part': {'part_id': 'BFDF5379', 'offset': 0, 'size': 16, 'sha1': '134b65991ed521fcfe4724b7d814ab8ded5185dc'},
+        })
+        aiohttpretty.register_json_uri('POST', session['session_endpoints']['commit'], status=201, body=file_metadata)
+
+        metadata, created = yield from provider.upload(file_stream, path)
+
+        assert created is True
+        assert metadata.serialized() == BoxFileMetadata(file_metadata['entries'][0], path).serialized()
+        assert aiohttpretty.has_call(method='POST', uri=session_url)
+        assert aiohttpretty.has_call(method='PUT', uri=session['session_endpoints']['upload_part'])
+        assert aiohttpretty.has_call(method='POST', uri=session['session_endpoints']['commit'])
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_chunked_aborts(self, provider, file_stream, monkeypatch):
+        monkeypatch.setattr(box_settings, 'CHUNKED_UPLOAD_THRESHOLD', 10)
+        monkeypatch.setattr(core_settings, 'RETRIES', 0)
+        path = WaterButlerPath('/newfile', _ids=(provider.folder, 'file'))
+        session = self.upload_session()
+
+        session_url = provider._build_upload_url('files', 'file', 'upload_sessions')
+        aiohttpretty.register_json_uri('POST', session_url, status=201, body=session)
+        aiohttpretty.register_uri('PUT', session['session_endpoints']['upload_part'], status=416)
+        aiohttpretty.register_uri('DELETE', session['session_endpoints']['abort'], status=204)
+
+        with pytest.raises(exceptions.UploadError):
+            yield from provider.upload(file_stream, path)
+
+        assert aiohttpretty.has_call(method='DELETE', uri=session['session_endpoints']['abort'])
+        assert not aiohttpretty.has_call(method='POST', uri=session['session_endpoints']['commit'])
+
 
 class TestDelete:
 
@@ -467,6 +522,38 @@ class TestMetadata:
 
         assert result == expected
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_metadata_page(self, provider, folder_list_metadata):
+        path = WaterButlerPath('/', _ids=(provider.folder, ))
+        count = len(folder_list_metadata['entries'])
+
+        list_url = provider.build_url('folders', provider.folder, 'items', fields='id,name,size,modified_at,etag',
+                                      offset=10, limit=count)
+
+        aiohttpretty.register_json_uri('GET', list_url, body=folder_list_metadata)
+
+        result, cursor = yield from provider.metadata_page(path, cursor='10', size=count)
+
+        assert [x.name for x in result] == [x['name'] for x in folder_list_metadata['entries']]
+        assert cursor == str(10 + count)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_metadata_page_last(self, provider, folder_list_metadata):
+        path = WaterButlerPath('/', _ids=(provider.folder, ))
+        folder_list_metadata['total_count'] = 10 + len(folder_list_metadata['entries'])
+
+        list_url = provider.build_url('folders', provider.folder, 'items', fields='id,name,size,modified_at,etag',
+                                      offset=10, limit=50)
+
+        aiohttpretty.register_json_uri('GET', list_url, body=folder_list_metadata)
+
+        result, cursor = yield from provider.metadata_page(path, cursor='10', size=50)
+
+        assert len(result) == len(folder_list_metadata['entries'])
+        assert cursor is None
+
     # @async
     # @pytest.mark.aiohttpretty
     # def test_metadata_not_child(self, provider, folder_object_metadata):
@@ -14,11 +14,14 @@ import aiohttp.multidict
 import aiohttpretty
 
 from waterbutler.core import streams
+from waterbutler.core import settings as core_settings
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
+from waterbutler.core.provider import build_url
 
 from waterbutler.providers.cloudfiles import settings
 from waterbutler.providers.cloudfiles import CloudFilesProvider
+from waterbutler.providers.cloudfiles import settings as cloud_settings
 
 
 @pytest.fixture
@@ -396,16 +399,162 @@ class TestCRUD:
         assert aiohttpretty.has_call(method='PUT', uri=url)
         assert aiohttpretty.has_call(method='HEAD', uri=metadata_url)
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_segmented(self, connected_provider, file_stream, file_metadata, monkeypatch):
+        monkeypatch.setattr(cloud_settings, 'SEGMENTED_UPLOAD_THRESHOLD', 4)
+        monkeypatch.setattr(cloud_settings, 'SEGMENT_SIZE', 4)
+        monkeypatch.setattr('uuid.uuid4', lambda: mock.Mock(hex='upload'))
+        path = WaterButlerPath('/foo.bar')
+
+        container_url = build_url(connected_provider.endpoint, connected_provider.segment_container)
+        first_url = connected_provider._build_segment_url('foo.bar/upload/00000000')
+        second_url = connected_provider._build_segment_url('foo.bar/upload/00000001')
+        manifest_url = connected_provider.build_url(path.path, **{'multipart-manifest': 'put'})
+        metadata_url = connected_provider.build_url(path.path)
+
+        aiohttpretty.register_uri('HEAD', metadata_url, responses=[{'status': 404}, {'headers': file_metadata}])
+        aiohttpretty.register_uri('PUT', container_url, status=201)
+        aiohttpretty.register_uri('PUT', first_url, status=201, headers={'ETag': hashlib.md5(b'slee').hexdigest()})
+        aiohttpretty.register_uri('PUT', second_url, status=201, headers={'ETag': hashlib.md5(b'py').hexdigest()})
+        aiohttpretty.register_uri('PUT', manifest_url, status=201)
+
+        metadata, created = yield from connected_provider.upload(file_stream, path)
+
+        assert created is True
+        assert metadata.kind == 'file'
+        assert aiohttpretty.has_call(method='PUT', uri=first_url)
+        assert aiohttpretty.has_call(method='PUT', uri=second_url)
+        assert aiohttpretty.has_call(method='PUT', uri=manifest_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_segmented_cleans_up(self, connected_provider, file_stream, monkeypatch):
+        monkeypatch.setattr(cloud_settings, 'SEGMENTED_UPLOAD_THRESHOLD', 4)
+        monkeypatch.setattr(cloud_settings, 'SEGMENT_SIZE', 4)
+        monkeypatch.setattr(core_settings, 'RETRIES', 0)
+        monkeypatch.setattr('uuid.uuid4', lambda: mock.Mock(hex='upload'))
+        path = WaterButlerPath('/foo.bar')
+        connected_provider._segment_container_exists = True
+
+        first_url = connected_provider._build_segment_url('foo.bar/upload/00000000')
+        second_url = connected_provider._build_segment_url('foo.bar/upload/00000001')
+        list_url = build_url(
+            connected_provider.endpoint,
+            connected_provider.segment_container,
+            prefix='foo.bar/upload/',
+            format='json',
+        )
+        bulk_delete_url = build_url(connected_provider.endpoint, **{'bulk-delete': ''})
+
+        aiohttpretty.register_uri('HEAD', connected_provider.build_url(path.path), status=404)
+        aiohttpretty.register_uri('PUT', first_url, status=201, headers={'ETag': hashlib.md5(b'slee').hexdigest()})
+        aiohttpretty.register_uri('PUT', second_url, status=503)
+        aiohttpretty.register_json_uri('GET', list_url, body=[{'name': 'foo.bar/upload/00000000'}])
+        aiohttpretty.register_uri('DELETE', bulk_delete_url, status=200)
+
+        with pytest.raises(exceptions.UploadError):
+            yield from connected_provider.upload(file_stream, path, check_created=False)
+
+        assert aiohttpretty.has_call(method='DELETE', uri=bulk_delete_url)
+        # Nothing is looked up when the caller knows the path is free
+        assert not aiohttpretty.has_call(method='HEAD', uri=connected_provider.build_url(path.path))
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_segmented_from_file(self, connected_provider, file_content, tmpdir, monkeypatch):
+        monkeypatch.setattr(cloud_settings, 'SEGMENTED_UPLOAD_THRESHOLD', 4)
+        monkeypatch.setattr(cloud_settings, 'SEGMENT_SIZE', 4)
+        monkeypatch.setattr('uuid.uuid4', lambda: mock.Mock(hex='upload'))
+        path = WaterButlerPath('/foo.bar')
+        connected_provider._segment_container_exists = True
+        local = tmpdir.join('sleepy')
+        local.write_binary(file_content)
+
+        first_url = connected_provider._build_segment_url('foo.bar/upload/00000000')
+        second_url = connected_provider._build_segment_url('foo.bar/upload/00000001')
+        manifest_url = connected_provider.build_url(path.path, **{'multipart-manifest': 'put'})
+
+        aiohttpretty.register_uri('PUT', first_url, status=201, headers={'ETag': hashlib.md5(b'slee').hexdigest()})
+        aiohttpretty.register_uri('PUT', second_url, status=201, headers={'ETag': hashlib.md5(b'py').hexdigest()})
+        aiohttpretty.register_uri('PUT', manifest_url, status=201)
+
+        with open(str(local), 'rb') as file_pointer:
+            stream = streams.FileStreamReader(file_pointer)
+            # Sliced from the file, never spooled
+            monkeypatch.setattr(streams, 'SpooledStream', None)
+            yield from connected_provider.upload(stream, path, check_created=False, fetch_metadata=False)
+
+        assert aiohttpretty.has_call(method='PUT', uri=first_url)
+        assert aiohttpretty.has_call(method='PUT', uri=second_url)
+        assert aiohttpretty.has_call(method='PUT', uri=manifest_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_replaces_large_object(self, connected_provider, file_content, file_stream, file_metadata):
+        path = WaterButlerPath('/foo.bar')
+        metadata_url = connected_provider.build_url(path.path)
+        manifest_url = connected_provider.build_url(path.path, **{'multipart-manifest': 'get'})
+        bulk_delete_url = build_url(connected_provider.endpoint, **{'bulk-delete': ''})
+        large_object = aiohttp.multidict.CIMultiDict(file_metadata)
+        large_object['X-Static-Large-Object'] = 'True'
+
+        aiohttpretty.register_uri('HEAD', metadata_url, responses=[{'headers': large_object}, {'headers': file_metadata}])
+        aiohttpretty.register_json_uri('GET', manifest_url, body=[
+            {'name': '/container_segments/foo.bar/old/00000000'},
+            {'name': '/container_segments/foo.bar/old/00000001'},
+        ])
+        aiohttpretty.register_uri(
+            'PUT',
+            connected_provider.sign_url(path, 'PUT'),
+            status=200,
+            headers={'ETag': '"{}"'.format(hashlib.md5(file_content).hexdigest())},
+        )
+        aiohttpretty.register_uri('DELETE', bulk_delete_url, status=200)
+
+        metadata, created = yield from connected_provider.upload(file_stream, path)
+
+        assert created is False
+        assert aiohttpretty.has_call(method='DELETE', uri=bulk_delete_url)
+
     @async
     @pytest.mark.aiohttpretty
     def test_delete(self, connected_provider):
         path = WaterButlerPath('/delete.file')
-        url = connected_provider.build_url(path.path)
+        url = connected_provider.build_url(path.path, **{'multipart-manifest': 'delete'})
         aiohttpretty.register_uri('DELETE', url, status=204)
         yield from connected_provider.delete(path)
 
         assert aiohttpretty.has_call(method='DELETE', uri=url)
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_delete_folder(self, connected_provider, monkeypatch):
+        monkeypatch.setattr(cloud_settings, 'SEGMENT_SIZE', 4)
+        path = WaterButlerPath('/folder/')
+        items = [
+            {'name': 'folder/', 'bytes': 0},
+            {'name': 'folder/large.bin', 'bytes': 5},
+            {'name': 'folder/sub/small file.txt', 'bytes': 4},
+        ]
+
+        aiohttpretty.register_json_uri('GET', connected_provider.build_url('', prefix='folder/'), body=items)
+        aiohttpretty.register_json_uri(
+            'GET',
+            connected_provider.build_url('', prefix='folder/', marker='folder/sub/small file.txt'),
+            body=[],
+        )
+        bulk_delete_url = build_url(connected_provider.endpoint, **{'bulk-delete': ''})
+        large_url = connected_provider.build_url('folder/large.bin', **{'multipart-manifest': 'delete'})
+        aiohttpretty.register_uri('DELETE', bulk_delete_url, status=200)
+        aiohttpretty.register_uri('DELETE', large_url, status=200)
+
+        yield from connected_provider.delete(path)
+
+        # Objects that may be large are deleted on their own, so that they take their segments with them
+        assert aiohttpretty.has_call(method='DELETE', uri=bulk_delete_url)
+        assert aiohttpretty.has_call(method='DELETE', uri=large_url)
+
 
 class TestMetadata:
 
@@ -444,6 +593,19 @@ class TestMetadata:
         assert result[3].path == '/level1_empty/'
         assert result[3].kind == 'folder'
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_metadata_page(self, connected_provider, folder_root):
+        path = WaterButlerPath('/')
+        body = json.dumps(folder_root[:3]).encode('utf-8')
+        url = connected_provider.build_url('', prefix=path.path, delimiter='/', limit=3, marker='level0')
+        aiohttpretty.register_uri('GET', url, status=200, body=body)
+
+        result, cursor = yield from connected_provider.metadata_page(path, cursor='level0', size=3)
+
+        assert [item.name for item in result] == ['level1', 'similar']
+        assert cursor == 'similar'
+
     @async
     @pytest.mark.aiohttpretty
     def test_metadata_folder_root_level1(self, connected_provider, folder_root_level1):
@@ -551,3 +713,23 @@ class TestOperations:
 
     def test_can_intra_move(self, connected_provider):
         assert connected_provider.can_intra_move(connected_provider)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_intra_move_copies_manifest(self, connected_provider, file_metadata):
+        source_path = WaterButlerPath('/source')
+        dest_path = WaterButlerPath('/dest')
+
+        dest_url = connected_provider.build_url(dest_path.path)
+        copy_url = connected_provider.build_url(dest_path.path, **{'multipart-manifest': 'get'})
+        source_url = connected_provider.build_url(source_path.path)
+
+        aiohttpretty.register_uri('HEAD', dest_url, responses=[{'status': 404}, {'headers': file_metadata}])
+        aiohttpretty.register_uri('PUT', copy_url, status=201)
+        aiohttpretty.register_uri('DELETE', source_url, status=204)
+
+        metadata, created = yield from connected_provider.intra_move(connected_provider, source_path, dest_path)
+
+        assert created is True
+        assert aiohttpretty.has_call(method='PUT', uri=copy_url)
+        assert aiohttpretty.has_call(method='DELETE', uri=source_url)
@@ -3,6 +3,7 @@ import pytest
 from tests.utils import async
 
 import io
+import json
 from http import client
 
 import aiohttpretty
@@ -10,9 +11,11 @@ import aiohttpretty
 from waterbutler.core import streams
 from waterbutler.core import metadata
 from waterbutler.core import exceptions
+from waterbutler.core import settings as core_settings
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.dropbox import DropboxProvider
+from waterbutler.providers.dropbox import settings as dropbox_settings
 from waterbutler.providers.dropbox.metadata import DropboxFileMetadata
 
 
@@ -226,6 +229,51 @@ class TestCRUD:
         assert metadata == expected
         assert aiohttpretty.has_call(method='PUT', uri=url)
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_chunked(self, provider, file_metadata, monkeypatch):
+        monkeypatch.setattr(dropbox_settings, 'CHUNKED_UPLOAD_THRESHOLD', 10)
+        monkeypatch.setattr(dropbox_settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 8)
+        monkeypatch.setattr(core_settings, 'RETRY_BACKOFF', 0)
+        path = yield from provider.validate_path('/phile')
+        stream = streams.StringStream(b'0123456789abcdef')
+
+        metadata_url = provider.build_url('metadata', 'auto', path.full_path)
+        first_url = provider._build_content_url('chunked_upload', offset=0)
+        second_url = provider._build_content_url('chunked_upload', offset=8, upload_id='up')
+        commit_url = provider._build_content_url('commit_chunked_upload', 'auto', path.full_path)
+
+        aiohttpretty.register_uri('GET', metadata_url, status=404)
+        aiohttpretty.register_json_uri('PUT', first_url, body={'upload_id': 'up', 'offset': 8})
+        aiohttpretty.register_uri('PUT', second_url, responses=[
+            {'status': 503},
+            {'status': 200, 'body': json.dumps({'upload_id': 'up', 'offset': 16}).encode('utf-8')},
+        ])
+        aiohttpretty.register_json_uri('POST', commit_url, body=file_metadata)
+
+        metadata, created = yield from provider.upload(stream, path)
+
+        assert created is True
+        assert metadata == DropboxFileMetadata(file_metadata, provider.folder)
+        assert aiohttpretty.has_call(method='PUT', uri=first_url)
+        assert aiohttpretty.has_call(method='PUT', uri=second_url)
+        assert aiohttpretty.has_call(method='POST', uri=commit_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_chunk_resumes_from_dropbox_offset(self, provider, monkeypatch):
+        monkeypatch.setattr(core_settings, 'RETRY_BACKOFF', 0)
+        first_url = provider._build_content_url('chunked_upload', offset=8, upload_id='up')
+        resume_url = provider._build_content_url('chunked_upload', offset=12, upload_id='up')
+
+        aiohttpretty.register_json_uri('PUT', first_url, status=400, body={'upload_id': 'up', 'offset': 12})
+        aiohttpretty.register_json_uri('PUT', resume_url, body={'upload_id': 'up', 'offset': 16})
+
+        upload_id, offset = yield from provider._upload_chunk('up', b'89abcdef', 8)
+
+        assert (upload_id, offset) == ('up', 16)
+        assert aiohttpretty.has_call(method='PUT', uri=resume_url)
+
     @async
     @pytest.mark.aiohttpretty
     def test_delete_file(self, provider, file_metadata):
@@ -1,10 +1,13 @@
 import pytest
 
 from tests.utils import async
+from tests.utils import MockCoroutine
 
 import io
 import os
+import time
 import shutil
+import asyncio
 from http import client
 
 from waterbutler.core import streams
@@ -12,6 +15,7 @@ from waterbutler.core import metadata
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 
+from waterbutler.providers.filesystem import settings as fs_settings
 from waterbutler.providers.filesystem import FileSystemProvider
 from waterbutler.providers.filesystem.metadata import FileSystemFileMetadata
 
@@ -96,6 +100,60 @@ class TestCRUD:
 
         assert content == b'I am a file'
 
+    @async
+    def test_download_range(self, provider):
+        path = yield from provider.validate_path('/flower.jpg')
+
+        result = yield from provider.download(path, range=(2, 5))
+        content = yield from result.read()
+
+        assert content == b'am a'
+        assert result.partial is True
+        assert result.size == 4
+        assert result.content_range == 'bytes 2-5/11'
+
+    @async
+    def test_download_range_open_ended(self, provider):
+        path = yield from provider.validate_path('/flower.jpg')
+
+        result = yield from provider.download(path, range=(5, None))
+        content = yield from result.read()
+
+        assert content == b'a file'
+        assert result.content_range == 'bytes 5-10/11'
+
+    @async
+    def test_download_range_suffix(self, provider):
+        path = yield from provider.validate_path('/flower.jpg')
+
+        result = yield from provider.download(path, range=(None, 4))
+        content = yield from result.read()
+
+        assert content == b'file'
+        assert result.content_range == 'bytes 7-10/11'
+
+    @async
+    def test_download_range_chunked(self, provider):
+        path = yield from provider.validate_path('/flower.jpg')
+
+        result = yield from provider.download(path, range=(2, 8))
+        chunks = []
+        chunk = yield from result.read(3)
+        while chunk:
+            chunks.append(chunk)
+            chunk = yield from result.read(3)
+
+        assert chunks == [b'am ', b'a f', b'i']
+
+    @async
+    def test_download_range_not_satisfiable(self, provider):
+        path = yield from provider.validate_path('/flower.jpg')
+
+        with pytest.raises(exceptions.DownloadError) as exc:
+            yield from provider.download(path, range=(20, None))
+
+        assert exc.value.code == 416
+
     @async
     def test_download_not_found(self, provider):
         path = yield from provider.validate_path('/missing.txt')
@@ -167,6 +225,55 @@ class TestCRUD:
         assert metadata.size == len(file_content)
         assert created is False
 
+    @async
+    def test_upload_leaves_no_temp_files(self, provider):
+        file_stream = streams.StringStream(b'Test Upload Content')
+
+        path = yield from provider.validate_path('/upload.txt')
+        yield from provider.upload(file_stream, path)
+
+        assert sorted(os.listdir(provider.folder)) == ['flower.jpg', 'subfolder', 'upload.txt']
+
+    @async
+    def test_upload_failure_keeps_original(self, provider):
+        file_stream = streams.StringStream(b'Doomed')
+        file_stream.read = MockCoroutine(side_effect=[b'Doomed', Exception('Connection reset')])
+
+        path = yield from provider.validate_path('/flower.jpg')
+        with pytest.raises(Exception):
+            yield from provider.upload(file_stream, path)
+
+        assert sorted(os.listdir(provider.folder)) == ['flower.jpg', 'subfolder']
+        with open(os.path.join(provider.folder, 'flower.jpg'), 'rb') as fp:
+            assert fp.read() == b'I am a file'
+
+    @async
+    def test_upload_failure_waits_for_write(self, provider, monkeypatch):
+        file_stream = streams.StringStream(b'Doomed')
+        file_stream.read = MockCoroutine(side_effect=[b'Doomed', Exception('Connection reset')])
+        loop = asyncio.get_event_loop()
+        run_in_executor, written = loop.run_in_executor, []
+
+        def slow_write(data, write):
+            time.sleep(0.05)
+            written.append(write.__self__.closed)
+            return write(data)
+
+        def fake_run_in_executor(executor, func, *args):
+            if getattr(func, '__name__', None) == 'write':
+                return run_in_executor(executor, slow_write, *args, func)
+            return run_in_executor(executor, func, *args)
+
+        monkeypatch.setattr(loop, 'run_in_executor', fake_run_in_executor)
+
+        path = yield from provider.validate_path('/flower.jpg')
+        with pytest.raises(Exception):
+            yield from provider.upload(file_stream, path)
+
+        # The write finished on an open file before it was closed and removed
+        assert written == [False]
+        assert sorted(os.listdir(provider.folder)) == ['flower.jpg', 'subfolder']
+
     @async
     def test_delete_file(self, provider):
         path = yield from provider.validate_path('/flower.jpg')
@@ -194,6 +301,25 @@ class TestMetadata:
         assert folder.name == 'subfolder'
         assert folder.path == '/subfolder/'
 
+    @async
+    def test_metadata_skips_pending_uploads(self, provider):
+        with open(os.path.join(provider.folder, fs_settings.TEMP_PREFIX + 'abc'), 'wb') as fp:
+            fp.write(b'partial')
+
+        path = yield from provider.validate_path('/')
+        result = yield from provider.metadata(path)
+
+        assert sorted(x.name for x in result) == ['flower.jpg', 'subfolder']
+
+    @async
+    def test_metadata_file_size(self, provider):
+        path = yield from provider.validate_path('/subfolder/')
+        result = yield from provider.metadata(path)
+
+        assert len(result) == 1
+        assert result[0].name == 'nested.txt'
+        assert result[0].size == len(b'Here is my content')
+
     @async
     def test_metadata_root_file(self, provider):
         path = yield from provider.validate_path('/flower.jpg')
@@ -211,6 +337,13 @@ class TestMetadata:
         with pytest.raises(exceptions.MetadataError):
             yield from provider.metadata(path)
 
+    @async
+    def test_metadata_folder_missing(self, provider):
+        path = yield from provider.validate_path('/missing/')
+
+        with pytest.raises(exceptions.MetadataError):
+            yield from provider.metadata(path)
+
 
 class TestOperations:
 
@@ -1,14 +1,18 @@
 import pytest
 
 from tests.utils import async
+from tests.utils import MockCoroutine
 
 import io
+import json
 from http import client
+from unittest import mock
 
 import aiohttpretty
 
 from waterbutler.core import streams
 from waterbutler.core import exceptions
+from waterbutler.core import settings as core_settings
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.googledrive import settings as ds
@@ -313,6 +317,93 @@ class TestCRUD:
         expected = GoogleDriveFileMetadata(item, path)
         assert result == expected
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_chunked(self, provider, monkeypatch):
+        monkeypatch.setattr(ds, 'UPLOAD_CHUNK_SIZE', 256 * 1024)
+        upload_id = '7'
+        item = fixtures.list_file['items'][0]
+        path = WaterButlerPath('/birdie.jpg', _ids=(provider.folder['id'], None))
+        stream = streams.StringStream(b'a' * 600 * 1024)
+
+        start_upload_url = provider._build_upload_url('files', uploadType='resumable')
+        finish_upload_url = provider._build_upload_url('files', uploadType='resumable', upload_id=upload_id)
+
+        aiohttpretty.register_uri('POST', start_upload_url, headers={'LOCATION': 'http://waterbutler.io?upload_id={}'.format(upload_id)})
+        aiohttpretty.register_uri('PUT', finish_upload_url, responses=[
+            {'status': 308, 'headers': {'RANGE': 'bytes=0-262143'}},
+            {'status': 308, 'headers': {'RANGE': 'bytes=0-524287'}},
+            {'status': 200, 'body': json.dumps(item).encode('utf-8')},
+        ])
+
+        result, created = yield from provider.upload(stream, path)
+
+        assert created is True
+        assert result == GoogleDriveFileMetadata(item, path)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_resumes_chunk(self, provider, monkeypatch):
+        monkeypatch.setattr(ds, 'UPLOAD_CHUNK_SIZE', 256 * 1024)
+        monkeypatch.setattr(core_settings, 'RETRY_BACKOFF', 0)
+        item = fixtures.list_file['items'][0]
+        url = provider._build_upload_url('files', uploadType='resumable', upload_id='7')
+
+        aiohttpretty.register_uri('PUT', url, responses=[
+            {'status': 503},
+            # Drive reports having committed the first 100000 bytes
+            {'status': 308, 'headers': {'RANGE': 'bytes=0-99999'}},
+            {'status': 308, 'headers': {'RANGE': 'bytes=0-262143'}},
+            {'status': 200, 'body': json.dumps(item).encode('utf-8')},
+        ])
+
+        data = yield from provider._finish_resumable_upload((), streams.StringStream(b'a' * 300 * 1024), '7')
+
+        assert data == item
+
+    @async
+    def test_upload_unknown_size(self, provider, monkeypatch):
+        monkeypatch.setattr(ds, 'UPLOAD_CHUNK_SIZE', 256 * 1024)
+        item = fixtures.list_file['items'][0]
+        stream = streams.StringStream(b'a' * 512 * 1024)
+        stream._size = None
+
+        responses = [
+            mock.Mock(status=308, headers={'RANGE': 'bytes=0-262143'}, release=MockCoroutine()),
+            mock.Mock(status=308, headers={'RANGE': 'bytes=0-524287'}, release=MockCoroutine()),
+            mock.Mock(status=200, json=MockCoroutine(return_value=item)),
+        ]
+        provider.make_request = MockCoroutine(side_effect=responses)
+
+        data = yield from provider._finish_resumable_upload((), stream, '7')
+
+        assert data == item
+        # The total is only known, and sent, once the stream has ended
+        assert [call[1]['headers']['Content-Range'] for call in provider.make_request.call_args_list] == [
+            'bytes 0-262143/*',
+            'bytes 262144-524287/*',
+            'bytes */524288',
+        ]
+        # Resume Incomplete responses are released back to the pool
+        assert responses[0].release.called
+        assert responses[1].release.called
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_chunk_not_retried_on_client_error(self, provider, monkeypatch):
+        monkeypatch.setattr(core_settings, 'RETRY_BACKOFF', 0)
+        url = provider._build_upload_url('files', uploadType='resumable', upload_id='7')
+
+        aiohttpretty.register_uri('PUT', url, responses=[
+            {'status': 404},
+            {'status': 200, 'body': b'{}'},
+        ])
+
+        with pytest.raises(exceptions.UploadError) as e:
+            yield from provider._finish_resumable_upload((), streams.StringStream(b'data'), '7')
+
+        assert e.value.code == 404
+
     @async
     @pytest.mark.aiohttpretty
     def test_delete(self, provider):
@@ -466,6 +557,28 @@ class TestMetadata:
         assert result == [expected]
         assert aiohttpretty.has_call(method='GET', uri=url)
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_metadata_page(self, provider):
+        path = GoogleDrivePath(
+            '/hugo/kim/pins/',
+            _ids=[str(x) for x in range(4)]
+        )
+
+        body = fixtures.generate_list(3)
+        body['nextPageToken'] = 'page3'
+        item = body['items'][0]
+
+        query = provider._build_query(path.identifier)
+        url = provider.build_url('files', q=query, alt='json', maxResults=1, pageToken='page2')
+
+        aiohttpretty.register_json_uri('GET', url, body=body)
+
+        result, cursor = yield from provider.metadata_page(path, cursor='page2', size=1)
+
+        assert result == [GoogleDriveFileMetadata(item, path.child(item['title']))]
+        assert cursor == 'page3'
+
 
 class TestRevisions:
 
@@ -1,6 +1,8 @@
 import os
 import io
+import json
 import asyncio
+import hashlib
 from http import client
 from unittest import mock
 
@@ -345,9 +347,11 @@ class TestUploads:
         assert res.extra['checkout'] is None
         assert path.identifier_path == res.path
 
-        inner_provider.delete.assert_called_once_with(WaterButlerPath('/uniquepath'))
         inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
-        inner_provider.upload.assert_called_once_with(file_stream, WaterButlerPath('/uniquepath'), check_created=False, fetch_metadata=False)
+        # The blob is already stored, nothing is sent upstream
+        assert inner_provider.upload.called is False
+        assert inner_provider.move.called is False
+        assert inner_provider.delete.called is False
 
     @async
     @pytest.mark.aiohttpretty
@@ -358,7 +362,7 @@ class TestUploads:
         path = WaterButlerPath('/foopath', _ids=('Test', 'OtherTest'))
         url = 'https://waterbutler.io/{}/children/'.format(path.parent.identifier)
 
-        inner_provider.move.return_value = (utils.MockFileMetadata(), True)
+        inner_provider.upload.return_value = (utils.MockFileMetadata(), None)
         inner_provider.metadata.side_effect = exceptions.MetadataError('Boom!', code=404)
 
         aiohttpretty.register_json_uri('POST', url, status=200, body={'data': {'downloads': 10, 'version': 8, 'path': '/24601', 'checkout': 'hmoco', 'md5': '1234', 'sha256': '2345'}})
@@ -373,9 +377,30 @@ class TestUploads:
         assert res.extra['downloads'] == 10
         assert res.extra['checkout'] == 'hmoco'
 
-        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
-        inner_provider.upload.assert_called_once_with(file_stream, WaterButlerPath('/uniquepath'), check_created=False, fetch_metadata=False)
-        inner_provider.move.assert_called_once_with(inner_provider, WaterButlerPath('/uniquepath'), WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
+        complete_path = WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest)
+        inner_provider.metadata.assert_called_once_with(complete_path)
+        # Uploaded straight to its content addressed name
+        assert inner_provider.upload.call_count == 1
+        assert inner_provider.upload.call_args[0][1] == complete_path
+        assert inner_provider.upload.call_args[1] == {}
+        assert inner_provider.move.called is False
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_cloudfiles_skips_lookup(self, monkeypatch, provider_and_mock, file_stream, upload_response):
+        self.patch_tasks(monkeypatch)
+        provider, inner_provider = provider_and_mock
+        monkeypatch.setattr(inner_provider, 'NAME', 'cloudfiles')
+        inner_provider.upload.return_value = (utils.MockFileMetadata(), None)
+        inner_provider.metadata.side_effect = exceptions.MetadataError('Boom!', code=404)
+
+        path = WaterButlerPath('/newfile', _ids=('rootId', None))
+        url = 'https://waterbutler.io/{}/children/'.format(path.parent.identifier)
+        aiohttpretty.register_json_uri('POST', url, status=201, body=upload_response)
+
+        yield from provider.upload(file_stream, path)
+
+        assert inner_provider.upload.call_args[1] == {'check_created': False}
 
     @async
     @pytest.mark.aiohttpretty
@@ -387,7 +412,7 @@ class TestUploads:
 
         mock_parity = mock.Mock()
         mock_backup = mock.Mock()
-        inner_provider.move.return_value = (utils.MockFileMetadata(), True)
+        inner_provider.upload.return_value = (utils.MockFileMetadata(), None)
         inner_provider.metadata.side_effect = exceptions.MetadataError('Boom!', code=404)
 
         aiohttpretty.register_json_uri('POST', url, status=201, body={'version': 'versionpk', 'data': {'version': 42, 'downloads': 30, 'path': '/alkjdaslke09', 'checkout': None, 'md5': 'abcd', 'sha256': 'bcde'}})
@@ -407,9 +432,159 @@ class TestUploads:
         assert res.extra['downloads'] == 30
         assert res.extra['checkout'] is None
 
-        inner_provider.upload.assert_called_once_with(file_stream, WaterButlerPath('/uniquepath'), check_created=False, fetch_metadata=False)
         complete_path = os.path.join(FILE_PATH_COMPLETE, file_stream.writers['sha256'].hexdigest)
         mock_parity.assert_called_once_with(complete_path, credentials['parity'], settings['parity'])
-        mock_backup.assert_called_once_with(complete_path, 'versionpk', 'https://waterbutler.io/hooks/metadata/', credentials['archive'], settings['parity'])
+        mock_backup.assert_called_once_with(
+            complete_path,
+            'versionpk',
+            'https://waterbutler.io/hooks/metadata/',
+            credentials['archive'],
+            settings['parity'],
+            tree_hash=file_stream.writers['sha256_tree'].hexdigest,
+        )
         inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
-        inner_provider.move.assert_called_once_with(inner_provider, WaterButlerPath('/uniquepath'), WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest))
+        assert inner_provider.upload.call_args[0][1] == WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest)
+        assert inner_provider.move.called is False
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_replicated(self, monkeypatch, provider_and_mock, file_stream, file_content, upload_response):
+        self.patch_tasks(monkeypatch)
+        provider, inner_provider = provider_and_mock
+        provider.replica_settings = {'provider': 'mock'}
+        provider.replica_credentials = {}
+
+        received = {}
+
+        def receiver(name):
+            @asyncio.coroutine
+            def upload(stream, path, **kwargs):
+                received[name] = (path, (yield from stream.read()))
+                return utils.MockFileMetadata(), None
+            return upload
+
+        replica = utils.MockProvider1({}, {}, {})
+        replica.upload = receiver('replica')
+        replica.metadata = utils.MockCoroutine(side_effect=exceptions.MetadataError('Boom!', code=404))
+        monkeypatch.setattr(provider, 'make_replica_provider', lambda: replica)
+
+        inner_provider.upload = receiver('storage')
+        inner_provider.metadata.side_effect = exceptions.MetadataError('Boom!', code=404)
+
+        path = WaterButlerPath('/newfile', _ids=('rootId', None))
+        url = 'https://waterbutler.io/{}/children/'.format(path.parent.identifier)
+        aiohttpretty.register_json_uri('POST', url, status=201, body=upload_response)
+
+        res, created = yield from provider.upload(file_stream, path)
+
+        complete_path = WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest)
+        assert created is True
+        assert received == {'storage': (complete_path, file_content), 'replica': (complete_path, file_content)}
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_replica_missing(self, monkeypatch, provider_and_mock, file_stream, file_content, upload_response):
+        self.patch_tasks(monkeypatch)
+        provider, inner_provider = provider_and_mock
+        provider.replica_settings = {'provider': 'mock'}
+        provider.replica_credentials = {}
+
+        replica = utils.MockProvider1({}, {}, {})
+        replica.upload = utils.MockCoroutine(return_value=(utils.MockFileMetadata(), None))
+        replica.metadata = utils.MockCoroutine(side_effect=exceptions.MetadataError('Boom!', code=404))
+        monkeypatch.setattr(provider, 'make_replica_provider', lambda: replica)
+
+        inner_provider.metadata.return_value = utils.MockFileMetadata()
+
+        path = WaterButlerPath('/newfile', _ids=('rootId', None))
+        url = 'https://waterbutler.io/{}/children/'.format(path.parent.identifier)
+        aiohttpretty.register_json_uri('POST', url, status=201, body=upload_response)
+
+        yield from provider.upload(file_stream, path)
+
+        assert inner_provider.upload.called is False
+        assert replica.upload.call_count == 1
+        assert replica.upload.call_args[0][1] == WaterButlerPath('/' + file_stream.writers['sha256'].hexdigest)
+
+    def patch_dedup(self, monkeypatch, tmpdir, content):
+        basepath = 'waterbutler.providers.osfstorage.provider.{}'
+        monkeypatch.setattr(basepath.format('settings.UPLOAD_DEDUP_PRECHECK'), True)
+        monkeypatch.setattr(basepath.format('settings.FILE_PATH_COMPLETE'), str(tmpdir))
+        sha256 = hashlib.sha256(content).hexdigest()
+        tmpdir.join(sha256 + '.json').write(json.dumps({
+            'md5': hashlib.md5(content).hexdigest(),
+            'sha1': hashlib.sha1(content).hexdigest(),
+            'sha256': sha256,
+        }))
+        return sha256
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_from_digest(self, monkeypatch, tmpdir, provider_and_mock, upload_response):
+        self.patch_tasks(monkeypatch)
+        sha256 = self.patch_dedup(monkeypatch, tmpdir, b'freddie')
+        provider, inner_provider = provider_and_mock
+        inner_provider.metadata = utils.MockCoroutine(return_value=utils.MockFileMetadata())
+
+        path = WaterButlerPath('/newfile', _ids=('rootId', None))
+        url = 'https://waterbutler.io/{}/children/'.format(path.parent.identifier)
+        aiohttpretty.register_json_uri('POST', url, status=201, body=upload_response)
+
+        res, created = yield from provider.upload_from_digest(path, {'sha256': sha256})
+
+        assert created is True
+        assert res.name == 'newfile'
+        assert res.extra['version'] == 8
+        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + sha256))
+        assert inner_provider.upload.called is False
+        assert inner_provider.move.called is False
+
+    @async
+    def test_upload_from_digest_recorded_hashes(self, monkeypatch, tmpdir, provider_and_mock):
+        self.patch_tasks(monkeypatch)
+        sha256 = self.patch_dedup(monkeypatch, tmpdir, b'freddie')
+        provider, inner_provider = provider_and_mock
+        inner_provider.metadata = utils.MockCoroutine(return_value=utils.MockFileMetadata())
+        provider._register_upload = utils.MockCoroutine(return_value=('metadata', True))
+
+        path = WaterButlerPath('/newfile', _ids=('rootId', None))
+
+        yield from provider.upload_from_digest(path, {'sha256': sha256, 'md5': 'lies', 'sha1': 'lies'})
+
+        args, kwargs = provider._register_upload.call_args
+        # The hashes registered are those recorded with the blob, never the client's
+        assert args[2] == {
+            'md5': hashlib.md5(b'freddie').hexdigest(),
+            'sha1': hashlib.sha1(b'freddie').hexdigest(),
+            'sha256': sha256,
+        }
+        # Without a local path its parity and archive tasks are not started again
+        assert args[3:] == () and kwargs == {}
+
+    @async
+    def test_upload_from_digest_disabled(self, monkeypatch, tmpdir, provider_and_mock):
+        self.patch_tasks(monkeypatch)
+        sha256 = self.patch_dedup(monkeypatch, tmpdir, b'freddie')
+        monkeypatch.setattr('waterbutler.providers.osfstorage.provider.settings.UPLOAD_DEDUP_PRECHECK', False)
+        provider, inner_provider = provider_and_mock
+
+        path = WaterButlerPath('/newfile', _ids=('rootId', None))
+
+        assert (yield from provider.upload_from_digest(path, {'sha256': sha256})) is None
+        assert inner_provider.metadata.called is False
+
+    @async
+    def test_upload_from_digest_unknown(self, monkeypatch, tmpdir, provider_and_mock):
+        self.patch_tasks(monkeypatch)
+        sha256 = self.patch_dedup(monkeypatch, tmpdir, b'freddie')
+        provider, inner_provider = provider_and_mock
+        inner_provider.metadata.side_effect = exceptions.MetadataError('Boom!', code=404)
+
+        path = WaterButlerPath('/newfile', _ids=('rootId', None))
+
+        assert (yield from provider.upload_from_digest(path, {'sha256': sha256})) is None
+        assert (yield from provider.upload_from_digest(path, {'sha256': 'a' * 64})) is None
+        assert (yield from provider.upload_from_digest(path, {'md5': 'abcd'})) is None
+
+        # Only blobs this worker holds are looked up
+        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + sha256))
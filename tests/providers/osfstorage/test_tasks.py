@@ -1,6 +1,7 @@
 import os
 import json
 import asyncio
+import hashlib
 from unittest import mock
 
 import pytest
@@ -10,7 +11,9 @@ from tests import utils as test_utils
 
 from boto.glacier.exceptions import UnexpectedHTTPResponseError
 
+from waterbutler.core import streams
 from waterbutler.core.path import WaterButlerPath
+from waterbutler.tasks import settings as tasks_settings
 from waterbutler.providers.osfstorage import settings
 from waterbutler.providers.osfstorage.tasks import utils
 from waterbutler.providers.osfstorage.tasks import backup
@@ -61,13 +64,14 @@ class TestParityTask:
 
         task.delay.assert_called_once_with('The Best', credentials, settings)
 
-    def test_creates_upload_futures(self, monkeypatch, credentials, settings):
+    def test_routed_to_parity_queue(self):
+        # par2 runs are bounded by the workers consuming this queue
+        assert parity._parity_create_files.queue == tasks_settings.PARITY_QUEUE
+
+    def test_creates_upload_futures(self, monkeypatch, mock_provider, credentials, settings):
         paths = range(10)
-        future = asyncio.Future()
-        future.set_result(None)
-        mock_upload_parity = mock.Mock()
-        mock_upload_parity.return_value = future
-        mock_create_parity = mock.Mock(return_value=paths)
+        mock_upload_parity = test_utils.MockCoroutine()
+        mock_create_parity = test_utils.MockCoroutine(return_value=paths)
         monkeypatch.setattr(parity, '_upload_parity', mock_upload_parity)
         monkeypatch.setattr(parity.utils, 'create_parity_files', mock_create_parity)
 
@@ -77,8 +81,31 @@ class TestParityTask:
             os.path.join(osf_settings.FILE_PATH_COMPLETE, 'Triangles'),
             redundancy=osf_settings.PARITY_REDUNDANCY,
         )
+        # Every volume goes through the same provider
+        assert parity.make_provider.call_count == 1
         for num in reversed(range(10)):
-            mock_upload_parity.assert_any_call(num, credentials, settings)
+            mock_upload_parity.assert_any_call(mock_provider, num)
+
+    @async
+    def test_failed_upload_cancels_the_rest(self, monkeypatch, tmpdir, mock_provider, credentials, settings):
+        paths = [tmpdir.join('Triangles.vol{}.par2'.format(num)) for num in range(3)]
+        for path in paths:
+            path.write('foo')
+
+        @asyncio.coroutine
+        def upload(stream, path):
+            if path.name == 'Triangles.vol0.par2':
+                raise exceptions.ParchiveError('Nope')
+            yield from asyncio.sleep(10)
+
+        mock_provider.upload = upload
+        mock_create_parity = test_utils.MockCoroutine(return_value=[path.strpath for path in paths])
+        monkeypatch.setattr(parity.utils, 'create_parity_files', mock_create_parity)
+
+        with pytest.raises(exceptions.ParchiveError):
+            yield from asyncio.wait_for(parity._create_and_upload_parity('Triangles', credentials, settings), 1)
+
+        assert not any(path.exists() for path in paths)
 
     @async
     def test_uploads(self, monkeypatch, tmpdir, mock_provider):
@@ -89,7 +116,7 @@ class TestParityTask:
         tempfile.write('foo')
         path = tempfile.strpath
 
-        yield from parity._upload_parity(path, {}, {})
+        yield from parity._upload_parity(mock_provider, path)
 
         assert mock_provider.upload.called
 
@@ -97,31 +124,35 @@ class TestParityTask:
             stream,
             WaterButlerPath('/' + os.path.split(path)[1])
         )
+        # Removed once uploaded
+        assert not tempfile.exists()
 
+    @async
     def test_exceptions_get_raised(self, monkeypatch):
-        mock_sp_call = mock.Mock(return_value=7)
-        monkeypatch.setattr(utils.subprocess, 'call', mock_sp_call)
+        process = mock.Mock(wait=test_utils.MockCoroutine(return_value=7))
+        mock_exec = test_utils.MockCoroutine(return_value=process)
+        monkeypatch.setattr(utils.os, 'stat', mock.Mock(return_value=mock.Mock(st_size=10)))
+        monkeypatch.setattr(utils.asyncio, 'create_subprocess_exec', mock_exec)
         path = 'foo/bar/baz'
-        args = ['par2', 'c', '-r5', 'baz.par2', path]
+        args = ['par2', 'c', '-r5', 'foo/bar/baz.par2', path]
 
         with pytest.raises(exceptions.ParchiveError) as e:
-            utils.create_parity_files(path)
-
-            assert e.value == '{0} failed with code {1}'.format(' '.join(args), 7)
+            yield from utils.create_parity_files(path)
 
-            with open(os.devnull, 'wb') as DEVNULL:
-                mock_sp_call.assert_called_once_with(args, stdout=DEVNULL, stderr=DEVNULL)
+        assert e.value.args[0] == '{0} failed with code {1}'.format(' '.join(args), 7)
+        mock_exec.assert_called_once_with(*args, stdout=utils.subprocess.DEVNULL, stderr=utils.subprocess.DEVNULL)
 
+    @async
     def test_skip_empty_files(self, monkeypatch):
         mock_stat = mock.Mock(return_value=mock.Mock(st_size=0))
-        mock_sp_call = mock.Mock()
+        mock_exec = test_utils.MockCoroutine()
         monkeypatch.setattr(os, 'stat', mock_stat)
-        monkeypatch.setattr(utils.subprocess, 'call', mock_sp_call)
+        monkeypatch.setattr(utils.asyncio, 'create_subprocess_exec', mock_exec)
         path = 'foo/bar/baz'
 
-        paths = utils.create_parity_files(path)
+        paths = yield from utils.create_parity_files(path)
         assert paths == []
-        assert not mock_sp_call.called
+        assert not mock_exec.called
 
 
 class TestBackUpTask:
@@ -133,7 +164,7 @@ class TestBackUpTask:
         fut = backup.main('The Best', 0, None, {}, {})
         asyncio.get_event_loop().run_until_complete(fut)
 
-        task.delay.assert_called_once_with('The Best', 0, None, {}, {})
+        task.delay.assert_called_once_with('The Best', 0, None, {}, {}, tree_hash=None)
 
     def test_tries_upload(self, monkeypatch):
         mock_vault = mock.Mock()
@@ -144,6 +175,7 @@ class TestBackUpTask:
         mock_complete = mock.Mock()
         monkeypatch.setattr(backup, 'get_vault', mock_get_vault)
         monkeypatch.setattr(backup, '_push_archive_complete', mock_complete)
+        monkeypatch.setattr(backup.os.path, 'getsize', lambda _: 3)
 
         backup._push_file_archive('Triangles', None, None, {}, {})
 
@@ -158,6 +190,7 @@ class TestBackUpTask:
         mock_get_vault.return_value = mock_vault
         monkeypatch.setattr(backup, 'get_vault', mock_get_vault)
         monkeypatch.setattr(backup, '_push_archive_complete', mock_complete)
+        monkeypatch.setattr(backup.os.path, 'getsize', lambda _: 3)
 
         backup._push_file_archive('Triangles', 0, None, credentials, settings)
 
@@ -186,6 +219,7 @@ class TestBackUpTask:
         mock_complete = mock.Mock()
         monkeypatch.setattr(backup, 'get_vault', mock_get_vault)
         monkeypatch.setattr(backup, '_push_archive_complete', mock_complete)
+        monkeypatch.setattr(backup.os.path, 'getsize', lambda _: 3)
 
         backup._push_file_archive('Triangles', None, None, {}, {})
 
@@ -208,7 +242,99 @@ class TestBackUpTask:
         mock_complete = mock.Mock()
         monkeypatch.setattr(backup, 'get_vault', mock_get_vault)
         monkeypatch.setattr(backup, '_push_archive_complete', mock_complete)
+        monkeypatch.setattr(backup.os.path, 'getsize', lambda _: 3)
 
         with pytest.raises(UnexpectedHTTPResponseError):
             backup._push_file_archive('Triangles', None, None, {}, {})
         assert not mock_complete.called
+
+
+class TestMultipartArchive:
+
+    @pytest.fixture
+    def archive(self, tmpdir):
+        data = os.urandom(5 * 1024 * 1024 + 7)
+        path = tmpdir.join(hashlib.sha256(data).hexdigest())
+        path.write_binary(data)
+        return path.strpath, data
+
+    @pytest.fixture
+    def vault(self, monkeypatch):
+        monkeypatch.setattr(osf_settings, 'ARCHIVE_MULTIPART_THRESHOLD', 1024 * 1024)
+        monkeypatch.setattr(osf_settings, 'ARCHIVE_PART_SIZE', 2 * 1024 * 1024)
+        monkeypatch.setattr(osf_settings, 'ARCHIVE_PART_RETRY_BACKOFF', 0)
+        vault = mock.Mock()
+        vault.name = 'ThreePoint'
+        vault.layer1.initiate_multipart_upload.return_value = {'UploadId': 'upid'}
+        vault.layer1.complete_multipart_upload.return_value = {'ArchiveId': 'archid'}
+        return vault
+
+    def tree_hash(self, data):
+        writer = streams.TreeHashStreamWriter()
+        writer.write(data)
+        return writer.hexdigest
+
+    def test_uploads_parts(self, archive, vault):
+        path, data = archive
+
+        assert backup.upload_archive(vault, path, 'Triangles', self.tree_hash(data)) == 'archid'
+
+        vault.layer1.initiate_multipart_upload.assert_called_once_with('ThreePoint', 2 * 1024 * 1024, 'Triangles')
+        parts = sorted((call[0] for call in vault.layer1.upload_part.call_args_list), key=lambda args: args[4])
+        assert [part[4] for part in parts] == [(0, 2097151), (2097152, 4194303), (4194304, len(data) - 1)]
+        assert b''.join(part[5] for part in parts) == data
+        for part in parts:
+            assert part[2] == hashlib.sha256(part[5]).hexdigest()
+            assert part[3] == self.tree_hash(part[5])
+        vault.layer1.complete_multipart_upload.assert_called_once_with('ThreePoint', 'upid', self.tree_hash(data), len(data))
+        assert not vault.layer1.abort_multipart_upload.called
+
+    def test_retries_part(self, archive, vault):
+        path, data = archive
+        failures = []
+
+        def upload_part(vault_name, upload_id, linear_hash, tree_hash, byte_range, part_data):
+            if byte_range[0] == 0 and not failures:
+                failures.append(byte_range)
+                raise ConnectionResetError()
+
+        vault.layer1.upload_part.side_effect = upload_part
+
+        assert backup.upload_archive(vault, path, 'Triangles') == 'archid'
+
+        assert failures == [(0, 2097151)]
+        assert vault.layer1.upload_part.call_count == 4
+        vault.layer1.complete_multipart_upload.assert_called_once_with('ThreePoint', 'upid', self.tree_hash(data), len(data))
+
+    def test_aborts(self, archive, vault, monkeypatch):
+        path, data = archive
+        monkeypatch.setattr(osf_settings, 'ARCHIVE_PART_RETRIES', 1)
+        vault.layer1.upload_part.side_effect = ConnectionResetError()
+
+        with pytest.raises(ConnectionResetError):
+            backup.upload_archive(vault, path, 'Triangles')
+
+        vault.layer1.abort_multipart_upload.assert_called_once_with('ThreePoint', 'upid')
+        assert not vault.layer1.complete_multipart_upload.called
+
+    def test_tree_hash_mismatch(self, archive, vault):
+        path, data = archive
+
+        with pytest.raises(exceptions.ArchiveError):
+            backup.upload_archive(vault, path, 'Triangles', self.tree_hash(b'something else'))
+
+        vault.layer1.abort_multipart_upload.assert_called_once_with('ThreePoint', 'upid')
+        assert not vault.layer1.complete_multipart_upload.called
+
+    def test_small_file_uses_known_hashes(self, archive, vault, monkeypatch):
+        path, data = archive
+        monkeypatch.setattr(osf_settings, 'ARCHIVE_MULTIPART_THRESHOLD', len(data))
+        vault.layer1.upload_archive.return_value = {'ArchiveId': 'archid'}
+
+        assert backup.upload_archive(vault, path, 'Triangles', self.tree_hash(data)) == 'archid'
+
+        args = vault.layer1.upload_archive.call_args[0]
+        assert args[0] == 'ThreePoint'
+        assert args[2:] == (hashlib.sha256(data).hexdigest(), self.tree_hash(data), 'Triangles')
+        assert not vault.upload_archive.called
+
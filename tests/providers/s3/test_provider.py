@@ -1,11 +1,14 @@
 import pytest
 
 from tests.utils import async
+from tests.utils import MockCoroutine
 
 import io
 import base64
 import hashlib
 from http import client
+from unittest import mock
+from xml.etree import ElementTree
 
 import aiohttpretty
 from freezegun import freeze_time
@@ -13,9 +16,11 @@ from freezegun import freeze_time
 from waterbutler.core import streams
 from waterbutler.core import metadata
 from waterbutler.core import exceptions
+from waterbutler.core import settings as core_settings
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.s3 import S3Provider
+from waterbutler.providers.s3 import settings as s3_settings
 from waterbutler.providers.s3.metadata import S3FileMetadata
 from waterbutler.providers.s3.metadata import S3FolderMetadata
 
@@ -574,6 +579,52 @@ class TestCRUD:
         assert aiohttpretty.has_call(method='POST', uri=delete_url_one)
         assert aiohttpretty.has_call(method='POST', uri=delete_url_two)
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_folder_delete_pipelined(self, provider, monkeypatch):
+        monkeypatch.setattr(s3_settings, 'DELETE_CONCURRENCY', 1)
+        path = WaterButlerPath('/some-folder/')
+        query_url = provider.bucket.generate_url(100, 'GET')
+
+        pages = [[str(x) for x in range(start, start + 1000)] for start in (1000, 2000, 3000)]
+        for i, keys in enumerate(pages):
+            params = {'prefix': 'some-folder/'}
+            if i:
+                params['marker'] = pages[i - 1][-1]
+            aiohttpretty.register_uri(
+                'GET',
+                query_url,
+                params=params,
+                body=list_objects_response(keys, truncated=i < len(pages) - 1),
+                status=200,
+            )
+
+        delete_urls = []
+        for keys in pages:
+            _, headers = bulk_delete_body(keys)
+            delete_urls.append(provider.bucket.generate_url(100, 'POST', query_parameters={'delete': ''}, headers=headers))
+            aiohttpretty.register_uri('POST', delete_urls[-1], status=204)
+
+        yield from provider.delete(path)
+
+        for url in delete_urls:
+            assert aiohttpretty.has_call(method='POST', uri=url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_folder_delete_failure(self, provider):
+        path = WaterButlerPath('/some-folder/')
+        query_url = provider.bucket.generate_url(100, 'GET')
+        keys = [str(x) for x in range(10)]
+        aiohttpretty.register_uri('GET', query_url, params={'prefix': 'some-folder/'}, body=list_objects_response(keys), status=200)
+
+        _, headers = bulk_delete_body(keys)
+        delete_url = provider.bucket.generate_url(100, 'POST', query_parameters={'delete': ''}, headers=headers)
+        aiohttpretty.register_uri('POST', delete_url, status=500)
+
+        with pytest.raises(exceptions.DeleteError):
+            yield from provider.delete(path)
+
     @async
     @pytest.mark.aiohttpretty
     def test_accepts_url(self, provider):
@@ -605,6 +656,77 @@ class TestMetadata:
         assert result[1].name == 'my-image.jpg'
         assert result[2].extra['md5'] == '1b2cf535f27731c974343645a3985328'
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_metadata_folder_paginated(self, provider):
+        path = WaterButlerPath('/darp/')
+        url = provider.bucket.generate_url(100)
+        keys_one = ['darp/{:04d}'.format(x) for x in range(1000)]
+        keys_two = ['darp/{:04d}'.format(x) for x in range(1000, 1500)]
+
+        aiohttpretty.register_uri('GET', url, params=build_folder_params(path),
+                                  body=list_objects_response(keys_one, truncated=True))
+        aiohttpretty.register_uri('GET', url, params=dict(build_folder_params(path), marker='darp/0999'),
+                                  body=list_objects_response(keys_two))
+
+        result = yield from provider.metadata(path)
+
+        assert [item.path for item in result] == ['/' + key for key in keys_one + keys_two]
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_list_folder_resumes(self, provider):
+        path = WaterButlerPath('/darp/')
+        url = provider.bucket.generate_url(100)
+        keys = ['darp/{:04d}'.format(x) for x in range(10, 20)]
+
+        aiohttpretty.register_uri('GET', url, params=dict(build_folder_params(path), marker='darp/0009', **{'max-keys': '10'}),
+                                  body=list_objects_response(keys, truncated=True))
+
+        listing = provider.list_folder(path, marker='darp/0009', page_size=10)
+
+        for key in keys:
+            item = yield from listing.next()
+            assert item.path == '/' + key
+            assert listing.marker == key
+
+        assert not listing.exhausted
+
+    @async
+    def test_list_folder_closes_page(self, provider):
+        resp = mock.Mock()
+        resp.content.read = MockCoroutine(side_effect=[b'<ListBucketResult><Contents></Key>'])
+        provider.make_request = MockCoroutine(return_value=resp)
+
+        listing = provider.list_folder(WaterButlerPath('/darp/'))
+
+        with pytest.raises(ElementTree.ParseError):
+            yield from listing.next()
+
+        resp.close.assert_called_once_with()
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_metadata_page(self, provider):
+        path = WaterButlerPath('/darp/')
+        url = provider.bucket.generate_url(100)
+        keys = ['darp/{:04d}'.format(x) for x in range(10, 20)]
+
+        aiohttpretty.register_uri('GET', url, params=dict(build_folder_params(path), marker='darp/0009', **{'max-keys': '5'}),
+                                  body=list_objects_response(keys[:5], truncated=True))
+        aiohttpretty.register_uri('GET', url, params=dict(build_folder_params(path), marker='darp/0014', **{'max-keys': '5'}),
+                                  body=list_objects_response(keys[5:]))
+
+        children, cursor = yield from provider.metadata_page(path, cursor='darp/0009', size=5)
+
+        assert [item.path for item in children] == ['/' + key for key in keys[:5]]
+        assert cursor == 'darp/0014'
+
+        children, cursor = yield from provider.metadata_page(path, cursor=cursor, size=5)
+
+        assert [item.path for item in children] == ['/' + key for key in keys[5:]]
+        assert cursor is None
+
     @async
     @pytest.mark.aiohttpretty
     def test_metadata_folder_self_listing(self, provider, contents_and_self):
@@ -690,6 +812,148 @@ class TestMetadata:
         assert aiohttpretty.has_call(method='HEAD', uri=metadata_url)
 
 
+@freeze_time('2015-10-31 12:00:01')
+class TestMultipartUpload:
+
+    def part_url(self, provider, path, part_number, data):
+        md5 = base64.b64encode(hashlib.md5(data).digest()).decode('ascii')
+        return provider.bucket.new_key(path.path).generate_url(
+            100,
+            'PUT',
+            query_parameters={'partNumber': str(part_number), 'uploadId': 'upload-id'},
+            headers={'Content-MD5': md5},
+        )
+
+    def setup_upload(self, provider, path, monkeypatch, file_metadata):
+        monkeypatch.setattr(s3_settings, 'MULTIPART_THRESHOLD', 5)
+        monkeypatch.setattr(core_settings, 'RETRY_BACKOFF', 0)
+        provider._multipart_part_size = lambda size: 4
+
+        key = provider.bucket.new_key(path.path)
+        create_url = key.generate_url(100, 'POST', query_parameters={'uploads': ''}, encrypt_key=False)
+        complete_url = key.generate_url(100, 'POST', query_parameters={'uploadId': 'upload-id'})
+        abort_url = key.generate_url(100, 'DELETE', query_parameters={'uploadId': 'upload-id'})
+        metadata_url = key.generate_url(100, 'HEAD')
+
+        parts = [b'slee', b'py']
+        etag = '{}-2'.format(hashlib.md5(b''.join(hashlib.md5(part).digest() for part in parts)).hexdigest())
+
+        aiohttpretty.register_uri('HEAD', metadata_url, responses=[{'status': 404}, {'headers': file_metadata}])
+        aiohttpretty.register_uri('POST', create_url, body=b'''<?xml version="1.0" encoding="UTF-8"?>
+            <InitiateMultipartUploadResult>
+                <Bucket>that kerning</Bucket>
+                <Key>foobah</Key>
+                <UploadId>upload-id</UploadId>
+            </InitiateMultipartUploadResult>''')
+        aiohttpretty.register_uri('POST', complete_url, body='''<?xml version="1.0" encoding="UTF-8"?>
+            <CompleteMultipartUploadResult>
+                <Key>foobah</Key>
+                <ETag>"{}"</ETag>
+            </CompleteMultipartUploadResult>'''.format(etag).encode('utf-8'))
+        aiohttpretty.register_uri('DELETE', abort_url, status=204)
+
+        return create_url, complete_url, abort_url
+
+    def test_part_size(self, provider, monkeypatch):
+        monkeypatch.setattr(s3_settings, 'MULTIPART_MIN_PART_SIZE', 8 * 1024 * 1024)
+        monkeypatch.setattr(s3_settings, 'MULTIPART_MAX_PARTS', 10000)
+
+        assert provider._multipart_part_size(100 * 1024 * 1024) == 8 * 1024 * 1024
+        assert provider._multipart_part_size(200 * 1024 ** 3) == 21 * 1024 * 1024
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_multipart(self, provider, file_stream, file_metadata, monkeypatch):
+        path = WaterButlerPath('/foobah')
+        create_url, complete_url, abort_url = self.setup_upload(provider, path, monkeypatch, file_metadata)
+
+        for number, part in ((1, b'slee'), (2, b'py')):
+            aiohttpretty.register_uri(
+                'PUT',
+                self.part_url(provider, path, number, part),
+                headers={'ETag': '"{}"'.format(hashlib.md5(part).hexdigest())},
+            )
+
+        metadata, created = yield from provider.upload(file_stream, path)
+
+        assert metadata.kind == 'file'
+        assert created
+        assert aiohttpretty.has_call(method='POST', uri=create_url)
+        assert aiohttpretty.has_call(method='PUT', uri=self.part_url(provider, path, 1, b'slee'))
+        assert aiohttpretty.has_call(method='PUT', uri=self.part_url(provider, path, 2, b'py'))
+        assert aiohttpretty.has_call(method='POST', uri=complete_url)
+        assert not aiohttpretty.has_call(method='DELETE', uri=abort_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_multipart_retries_parts(self, provider, file_stream, file_metadata, monkeypatch):
+        path = WaterButlerPath('/foobah')
+        create_url, complete_url, abort_url = self.setup_upload(provider, path, monkeypatch, file_metadata)
+
+        aiohttpretty.register_uri(
+            'PUT',
+            self.part_url(provider, path, 1, b'slee'),
+            responses=[
+                {'status': 500},
+                {'headers': {'ETag': '"{}"'.format(hashlib.md5(b'corrupt').hexdigest())}},
+                {'headers': {'ETag': '"{}"'.format(hashlib.md5(b'slee').hexdigest())}},
+            ],
+        )
+        aiohttpretty.register_uri(
+            'PUT',
+            self.part_url(provider, path, 2, b'py'),
+            headers={'ETag': '"{}"'.format(hashlib.md5(b'py').hexdigest())},
+        )
+
+        metadata, created = yield from provider.upload(file_stream, path)
+
+        assert metadata.kind == 'file'
+        assert aiohttpretty.has_call(method='POST', uri=complete_url)
+        assert not aiohttpretty.has_call(method='DELETE', uri=abort_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_multipart_aborts(self, provider, file_stream, file_metadata, monkeypatch):
+        monkeypatch.setattr(core_settings, 'RETRIES', 1)
+        path = WaterButlerPath('/foobah')
+        create_url, complete_url, abort_url = self.setup_upload(provider, path, monkeypatch, file_metadata)
+
+        aiohttpretty.register_uri('PUT', self.part_url(provider, path, 1, b'slee'), status=500)
+        aiohttpretty.register_uri(
+            'PUT',
+            self.part_url(provider, path, 2, b'py'),
+            headers={'ETag': '"{}"'.format(hashlib.md5(b'py').hexdigest())},
+        )
+
+        with pytest.raises(exceptions.UploadError):
+            yield from provider.upload(file_stream, path)
+
+        assert aiohttpretty.has_call(method='DELETE', uri=abort_url)
+        assert not aiohttpretty.has_call(method='POST', uri=complete_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_upload_multipart_truncated(self, provider, file_metadata, monkeypatch):
+        path = WaterButlerPath('/foobah')
+        create_url, complete_url, abort_url = self.setup_upload(provider, path, monkeypatch, file_metadata)
+        # The body ends early, as it does when the client disconnects
+        stream = streams.StringStream(b'sleepy')
+        stream._size = 10
+
+        for number, part in ((1, b'slee'), (2, b'py')):
+            aiohttpretty.register_uri(
+                'PUT',
+                self.part_url(provider, path, number, part),
+                headers={'ETag': '"{}"'.format(hashlib.md5(part).hexdigest())},
+            )
+
+        with pytest.raises(exceptions.UploadError):
+            yield from provider.upload(stream, path)
+
+        assert aiohttpretty.has_call(method='DELETE', uri=abort_url)
+        assert not aiohttpretty.has_call(method='POST', uri=complete_url)
+
+
 @freeze_time('2015-10-31 12:00:01')
 class TestCreateFolder:
 
@@ -790,6 +1054,81 @@ class TestOperations:
     #     assert aiohttpretty.has_call(method='HEAD', uri=metadata_url)
     #     assert aiohttpretty.has_call(method='PUT', uri=url, headers=headers)
 
+    @async
+    @pytest.mark.aiohttpretty
+    def test_intra_copy(self, provider, file_metadata):
+        source_path = WaterButlerPath('/source')
+        dest_path = WaterButlerPath('/dest')
+        headers = {'x-amz-copy-source': '/that%20kerning/source'}
+
+        source_url = provider.bucket.new_key(source_path.path).generate_url(100, 'HEAD')
+        dest_url = provider.bucket.new_key(dest_path.path).generate_url(100, 'HEAD')
+        copy_url = provider.bucket.new_key(dest_path.path).generate_url(100, 'PUT', headers=headers)
+
+        aiohttpretty.register_uri('HEAD', source_url, headers=file_metadata)
+        aiohttpretty.register_uri('HEAD', dest_url, responses=[{'status': 404}, {'headers': file_metadata}])
+        aiohttpretty.register_uri('PUT', copy_url, status=200)
+
+        metadata, created = yield from provider.intra_copy(provider, source_path, dest_path)
+
+        assert metadata.kind == 'file'
+        assert created
+        assert aiohttpretty.has_call(method='PUT', uri=copy_url)
+
+    @async
+    @pytest.mark.aiohttpretty
+    def test_intra_copy_multipart(self, provider, file_metadata, monkeypatch):
+        monkeypatch.setattr(s3_settings, 'MULTIPART_COPY_THRESHOLD', 1000)
+        monkeypatch.setattr(s3_settings, 'MULTIPART_COPY_PART_SIZE', 4096)
+        provider._multipart_part_size = lambda size: 1
+
+        source_path = WaterButlerPath('/source')
+        dest_path = WaterButlerPath('/dest')
+        dest_key = provider.bucket.new_key(dest_path.path)
+
+        aiohttpretty.register_uri(
+            'HEAD',
+            provider.bucket.new_key(source_path.path).generate_url(100, 'HEAD'),
+            headers=file_metadata,
+        )
+        aiohttpretty.register_uri(
+            'HEAD',
+            dest_key.generate_url(100, 'HEAD'),
+            responses=[{'status': 404}, {'headers': file_metadata}],
+        )
+        aiohttpretty.register_uri(
+            'POST',
+            dest_key.generate_url(100, 'POST', query_parameters={'uploads': ''}, encrypt_key=False),
+            body=b'''<?xml version="1.0" encoding="UTF-8"?>
+                <InitiateMultipartUploadResult><UploadId>upload-id</UploadId></InitiateMultipartUploadResult>''',
+        )
+
+        part_urls, etags = [], []
+        for number, copy_range in enumerate(('bytes=0-4095', 'bytes=4096-8191', 'bytes=8192-9000'), 1):
+            headers = {'x-amz-copy-source': '/that%20kerning/source', 'x-amz-copy-source-range': copy_range}
+            etags.append(hashlib.md5(copy_range.encode('utf-8')))
+            part_urls.append(dest_key.generate_url(
+                100,
+                'PUT',
+                query_parameters={'partNumber': str(number), 'uploadId': 'upload-id'},
+                headers=headers,
+            ))
+            aiohttpretty.register_uri('PUT', part_urls[-1], body='''<?xml version="1.0" encoding="UTF-8"?>
+                <CopyPartResult><ETag>"{}"</ETag></CopyPartResult>'''.format(etags[-1].hexdigest()).encode('utf-8'))
+
+        complete_url = dest_key.generate_url(100, 'POST', query_parameters={'uploadId': 'upload-id'})
+        aiohttpretty.register_uri('POST', complete_url, body='''<?xml version="1.0" encoding="UTF-8"?>
+            <CompleteMultipartUploadResult><ETag>"{}-3"</ETag></CompleteMultipartUploadResult>'''.format(
+                hashlib.md5(b''.join(etag.digest() for etag in etags)).hexdigest()
+            ).encode('utf-8'))
+
+        metadata, created = yield from provider.intra_copy(provider, source_path, dest_path)
+
+        assert created
+        for url in part_urls:
+            assert aiohttpretty.has_call(method='PUT', uri=url)
+        assert aiohttpretty.has_call(method='POST', uri=complete_url)
+
     @async
     @pytest.mark.aiohttpretty
     def test_version_metadata(self, provider, version_metadata):
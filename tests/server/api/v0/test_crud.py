@@ -2,6 +2,7 @@ import pytest
 
 import json
 import asyncio
+from unittest import mock
 
 from tornado import testing
 from tornado import httpclient
@@ -241,3 +242,17 @@ class TestCrudHandler(utils.HandlerTestCase):
         args, kwargs = calls[0]
         assert kwargs.get('action') == 'create_folder'
         assert resp.code == 201
+
+    @testing.gen_test
+    def test_create_folder_invalidates_cache(self):
+        self.mock_provider.create_folder = utils.MockCoroutine(return_value=utils.MockFolderMetadata())
+        metadata_cache = mock.Mock(invalidate=utils.MockCoroutine())
+
+        with mock.patch('waterbutler.core.cache.get_metadata_cache', return_value=metadata_cache):
+            yield self.http_client.fetch(
+                self.get_url('/file?provider=queenhub&path=/folder/'),
+                method='POST',
+                body=''
+            )
+
+        metadata_cache.invalidate.assert_called_once_with(self.mock_provider)
@@ -128,8 +128,7 @@ class TestUploadFile(BaseCreateMixinTest):
 
     def setup_method(self, method):
         super().setup_method(method)
-        self.mixin.wsock = mock.Mock()
-        self.mixin.writer = mock.Mock()
+        self.mixin.pipe = mock.Mock()
 
     def test_created(self):
         metadata = mock.Mock()
@@ -140,8 +139,7 @@ class TestUploadFile(BaseCreateMixinTest):
 
         yield from self.mixin.upload_file()
 
-        assert self.mixin.wsock.close.called
-        assert self.mixin.writer.close.called
+        assert self.mixin.pipe.write_eof.called
         assert self.mixin.set_status.assert_called_once_with(201) is None
         assert self.mixin.write.assert_called_once_with({'data': {'day': 'tum'}}) is None
 
@@ -155,9 +153,61 @@ class TestUploadFile(BaseCreateMixinTest):
 
         yield from self.mixin.upload_file()
 
-        assert self.mixin.wsock.close.called
-        assert self.mixin.writer.close.called
+        assert self.mixin.pipe.write_eof.called
         assert self.mixin.set_status.called is False
         assert self.mixin.write.assert_called_once_with({'data': {'day': 'ta'}}) is None
 
 
+
+
+class TestUploadWithoutBody(BaseCreateMixinTest):
+
+    def setup_method(self, method):
+        super().setup_method(method)
+        self.mixin.finish = mock.Mock()
+        self.mixin.resource = '3rqws'
+        self.mixin.target_path = WaterButlerPath('/foo.txt')
+        self.mixin.request.headers = {
+            'Expect': '100-continue',
+            'X-Content-SHA256': 'a' * 64,
+        }
+
+    @async
+    def test_known_content(self):
+        metadata = mock.Mock()
+        metadata.json_api_serialized.return_value = {'day': 'tum'}
+        self.mixin.provider = mock.Mock(upload_from_digest=MockCoroutine(return_value=(metadata, True)))
+
+        assert (yield from self.mixin.upload_without_body()) is True
+
+        self.mixin.provider.upload_from_digest.assert_called_once_with(self.mixin.target_path, {'sha256': 'a' * 64})
+        self.mixin.set_status.assert_called_once_with(201)
+        self.mixin.write.assert_called_once_with({'data': {'day': 'tum'}})
+        assert self.mixin.finish.called
+
+    @async
+    def test_unknown_content(self):
+        self.mixin.provider = mock.Mock(upload_from_digest=MockCoroutine(return_value=None))
+
+        assert (yield from self.mixin.upload_without_body()) is False
+
+        assert self.mixin.write.called is False
+        assert self.mixin.finish.called is False
+
+    @async
+    def test_requires_expect_continue(self):
+        self.mixin.provider = mock.Mock(upload_from_digest=MockCoroutine())
+        del self.mixin.request.headers['Expect']
+
+        assert (yield from self.mixin.upload_without_body()) is False
+
+        assert self.mixin.provider.upload_from_digest.called is False
+
+    @async
+    def test_requires_digest(self):
+        self.mixin.provider = mock.Mock(upload_from_digest=MockCoroutine())
+        del self.mixin.request.headers['X-Content-SHA256']
+
+        assert (yield from self.mixin.upload_without_body()) is False
+
+        assert self.mixin.provider.upload_from_digest.called is False
@@ -3,7 +3,11 @@ import asyncio
 from http import client
 from unittest import mock
 
+import tornado.concurrent
+
 from waterbutler.core import exceptions
+from waterbutler.server import utils
+from waterbutler.server import settings
 from waterbutler.server.api.v1.provider.metadata import MetadataMixin
 
 from tests.utils import async
@@ -15,6 +19,7 @@ class BaseMetadataMixinTest:
     def setup_method(self, method):
         self.mixin = MetadataMixin()
         self.mixin.write = mock.Mock()
+        self.mixin.write_json = mock.Mock()
         self.mixin.request = mock.Mock()
         self.mixin.set_status = mock.Mock()
 
@@ -51,6 +56,183 @@ class TestGetFolder(BaseMetadataMixinTest):
         pass
 
 
+class TestGetFolderPage(BaseMetadataMixinTest):
+
+    def setup_method(self, method):
+        super().setup_method(method)
+        self.mixin.path = '/folder/'
+        self.mixin.resource = '3rqws'
+        self.mixin.request.full_url.return_value = 'http://wb.test/v1/resources/3rqws/providers/s3/folder/?page[size]=2'
+        self.mixin.query = {}
+        self.mixin.get_query_argument = lambda name, default=None: self.mixin.query.get(name, default)
+
+        self.child = mock.Mock()
+        self.child.json_api_serialized.return_value = {'kind': 'file'}
+
+    @async
+    def test_first_page(self):
+        self.mixin.query = {'page[size]': '2'}
+        self.mixin.provider = mock.Mock(metadata_page=MockCoroutine(return_value=([self.child] * 2, 'folder/b')))
+
+        yield from self.mixin.get_folder_page()
+
+        self.mixin.provider.metadata_page.assert_called_once_with('/folder/', cursor=None, size=2)
+        payload = self.mixin.write_json.call_args[0][0]
+        assert payload['data'] == [{'kind': 'file'}] * 2
+        assert 'page%5Bsize%5D=2' in payload['links']['next']
+        assert 'page%5Bcursor%5D={}'.format(utils.encode_page_cursor('folder/b')) in payload['links']['next']
+
+    @async
+    def test_last_page(self):
+        self.mixin.query = {'page[cursor]': utils.encode_page_cursor('folder/b')}
+        self.mixin.provider = mock.Mock(metadata_page=MockCoroutine(return_value=([self.child], None)))
+
+        yield from self.mixin.get_folder_page()
+
+        self.mixin.provider.metadata_page.assert_called_once_with(
+            '/folder/',
+            cursor='folder/b',
+            size=settings.FOLDER_PAGE_SIZE,
+        )
+        self.mixin.write_json.assert_called_once_with({'data': [{'kind': 'file'}], 'links': {'next': None}})
+
+    @async
+    def test_invalid_size(self):
+        self.mixin.provider = mock.Mock(metadata_page=MockCoroutine())
+
+        for size in ('0', 'many', str(settings.FOLDER_PAGE_SIZE_MAX + 1)):
+            self.mixin.query = {'page[size]': size}
+            with pytest.raises(exceptions.InvalidParameters):
+                yield from self.mixin.get_folder_page()
+
+        assert self.mixin.provider.metadata_page.called is False
+
+    @async
+    def test_invalid_cursor(self):
+        self.mixin.query = {'page[cursor]': 'a'}
+        self.mixin.provider = mock.Mock(metadata_page=MockCoroutine())
+
+        with pytest.raises(exceptions.InvalidParameters):
+            yield from self.mixin.get_folder_page()
+
+        assert self.mixin.provider.metadata_page.called is False
+
+
+class TestCachedMetadata(BaseMetadataMixinTest):
+
+    def setup_method(self, method):
+        super().setup_method(method)
+        self.mixin.path = '/folder/'
+        self.mixin.resource = '3rqws'
+        self.mixin.provider = mock.Mock()
+        self.mixin.request.query_arguments = {}
+        self.mixin.get_query_argument = mock.Mock(return_value=None)
+
+        self.child = mock.Mock()
+        self.child.json_api_serialized.return_value = {'kind': 'file'}
+        self.mixin.metadata_cache = mock.Mock(metadata=MockCoroutine(return_value=[self.child]))
+
+    @async
+    def test_folder_listing(self):
+        yield from self.mixin.get_folder()
+
+        self.mixin.metadata_cache.metadata.assert_called_once_with(self.mixin.provider, '/folder/')
+        self.mixin.write_json.assert_called_once_with({'data': [{'kind': 'file'}]})
+
+    @async
+    def test_file_metadata(self):
+        self.mixin.metadata_cache.metadata.return_value = self.child
+
+        yield from self.mixin.file_metadata()
+
+        self.mixin.metadata_cache.metadata.assert_called_once_with(self.mixin.provider, '/folder/', revision=None)
+        self.mixin.write.assert_called_once_with({'data': {'kind': 'file'}})
+
+
+class TestGetFolderTree(BaseMetadataMixinTest):
+
+    def setup_method(self, method):
+        super().setup_method(method)
+        self.mixin.path = '/folder/'
+        self.mixin.query = {}
+        self.mixin.get_query_argument = lambda name, default=None: self.mixin.query.get(name, default)
+        self.mixin.provider = mock.Mock()
+
+    @async
+    def test_dispatch(self):
+        self.mixin.request.query_arguments = {'tree': [b'']}
+        self.mixin.get_folder_tree = MockCoroutine()
+
+        yield from self.mixin.get_folder()
+
+        assert self.mixin.get_folder_tree.called
+
+    @async
+    def test_invalid_depth(self):
+        for depth in ('0', '-2', 'deep'):
+            self.mixin.query = {'depth': depth}
+            with pytest.raises(exceptions.InvalidParameters):
+                yield from self.mixin.get_folder_tree()
+
+        assert self.mixin.provider.walk.called is False
+
+    @async
+    def test_invalid_kind(self):
+        self.mixin.query = {'kind': 'symlink'}
+
+        with pytest.raises(exceptions.InvalidParameters):
+            yield from self.mixin.get_folder_tree()
+
+        assert self.mixin.provider.walk.called is False
+
+    def walker(self, *items):
+        walker = mock.Mock(buffered=False)
+        walker.next = MockCoroutine(side_effect=items)
+        return walker
+
+    def write_tree(self, walker):
+        self.mixin.resource = 'cuid'
+        self.mixin.flush = mock.Mock(side_effect=self.flush)
+        # Nothing suspends, the coroutine is done once called
+        return self.mixin.write_tree(walker).exception()
+
+    def flush(self):
+        self.mixin._headers_written = True
+        future = tornado.concurrent.Future()
+        future.set_result(None)
+        return future
+
+    def entry(self, name):
+        return mock.Mock(kind='file', **{'json_api_serialized.return_value': {'name': name}})
+
+    def test_writes_lines(self):
+        walker = self.walker(self.entry('freddie'), self.entry('brian'), None)
+
+        assert self.write_tree(walker) is None
+        assert [call[0][0] for call in self.mixin.write.call_args_list] == [
+            '{"name":"freddie"}\n',
+            '{"name":"brian"}\n',
+        ]
+        assert walker.close.called
+
+    def test_error_after_flush(self):
+        walker = self.walker(self.entry('freddie'), exceptions.NotFoundError('/folder/roger/'))
+
+        assert isinstance(self.write_tree(walker), exceptions.NotFoundError)
+        assert self.mixin.write.call_args[0][0] == utils.json_encode({
+            'code': 404,
+            'message': "Could not retrieve file or directory /folder/roger/",
+        }) + '\n'
+        assert walker.close.called
+
+    def test_error_before_flush(self):
+        self.mixin._headers_written = False
+        walker = self.walker(exceptions.NotFoundError('/folder/'))
+
+        assert isinstance(self.write_tree(walker), exceptions.NotFoundError)
+        assert not self.mixin.write.called
+
+
 @pytest.mark.skipif
 class TestGetFile(BaseMetadataMixinTest):
 
@@ -0,0 +1,142 @@
+import base64
+import hashlib
+from unittest import mock
+
+import pytest
+import tornado.ioloop
+import tornado.iostream
+import tornado.concurrent
+import tornado.http1connection
+import tornado.platform.asyncio
+
+from tests.utils import MockCoroutine
+
+from waterbutler.server import utils
+from waterbutler.core import exceptions
+from waterbutler.core.streams import FileStreamReader
+
+
+class TestParseContentDigests:
+
+    def test_sha256_header(self):
+        digest = hashlib.sha256(b'freddie').hexdigest()
+
+        assert utils.parse_content_digests({'X-Content-SHA256': digest.upper()}) == {'sha256': digest}
+
+    def test_digest_header(self):
+        header = 'SHA-256={}, MD5={}, sha={}'.format(*[
+            base64.b64encode(hashlib.new(name, b'freddie').digest()).decode()
+            for name in ('sha256', 'md5', 'sha1')
+        ])
+
+        assert utils.parse_content_digests({'Digest': header}) == {
+            'md5': hashlib.md5(b'freddie').hexdigest(),
+            'sha1': hashlib.sha1(b'freddie').hexdigest(),
+            'sha256': hashlib.sha256(b'freddie').hexdigest(),
+        }
+
+    def test_malformed(self):
+        assert utils.parse_content_digests({
+            'Digest': 'SHA-256=notbase64!, MD5={}, UNIXsum=30637'.format(base64.b64encode(b'short').decode()),
+            'X-Content-SHA256': 'z' * 64,
+        }) == {}
+
+    def test_none(self):
+        assert utils.parse_content_digests({}) == {}
+
+
+class TestPageCursors:
+
+    def test_round_trip(self):
+        for token in ('photos/2015/', '1200', 'Ünïcode/ü'):
+            cursor = utils.encode_page_cursor(token)
+
+            assert '=' not in cursor
+            assert utils.decode_page_cursor(cursor) == token
+
+    def test_malformed(self):
+        assert utils.decode_page_cursor('a') is None
+        assert utils.decode_page_cursor(base64.urlsafe_b64encode(b'\xff\xfe').decode()) is None
+
+
+class TestJsonEncode:
+
+    def test_compact(self):
+        assert utils.json_encode({'data': [1, 'two', None]}) == '{"data":[1,"two",null]}'
+
+    def test_escapes_script_tags(self):
+        assert utils.json_encode({'name': '</script>'}) == '{"name":"<\\/script>"}'
+
+
+class SendfileHandler(utils.UtilMixin):
+
+    def __init__(self, headers):
+        self._headers = headers
+        self._transforms = []
+        self.request = mock.Mock(method='GET', connection=mock.Mock(
+            spec=tornado.http1connection.HTTP1Connection,
+            stream=mock.Mock(),
+        ))
+
+    def flush(self):
+        future = tornado.concurrent.Future()
+        future.set_result(None)
+        return future
+
+
+@pytest.fixture
+def file_stream(tmpdir):
+    return FileStreamReader(open(str(tmpdir.join('freddie')), 'w+b'))
+
+
+@pytest.fixture
+def asyncio_loop(monkeypatch):
+    loop = mock.Mock(spec=tornado.platform.asyncio.BaseAsyncIOLoop)
+    monkeypatch.setattr(tornado.ioloop.IOLoop, 'current', staticmethod(lambda: loop))
+
+
+@pytest.mark.usefixtures('asyncio_loop')
+class TestCanSendfile:
+
+    def test_can_sendfile(self, file_stream):
+        assert SendfileHandler({'Content-Length': '7'})._can_sendfile(file_stream)
+
+    def test_requires_content_length(self, file_stream):
+        assert not SendfileHandler({})._can_sendfile(file_stream)
+
+    def test_requires_known_tornado(self, file_stream, monkeypatch):
+        monkeypatch.setattr(utils, 'SENDFILE_TORNADO_VERSIONS', ())
+
+        assert not SendfileHandler({'Content-Length': '7'})._can_sendfile(file_stream)
+
+    def test_requires_asyncio_loop(self, file_stream, monkeypatch):
+        monkeypatch.setattr(tornado.ioloop.IOLoop, 'current', staticmethod(mock.Mock))
+
+        assert not SendfileHandler({'Content-Length': '7'})._can_sendfile(file_stream)
+
+    def test_not_when_chunked(self, file_stream):
+        handler = SendfileHandler({'Content-Length': '7'})
+        handler.request.connection._chunking_output = True
+        file_stream.sendfile = mock.Mock()
+
+        # Headers flush at once, the coroutine is done without a running loop
+        assert handler._sendfile(file_stream).result() is False
+        assert not file_stream.sendfile.called
+
+    def test_disconnect_during_sendfile(self, file_stream):
+        handler = SendfileHandler({'Content-Length': '7'})
+        handler.request.connection._chunking_output = False
+        file_stream.sendfile = MockCoroutine(side_effect=BrokenPipeError)
+
+        with pytest.raises(tornado.iostream.StreamClosedError):
+            handler._sendfile(file_stream).result()
+        assert handler.request.connection.stream.close.called
+
+    def test_failed_sendfile_closes_connection(self, file_stream):
+        handler = SendfileHandler({'Content-Length': '7'})
+        handler.request.connection._chunking_output = False
+        file_stream.sendfile = MockCoroutine(side_effect=exceptions.DownloadError('short'))
+
+        with pytest.raises(exceptions.DownloadError):
+            handler._sendfile(file_stream).result()
+        assert handler.request.connection.stream.close.called
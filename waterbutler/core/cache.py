@@ -0,0 +1,191 @@
+import abc
+import copy
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import collections
+
+from stevedore import driver
+
+from waterbutler.core import settings
+
+
+class BaseCache(metaclass=abc.ABCMeta):
+    """The interface of metadata cache backends. A backend shared between processes, memcached or
+    redis for instance, must pickle values and may hash keys to fit its own limits.
+
+    .. note::
+        Backends are found by name in the ``waterbutler.cache`` entry point namespace and created
+        with ``METADATA_CACHE_OPTIONS`` as keyword arguments
+    """
+
+    @abc.abstractmethod
+    def get(self, key):
+        """The value stored for ``key``, None if it is missing or has expired
+
+        :param str key:
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store ``value`` under ``key``
+
+        :param str key:
+        :param int ttl: Seconds after which the entry expires, None to keep it until it is evicted
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, *keys):
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+    """Keeps entries in this process, evicting the least recently used beyond ``max_entries``"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.METADATA_CACHE_MAX_ENTRIES
+        # key -> (expires at or None, value), least recently used first
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @asyncio.coroutine
+    def get(self, key):
+        try:
+            expires, value = self._entries[key]
+        except KeyError:
+            return None
+
+        if expires is not None and expires <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    @asyncio.coroutine
+    def set(self, key, value, ttl=None):
+        self._entries[key] = (None if ttl is None else time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @asyncio.coroutine
+    def delete(self, *keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+class MetadataCache:
+    """Caches the results of :meth:`BaseProvider.metadata` and :meth:`BaseProvider.validate_v1_path`
+    for the requests that only read. Entries are scoped to a provider's settings and credentials,
+    so no two accounts or projects ever share them, and expire after the provider's TTL.
+
+    Writes must call :meth:`invalidate` once they have succeeded, or failed part way through. Every
+    write drops all entries of its scope, as a moved or deleted file also changes the path to id
+    mappings of ``validate_v1_path`` and the listings of its ancestors.
+
+    Values are copied in and out of the backend, handlers are free to modify what they are given.
+
+    :param BaseCache backend:
+    :param int ttl: Seconds entries are kept for, defaults to ``METADATA_CACHE_TTL``
+    :param dict ttls: TTLs keyed by provider name, overriding ``ttl``. 0 disables the cache
+    """
+
+    def __init__(self, backend, ttl=None, ttls=None):
+        self.backend = backend
+        self.ttl = settings.METADATA_CACHE_TTL if ttl is None else ttl
+        self.ttls = settings.METADATA_CACHE_TTLS if ttls is None else ttls
+
+    def ttl_for(self, provider):
+        return self.ttls.get(provider.NAME, self.ttl)
+
+    @asyncio.coroutine
+    def metadata(self, provider, path, revision=None, **kwargs):
+        return (yield from self._cached(
+            provider, 'metadata', str(path), revision,
+            lambda: provider.metadata(path, revision=revision, **kwargs),
+        ))
+
+    @asyncio.coroutine
+    def validate_v1_path(self, provider, path, **kwargs):
+        return (yield from self._cached(
+            provider, 'validate', path, None,
+            lambda: provider.validate_v1_path(path, **kwargs),
+        ))
+
+    @asyncio.coroutine
+    def invalidate(self, provider):
+        """Drop every entry of ``provider``'s scope after a write to it"""
+        if not self.ttl_for(provider):
+            return
+
+        # Entries are keyed by generation, a new one orphans all of them at once
+        yield from self.backend.set(self._generation_key(provider), uuid.uuid4().hex)
+
+    @asyncio.coroutine
+    def _cached(self, provider, kind, path, revision, fetch):
+        ttl = self.ttl_for(provider)
+        if not ttl:
+            return (yield from fetch())
+
+        generation = yield from self._generation(provider)
+        key = self._key(provider, generation, kind, path, revision)
+
+        value = yield from self.backend.get(key)
+        if value is None:
+            # Failures are not cached, a 404 may well be followed by a create
+            value = yield from fetch()
+            yield from self.backend.set(key, copy.deepcopy(value), ttl=ttl)
+            return value
+
+        return copy.deepcopy(value)
+
+    @asyncio.coroutine
+    def _generation(self, provider):
+        key = self._generation_key(provider)
+        generation = yield from self.backend.get(key)
+        if generation is None:
+            # Never fall back to a fixed value, entries of an evicted generation must stay orphaned
+            generation = uuid.uuid4().hex
+            yield from self.backend.set(key, generation)
+        return generation
+
+    def _generation_key(self, provider):
+        return 'wb:generation:' + self._scope(provider)
+
+    def _key(self, provider, generation, kind, path, revision):
+        return 'wb:{}:'.format(kind) + hashlib.sha256(
+            json.dumps([self._scope(provider), generation, path, revision]).encode('utf-8')
+        ).hexdigest()
+
+    def _scope(self, provider):
+        # Hashed, credentials must not end up in a shared backend's keys
+        return hashlib.sha256(json.dumps(
+            [provider.NAME, provider.settings, provider.credentials],
+            sort_keys=True,
+            default=str,
+        ).encode('utf-8')).hexdigest()
+
+
+_metadata_cache = None
+
+
+def get_metadata_cache():
+    """The process wide :class:`MetadataCache`, its backend is created on first use"""
+    global _metadata_cache
+    if _metadata_cache is None:
+        backend = driver.DriverManager(
+            namespace='waterbutler.cache',
+            name=settings.METADATA_CACHE_BACKEND,
+            invoke_on_load=True,
+            invoke_kwds=settings.METADATA_CACHE_OPTIONS,
+        ).driver
+        _metadata_cache = MetadataCache(backend)
+    return _metadata_cache
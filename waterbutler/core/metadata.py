@@ -1,16 +1,38 @@
 import abc
 import hashlib
+import functools
+from urllib import parse
 
 import furl
 
 from waterbutler.server import settings
 
 
+@functools.lru_cache(maxsize=1024)
+def _entity_url_base(domain, resource, provider):
+    """The parts of an entity url shared by every path of ``resource`` on ``provider``, computed
+    once rather than for every item of a listing.
+
+    :rtype: (``str`` origin, ``str`` path prefix, ``str`` quoted path prefix)
+    """
+    url = furl.furl(domain)
+    segments = list(url.path.segments) + ['v1', 'resources', resource, 'providers', provider]
+    url.path.segments = []
+    return (
+        url.url.rstrip('/'),
+        '/'.join(segments),
+        '/'.join(parse.quote(segment, furl.Path.SAFE_SEGMENT_CHARS) for segment in segments),
+    )
+
+
 class BaseMetadata(metaclass=abc.ABCMeta):
     """The BaseMetadata object provides structure
     for all metadata returned via WaterButler
     """
 
+    # Subclasses that declare __slots__ of their own are instantiated without a __dict__
+    __slots__ = ('raw', '_etag_hash')
+
     def __init__(self, raw):
         self.raw = raw
 
@@ -26,9 +48,18 @@ class BaseMetadata(metaclass=abc.ABCMeta):
             'path': self.path,
             'provider': self.provider,
             'materialized': self.materialized_path,
-            'etag': hashlib.sha256('{}::{}'.format(self.provider, self.etag).encode('utf-8')).hexdigest(),
+            'etag': self.hashed_etag,
         }
 
+    @property
+    def hashed_etag(self):
+        """The etag as exposed by the API, hashed once and cached as metadata is not modified"""
+        try:
+            return self._etag_hash
+        except AttributeError:
+            self._etag_hash = hashlib.sha256('{}::{}'.format(self.provider, self.etag).encode('utf-8')).hexdigest()
+            return self._etag_hash
+
     def json_api_serialized(self, resource):
         """The JSON API serialization of metadata from WaterButler.
         .. warning::
@@ -52,16 +83,19 @@ class BaseMetadata(metaclass=abc.ABCMeta):
         return actions
 
     def _entity_url(self, resource):
-        url = furl.furl(settings.DOMAIN)
-        segments = ['v1', 'resources', resource, 'providers', self.provider]
-        # If self is a folder, path ends with a slash which must be preserved. However, furl
-        # percent-encodes the trailing slash. Instead, turn folders into a list of (path_id, ''),
-        # and let furl add the slash for us.  The [1:] is because path always begins with a slash,
-        # meaning the first entry is always ''.
-        segments += self.path.split('/')[1:]
-        url.path.segments.extend(segments)
-
-        return url.url
+        origin, prefix, quoted_prefix = _entity_url_base(settings.DOMAIN, resource, self.provider)
+        # If self is a folder, path ends with a slash which must be preserved, splitting it yields
+        # a trailing ''. The [1:] is because path always begins with a slash, meaning the first
+        # entry is always ''.
+        segments = self.path.split('/')[1:]
+
+        # Quoted as furl does, which leaves everything alone when any segment contains a %
+        if '%' in prefix or '%' in self.path:
+            return '/'.join([origin, prefix] + segments)
+        return '/'.join(
+            [origin, quoted_prefix] +
+            [parse.quote(segment, furl.Path.SAFE_SEGMENT_CHARS) for segment in segments]
+        )
 
     def build_path(self, path):
         if not path.startswith('/'):
@@ -136,6 +170,8 @@ class BaseMetadata(metaclass=abc.ABCMeta):
 
 class BaseFileMetadata(BaseMetadata):
 
+    __slots__ = ()
+
     def serialized(self):
         return dict(super().serialized(), **{
             'contentType': self.content_type,
@@ -145,7 +181,8 @@ class BaseFileMetadata(BaseMetadata):
 
     def _json_api_links(self, resource):
         ret = super()._json_api_links(resource)
-        ret['download'] = self._entity_url(resource)
+        # Every link is addressed to the entity url, reuse it rather than building it again
+        ret['download'] = ret['delete']
         return ret
 
     @property
@@ -172,6 +209,8 @@ class BaseFileMetadata(BaseMetadata):
 
 class BaseFileRevisionMetadata(metaclass=abc.ABCMeta):
 
+    __slots__ = ('raw', )
+
     def __init__(self, raw):
         self.raw = raw
 
@@ -219,6 +258,8 @@ class BaseFolderMetadata(BaseMetadata):
     folders, auto defines :func:`kind`
     """
 
+    __slots__ = ('_children', )
+
     def __init__(self, raw):
         super().__init__(raw)
         self._children = None
@@ -236,7 +277,7 @@ class BaseFolderMetadata(BaseMetadata):
 
     def _json_api_links(self, resource):
         ret = super()._json_api_links(resource)
-        ret['new_folder'] = self._entity_url(resource) + '?kind=folder'
+        ret['new_folder'] = ret['delete'] + '?kind=folder'
         return ret
 
     @property
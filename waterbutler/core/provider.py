@@ -1,5 +1,6 @@
 import abc
 import asyncio
+import functools
 import itertools
 from urllib import parse
 
@@ -7,7 +8,9 @@ import furl
 import aiohttp
 
 from waterbutler.core import streams
+from waterbutler.core import settings
 from waterbutler.core import exceptions
+from waterbutler.core.tree import TreeWalker
 
 
 def build_url(base, *segments, **query):
@@ -107,7 +110,8 @@ class BaseProvider(metaclass=abc.ABCMeta):
 
         :param str method: The HTTP method
         :param str url: The url to send the request to
-        :keyword range: An optional tuple (start, end) that is transformed into a Range header
+        :keyword range: An optional tuple (start, end) that is transformed into a Range header,
+            see :meth:`BaseProvider.download` for its semantics
         :keyword expects: An optional tuple of HTTP status codes as integers raises an exception
             if the returned status code is not in it.
         :type expects: tuple of ints
@@ -186,12 +190,32 @@ class BaseProvider(metaclass=abc.ABCMeta):
         if src_path.is_dir:
             return (yield from self._folder_file_op(self.copy, *args, **kwargs))
 
-        download_stream = yield from self.download(src_path)
+        download_stream = yield from self._download_for_copy(src_path)
 
         if getattr(download_stream, 'name', None):
             dest_path.rename(download_stream.name)
 
-        return (yield from dest_provider.upload(download_stream, dest_path))
+        try:
+            return (yield from dest_provider.upload(download_stream, dest_path))
+        finally:
+            if isinstance(download_stream, streams.SegmentedStreamReader):
+                # Stop the range requests still in flight should the upload have failed
+                download_stream.cancel()
+
+    @asyncio.coroutine
+    def _download_for_copy(self, path):
+        """Opens ``path`` for copying to another provider. Large files are read as several
+        concurrent range requests when :meth:`can_download_ranges` allows it.
+
+        :rtype: :class:`waterbutler.core.streams.BaseStream`
+        """
+        if self.can_download_ranges(path):
+            metadata = yield from self.metadata(path)
+            size = getattr(metadata, 'size', None)
+            if size is not None and int(size) > settings.SEGMENTED_DOWNLOAD_THRESHOLD:
+                return streams.SegmentedStreamReader(functools.partial(self.download, path), int(size))
+
+        return (yield from self.download(path))
 
     @asyncio.coroutine
     def _folder_file_op(self, func, dest_provider, src_path, dest_path, **kwargs):
@@ -286,6 +310,32 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         return False
 
+    @asyncio.coroutine
+    def upload_from_digest(self, path, hashes, **kwargs):
+        """Create or update ``path`` from content this provider already holds, identified by the
+        hashes a client declared for its upload, without reading the upload itself.
+
+        .. note::
+            Defaults to None, the body is always required
+
+        :param waterbutler.core.path.WaterButlerPath path: The file being uploaded
+        :param dict hashes: Hex digests keyed by ``md5``, ``sha1`` and ``sha256``, as available
+        :rtype: (:class:`waterbutler.core.metadata.BaseFileMetadata`, :class:`bool`) or None
+        """
+        return None
+
+    def can_download_ranges(self, path=None):
+        """Indicates if byte ranges of `path` are served by the upstream service itself,
+        rather than by :meth:`apply_range` skipping through the entire file.
+
+        .. note::
+            Defaults to False
+
+        :param waterbutler.core.path.WaterButlerPath path: The file that will be downloaded
+        :rtype: bool
+        """
+        return False
+
     def can_intra_move(self, other, path=None):
         """Indicates if a quick move can be performed
         between the current and `other`.
@@ -385,6 +435,14 @@ class BaseProvider(metaclass=abc.ABCMeta):
     def download(self, **kwargs):
         """Download a file from this provider.
 
+        Every provider accepts a ``range`` keyword, a ``(start, end)`` tuple of byte offsets
+        following the HTTP Range header: both ends are inclusive, ``(start, None)`` reads from
+        ``start`` to the end of the file and ``(None, n)`` reads the last ``n`` bytes. When a range is
+        given the returned stream must report ``partial`` and a ``content_range`` and its ``size``
+        must be the length of the range. Providers that cannot ask their upstream for a range
+        should pass their stream through :meth:`apply_range`. An unsatisfiable range raises a
+        :class:`DownloadError` with a 416 code.
+
         :param dict \*\*kwargs: Arguments to be parsed by child classes
         :rtype: :class:`waterbutler.core.streams.ResponseStreamReader`
         :raises: :class:`waterbutler.core.exceptions.DownloadError`
@@ -423,6 +481,46 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    @asyncio.coroutine
+    def metadata_page(self, path, cursor=None, size=None, **kwargs):
+        """Get a single page of the children of the folder ``path``. ``cursor`` is the continuation
+        token returned alongside the previous page, None for the first one. Providers whose
+        listings are paginated upstream should pass their own continuation tokens through.
+
+        .. note::
+            Defaults to slicing the full listing from :meth:`metadata`, the cursor is an offset
+
+        :param waterbutler.core.path.WaterButlerPath path: The folder to list
+        :param str cursor: Where to continue the listing from
+        :param int size: The maximum number of children to return, None for all of them
+        :rtype: (:class:`list` of :class:`waterbutler.core.metadata.BaseMetadata`, :class:`str` or None)
+        :raises: :class:`waterbutler.core.exceptions.InvalidParameters`
+        """
+        start = self._parse_offset_cursor(cursor)
+        children = yield from self.metadata(path, **kwargs)
+
+        end = len(children) if size is None else start + size
+        return children[start:end], (str(end) if end < len(children) else None)
+
+    def walk(self, path, max_depth=None):
+        """Lazily list every descendant of the folder ``path``, see :class:`waterbutler.core.tree.TreeWalker`
+
+        :param int max_depth: Do not descend further than this, 1 lists the direct children only
+        :rtype: :class:`waterbutler.core.tree.TreeWalker`
+        """
+        return TreeWalker(self, path, max_depth=max_depth)
+
+    def _parse_offset_cursor(self, cursor):
+        if cursor is None:
+            return 0
+        try:
+            offset = int(cursor)
+        except ValueError:
+            offset = -1
+        if offset < 0:
+            raise exceptions.InvalidParameters('Invalid page cursor')
+        return offset
+
     @abc.abstractmethod
     def validate_v1_path(self, path, **kwargs):
         """API v1 requires that requests against folder endpoints always end with a slash, and
@@ -455,6 +553,48 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         raise exceptions.ProviderError({'message': 'Folder creation not supported.'}, code=405)
 
+    def apply_range(self, stream, range):
+        """Ensures ``stream`` honours ``range``, as described by :meth:`download`. Streams that
+        upstream already answered partially are returned untouched, otherwise the unwanted bytes
+        are read and discarded. Streams of unknown size are returned whole, as HTTP allows.
+
+        :param stream: The stream of the entire file
+        :param tuple range: The requested range or None
+        :rtype: :class:`waterbutler.core.streams.BaseStream`
+        :raises: :class:`waterbutler.core.exceptions.DownloadError`
+        """
+        if range is None or getattr(stream, 'partial', False) or stream.size is None:
+            return stream
+
+        start, end = self._resolve_range(range, stream.size)
+        return streams.PartialStreamReader(stream, start, end, stream.size)
+
+    def _resolve_range(self, range, size):
+        """Converts ``range`` into absolute, inclusive ``(start, end)`` offsets into a file of
+        ``size`` bytes, clamping ``end`` to the last byte
+
+        :raises: :class:`waterbutler.core.exceptions.DownloadError` if the range is unsatisfiable
+        """
+        start, end = range
+        if start is None:
+            start, end = max(size - (end or 0), 0), size - 1
+            if end < start:
+                start = size  # "bytes=-0" selects nothing
+        elif end is None or end >= size:
+            end = size - 1
+
+        if start >= size or end < start:
+            raise exceptions.DownloadError(
+                'Requested range not satisfiable: bytes={}-{} of {}'.format(
+                    '' if range[0] is None else range[0],
+                    '' if range[1] is None else range[1],
+                    size,
+                ),
+                code=416,
+            )
+
+        return start, end
+
     def _build_range_header(self, slice_tup):
         start, end = slice_tup
         return 'bytes={}-{}'.format(
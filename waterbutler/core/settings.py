@@ -0,0 +1,43 @@
+try:
+    from waterbutler import settings
+except ImportError:
+    settings = {}
+
+config = settings.get('CORE_CONFIG', {})
+
+
+CHUNK_SIZE = config.get('CHUNK_SIZE', 65536)  # 64KB
+
+# Spooled uploads smaller than this stay in memory, larger ones are written to SPOOL_DIR
+SPOOL_MAX_MEMORY = config.get('SPOOL_MAX_MEMORY', 8 * 1024 * 1024)  # 8MB
+SPOOL_DIR = config.get('SPOOL_DIR', None)  # None uses the platform's temp directory
+
+# Cross provider copies of files larger than SEGMENTED_DOWNLOAD_THRESHOLD, from providers that can
+# serve byte ranges, are downloaded as SEGMENT_SIZE ranges, SEGMENT_CONCURRENCY of them at a time
+SEGMENTED_DOWNLOAD_THRESHOLD = config.get('SEGMENTED_DOWNLOAD_THRESHOLD', 64 * 1024 * 1024)  # 64MB
+SEGMENT_SIZE = config.get('SEGMENT_SIZE', 8 * 1024 * 1024)  # 8MB
+SEGMENT_CONCURRENCY = config.get('SEGMENT_CONCURRENCY', 4)
+
+# Parts and chunks of uploads, and of copies, that fail are retried up to RETRIES times, waiting
+# RETRY_BACKOFF seconds multiplied by the attempt in between
+RETRIES = config.get('RETRIES', 3)
+RETRY_BACKOFF = config.get('RETRY_BACKOFF', 1)
+
+# Each branch of a TeeStream buffers at most this much before the source waits on it
+TEE_HIGH_WATER = config.get('TEE_HIGH_WATER', 1024 * 1024)  # 1MB
+
+# Recursive folder listings list up to TREE_CONCURRENCY folders at a time, running ahead of the
+# client by at most TREE_BUFFER_SIZE entries
+TREE_CONCURRENCY = config.get('TREE_CONCURRENCY', 4)
+TREE_BUFFER_SIZE = config.get('TREE_BUFFER_SIZE', 1000)
+
+# Metadata read by v1 GET and HEAD requests is cached by METADATA_CACHE_BACKEND, the name of a
+# waterbutler.cache entry point created with METADATA_CACHE_OPTIONS. Entries live for
+# METADATA_CACHE_TTL seconds, unless the provider has its own in METADATA_CACHE_TTLS, 0 disables.
+# Off by default: the memory backend is private to each process, so a deployment running more than
+# one must share a backend between them or a client may not read its own writes
+METADATA_CACHE_BACKEND = config.get('METADATA_CACHE_BACKEND', 'memory')
+METADATA_CACHE_OPTIONS = config.get('METADATA_CACHE_OPTIONS', {})
+METADATA_CACHE_MAX_ENTRIES = config.get('METADATA_CACHE_MAX_ENTRIES', 10000)  # memory backend
+METADATA_CACHE_TTL = config.get('METADATA_CACHE_TTL', 0)
+METADATA_CACHE_TTLS = config.get('METADATA_CACHE_TTLS', {})
@@ -4,15 +4,30 @@ from waterbutler.core.streams.base import MultiStream  # noqa
 from waterbutler.core.streams.base import StringStream  # noqa
 
 from waterbutler.core.streams.file import FileStreamReader  # noqa
+from waterbutler.core.streams.file import PartialFileStreamReader  # noqa
+
+from waterbutler.core.streams.partial import PartialStreamReader  # noqa
+
+from waterbutler.core.streams.segmented import SegmentedStreamReader  # noqa
 
 from waterbutler.core.streams.http import FormDataStream  # noqa
 from waterbutler.core.streams.http import RequestStreamReader  # noqa
 from waterbutler.core.streams.http import ResponseStreamReader  # noqa
 
 from waterbutler.core.streams.metadata import HashStreamWriter  # noqa
+from waterbutler.core.streams.metadata import TreeHashStreamWriter  # noqa
+
+from waterbutler.core.streams.pipe import BufferedPipe  # noqa
+
+from waterbutler.core.streams.tee import TeeBranch  # noqa
+from waterbutler.core.streams.tee import TeeStream  # noqa
+
+from waterbutler.core.streams.spool import SpooledStream  # noqa
 
 from waterbutler.core.streams.zip import ZipStreamReader  # noqa
+from waterbutler.core.streams.zip import SizedZipStreamReader  # noqa
 
 from waterbutler.core.streams.base64 import Base64EncodeStream  # noqa
+from waterbutler.core.streams.base64 import BatchedBase64EncodeStream  # noqa
 
 from waterbutler.core.streams.json import JSONStream  # noqa
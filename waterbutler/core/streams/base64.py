@@ -1,5 +1,6 @@
 import base64
 import asyncio
+import binascii
 
 
 class Base64EncodeStream(asyncio.StreamReader):
@@ -47,3 +48,79 @@ class Base64EncodeStream(asyncio.StreamReader):
 
     def at_eof(self):
         return len(self.extra) == 0 and self.stream.at_eof()
+
+
+class BatchedBase64EncodeStream(asyncio.StreamReader):
+    """Base64 encodes a stream in large batches, for bodies too big to encode in small chunks on the
+    event loop. Each batch of ``batch_size`` bytes, rounded down to a multiple of 3 so that padding
+    only ever ends the output, is encoded in the default executor. Encoded output is handed out as
+    slices of a memoryview rather than by re-slicing and concatenating bytes.
+    """
+
+    BATCH_SIZE = 3 * 256 * 1024  # 768KB
+
+    # Batches smaller than this are encoded inline, a trip to the executor would cost more
+    INLINE_SIZE = 3 * 64 * 1024
+
+    @staticmethod
+    def calculate_encoded_size(size):
+        return 4 * ((size + 2) // 3)
+
+    def __init__(self, stream, batch_size=None, **kwargs):
+        self.stream = stream
+        batch_size = batch_size or self.BATCH_SIZE
+        self.batch_size = max(3, batch_size - batch_size % 3)
+
+        if stream.size is None:
+            self._size = None
+        else:
+            self._size = self.calculate_encoded_size(stream.size)
+
+        self._encoded = memoryview(b'')
+        self._source_done = False
+
+        super().__init__(**kwargs)
+
+    @property
+    def size(self):
+        return self._size
+
+    @asyncio.coroutine
+    def read(self, n=-1):
+        if n < 0:
+            chunks = []
+            while not self.at_eof():
+                chunks.append((yield from self.read(self.batch_size)))
+            return b''.join(chunks)
+
+        if not self._encoded and not self._source_done:
+            yield from self._encode_batch()
+
+        chunk, self._encoded = self._encoded[:n], self._encoded[n:]
+        return bytes(chunk)
+
+    def at_eof(self):
+        return self._source_done and not self._encoded
+
+    @asyncio.coroutine
+    def _encode_batch(self):
+        batch = bytearray()
+
+        # Filled up to the batch size, a multiple of 3, so only the last batch may need padding
+        while len(batch) < self.batch_size:
+            chunk = yield from self.stream.read(self.batch_size - len(batch))
+            if not chunk:
+                self._source_done = True
+                break
+            batch += chunk
+            if self.stream.at_eof():
+                self._source_done = True
+                break
+
+        if len(batch) < self.INLINE_SIZE:
+            encoded = binascii.b2a_base64(batch)
+        else:
+            encoded = yield from asyncio.get_event_loop().run_in_executor(None, binascii.b2a_base64, batch)
+
+        # b2a_base64 always appends a newline
+        self._encoded = memoryview(encoded)[:-1]
@@ -1,6 +1,8 @@
+import io
 import os
 import asyncio
 
+from waterbutler.core import exceptions
 from waterbutler.core.streams import BaseStream
 
 
@@ -21,10 +23,23 @@ class FileStreamReader(BaseStream):
         self.file_pointer.seek(cursor)
         return ret
 
+    @property
+    def can_sendfile(self):
+        try:
+            self.file_pointer.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            return False
+        return True
+
     def close(self):
         self.file_pointer.close()
         self.feed_eof()
 
+    def rewind(self):
+        """Start reading from the first byte again"""
+        self.file_gen = None
+        self._eof = False
+
     def read_as_gen(self):
         self.file_pointer.seek(0)
         while True:
@@ -44,3 +59,85 @@ class FileStreamReader(BaseStream):
         except StopIteration:
             self.feed_eof()
             return b''
+
+    @asyncio.coroutine
+    def sendfile(self, sock, offset=0, count=None):
+        """Write ``count`` bytes of the file starting at ``offset`` directly to the non-blocking
+        socket ``sock`` with :func:`os.sendfile`, skipping the userspace copy made by :meth:`read`.
+
+        :rtype: int
+        :returns: The number of bytes sent, always ``count``
+        :raises DownloadError: If the file ends before ``count`` bytes were sent
+        :raises ConnectionError: If the peer has closed the socket
+        """
+        loop = asyncio.get_event_loop()
+        if count is None:
+            count = self.size - offset
+
+        sent = 0
+        while sent < count:
+            try:
+                written = os.sendfile(sock.fileno(), self.file_pointer.fileno(), offset + sent, count - sent)
+            except BlockingIOError:
+                yield from _wait_writable(loop, sock)
+                continue
+            if written == 0:
+                # Truncated since its size was taken, the response would end short of its length
+                raise exceptions.DownloadError(
+                    'File ended {} bytes short of the {} bytes to send'.format(count - sent, count)
+                )
+            sent += written
+
+        self.feed_eof()
+        return sent
+
+
+class PartialFileStreamReader(FileStreamReader):
+    """Streams the bytes ``start`` through ``end``, inclusive, of a file, for answering range requests"""
+
+    def __init__(self, file_pointer, start, end):
+        super().__init__(file_pointer)
+        self.start = start
+        self.end = end
+        self.total_size = super().size
+
+    @property
+    def size(self):
+        return self.end - self.start + 1
+
+    @property
+    def partial(self):
+        return True
+
+    @property
+    def content_range(self):
+        return 'bytes {}-{}/{}'.format(self.start, self.end, self.total_size)
+
+    def read_as_gen(self):
+        self.file_pointer.seek(self.start)
+        remaining = self.size
+        while remaining > 0:
+            if self.read_size is None or self.read_size < 0:
+                data = self.file_pointer.read(remaining)
+            else:
+                data = self.file_pointer.read(min(self.read_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+    @asyncio.coroutine
+    def sendfile(self, sock, offset=0, count=None):
+        if count is None:
+            count = self.size - offset
+        return (yield from super().sendfile(sock, offset=self.start + offset, count=count))
+
+
+@asyncio.coroutine
+def _wait_writable(loop, sock):
+    waiter = asyncio.Future(loop=loop)
+    loop.add_writer(sock.fileno(), waiter.set_result, None)
+    try:
+        yield from waiter
+    finally:
+        loop.remove_writer(sock.fileno())
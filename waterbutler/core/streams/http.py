@@ -192,7 +192,10 @@ class RequestStreamReader(BaseStream):
 
     @property
     def size(self):
-        return int(self.request.headers.get('Content-Length'))
+        # Chunked request bodies have no length
+        if 'Content-Length' not in self.request.headers:
+            return None
+        return int(self.request.headers['Content-Length'])
 
     def at_eof(self):
         return self.inner.at_eof()
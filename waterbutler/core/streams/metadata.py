@@ -1,8 +1,16 @@
+import hashlib
+import binascii
+
+
 class HashStreamWriter:
     """Stream-like object that hashes and discards its input."""
     def __init__(self, hasher):
         self.hash = hasher()
 
+    @property
+    def digest(self):
+        return self.hash.digest()
+
     @property
     def hexdigest(self):
         return self.hash.hexdigest()
@@ -15,3 +23,57 @@ class HashStreamWriter:
 
     def close(self):
         pass
+
+
+class TreeHashStreamWriter:
+    """Stream-like object that computes the SHA-256 tree hash of its input, the checksum Amazon
+    Glacier expects: the SHA-256 of every 1MB chunk, combined pairwise until one remains.
+    """
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self):
+        self.chunk_hashes = []
+        self._chunk = hashlib.sha256()
+        self._chunk_length = 0
+
+    @property
+    def digest(self):
+        hashes = list(self.chunk_hashes)
+        if self._chunk_length or not hashes:
+            hashes.append(self._chunk.digest())
+        return tree_hash(hashes)
+
+    @property
+    def hexdigest(self):
+        return binascii.hexlify(self.digest).decode()
+
+    def can_write_eof(self):
+        return False
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            taken = view[:self.CHUNK_SIZE - self._chunk_length]
+            self._chunk.update(taken)
+            self._chunk_length += len(taken)
+            view = view[len(taken):]
+
+            if self._chunk_length == self.CHUNK_SIZE:
+                self.chunk_hashes.append(self._chunk.digest())
+                self._chunk = hashlib.sha256()
+                self._chunk_length = 0
+
+    def close(self):
+        pass
+
+
+def tree_hash(hashes):
+    """Combines a list of SHA-256 digests into their tree hash. Also combines the tree hashes of
+    consecutive parts of a file into that of the whole, provided every part but the last is a power
+    of two megabytes long.
+    """
+    hashes = list(hashes)
+    while len(hashes) > 1:
+        pairs = [hashes[i:i + 2] for i in range(0, len(hashes), 2)]
+        hashes = [hashlib.sha256(b''.join(pair)).digest() if len(pair) == 2 else pair[0] for pair in pairs]
+    return hashes[0]
@@ -0,0 +1,60 @@
+import asyncio
+
+from waterbutler.core import settings
+from waterbutler.core.streams import BaseStream
+
+
+class PartialStreamReader(BaseStream):
+    """Serves the bytes ``start`` through ``end``, inclusive, of a stream that cannot seek, by reading
+    and discarding everything before ``start`` and stopping after ``end``. Used to honour range
+    requests against providers that always send the entire file.
+    """
+
+    def __init__(self, stream, start, end, total_size):
+        super().__init__()
+        self.stream = stream
+        self.start = start
+        self.end = end
+        self.total_size = total_size
+        self._skip = start
+        self._remaining = end - start + 1
+
+    @property
+    def partial(self):
+        return True
+
+    @property
+    def content_range(self):
+        return 'bytes {}-{}/{}'.format(self.start, self.end, self.total_size)
+
+    @property
+    def content_type(self):
+        return getattr(self.stream, 'content_type', 'application/octet-stream')
+
+    @property
+    def name(self):
+        return getattr(self.stream, 'name', None)
+
+    @property
+    def size(self):
+        return self.end - self.start + 1
+
+    @asyncio.coroutine
+    def _read(self, n=-1):
+        while self._skip > 0:
+            skipped = yield from self.stream.read(min(self._skip, settings.CHUNK_SIZE))
+            if not skipped:
+                break
+            self._skip -= len(skipped)
+
+        if self._remaining <= 0:
+            self.feed_eof()
+            return b''
+
+        chunk = yield from self.stream.read(self._remaining if n < 0 else min(n, self._remaining))
+        self._remaining -= len(chunk)
+
+        if not chunk or self._remaining <= 0 or self.stream.at_eof():
+            self.feed_eof()
+
+        return chunk
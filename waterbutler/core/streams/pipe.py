@@ -0,0 +1,71 @@
+import asyncio
+
+
+class BufferedPipe(asyncio.StreamReader):
+    """An in-memory pipe for handing a request body from tornado's ``data_received`` to a
+    provider's upload. The producer side mirrors :class:`asyncio.StreamWriter`, ``write`` followed
+    by ``drain``, and the consumer reads it like any other :class:`asyncio.StreamReader`.
+
+    Once more than ``high_water`` bytes are buffered ``drain`` blocks, and with it tornado's reading
+    of the request body, until the consumer has brought the buffer down to ``low_water`` bytes.
+    """
+
+    def __init__(self, high_water=2 ** 20, low_water=None, **kwargs):
+        super().__init__(**kwargs)
+        self.high_water = high_water
+        self.low_water = high_water // 4 if low_water is None else low_water
+        self._closed = False
+        self._drain_waiter = None
+
+    @property
+    def buffered(self):
+        return len(self._buffer)
+
+    def write(self, data):
+        if not self._closed:
+            self.feed_data(data)
+
+    def can_write_eof(self):
+        return True
+
+    def write_eof(self):
+        self.feed_eof()
+
+    def close(self):
+        """Stop accepting data and release a blocked producer. Used when the consumer has gone away,
+        any further writes are discarded.
+        """
+        self._closed = True
+        self._buffer.clear()
+        self.feed_eof()
+        self._wake_drain(force=True)
+
+    @asyncio.coroutine
+    def drain(self):
+        if self._closed or self.buffered <= self.high_water:
+            return
+        if self._drain_waiter is None:
+            self._drain_waiter = asyncio.Future(loop=self._loop)
+        yield from self._drain_waiter
+
+    @asyncio.coroutine
+    def read(self, n=-1):
+        try:
+            return (yield from super().read(n))
+        finally:
+            self._wake_drain()
+
+    @asyncio.coroutine
+    def readexactly(self, n):
+        try:
+            return (yield from super().readexactly(n))
+        finally:
+            self._wake_drain()
+
+    def _wake_drain(self, force=False):
+        if self._drain_waiter is None:
+            return
+        if force or self.buffered <= self.low_water:
+            waiter, self._drain_waiter = self._drain_waiter, None
+            if not waiter.done():
+                waiter.set_result(None)
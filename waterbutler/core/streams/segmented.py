@@ -0,0 +1,112 @@
+import asyncio
+import collections
+
+from waterbutler.core import settings
+from waterbutler.core import exceptions
+from waterbutler.core.streams import BaseStream
+
+
+class SegmentedStreamReader(BaseStream):
+    """Reads a file of known ``size`` as a series of ``segment_size`` byte ranges, fetched
+    ``concurrency`` at a time and handed out in order. At most ``concurrency`` segments are held in
+    memory at once, counting the one being read; the next is requested once it has been read.
+
+    Readers that stop early must call :meth:`cancel`, or the segments in flight keep downloading.
+
+    :param fetch: A coroutine function accepting a ``range`` keyword, usually a bound
+        :meth:`BaseProvider.download` with the path filled in
+    """
+
+    def __init__(self, fetch, size, segment_size=None, concurrency=None):
+        super().__init__()
+        self.fetch = fetch
+        self._size = size
+        self.segment_size = segment_size or settings.SEGMENT_SIZE
+        self.concurrency = concurrency or settings.SEGMENT_CONCURRENCY
+
+        self._offsets = iter(range(0, size, self.segment_size))
+        self._pending = collections.deque()
+        self._segment = memoryview(b'')
+        self._started = False
+
+    @property
+    def size(self):
+        return self._size
+
+    def cancel(self):
+        """Abandon any segments still in flight"""
+        while self._pending:
+            task = self._pending.popleft()
+            if not task.cancel() and not task.cancelled():
+                # Already failed, retrieve the exception so it is not logged as never retrieved
+                task.exception()
+
+    def _schedule(self):
+        start = next(self._offsets, None)
+        if start is not None:
+            end = min(start + self.segment_size, self._size) - 1
+            self._pending.append(asyncio.async(self._fetch_segment(start, end)))
+
+    @asyncio.coroutine
+    def _fetch_segment(self, start, end):
+        expected = end - start + 1
+        stream = yield from self.fetch(range=(start, end))
+
+        try:
+            data = bytearray()
+            while len(data) < expected:
+                chunk = yield from stream.read(expected - len(data))
+                if not chunk:
+                    break
+                data.extend(chunk)
+
+            if len(data) != expected or not getattr(stream, 'partial', False):
+                raise exceptions.DownloadError(
+                    'Expected bytes {}-{} of {} but received {} bytes'.format(start, end, self._size, len(data))
+                )
+        except BaseException:
+            # Cancelled or unusable, the rest of the response is never read
+            if getattr(stream, 'response', None) is not None:
+                stream.response.close()
+            raise
+
+        return data
+
+    @asyncio.coroutine
+    def _next_segment(self):
+        # The previous segment has been read, its slot goes to the next range
+        self._segment = memoryview(b'')
+        if not self._started:
+            self._started = True
+            for _ in range(self.concurrency - 1):
+                self._schedule()
+        self._schedule()
+
+        if not self._pending:
+            return False
+
+        try:
+            self._segment = memoryview((yield from self._pending.popleft()))
+        except Exception:
+            self.cancel()
+            raise
+
+        return True
+
+    @asyncio.coroutine
+    def _read(self, n=-1):
+        if n < 0:
+            chunks = [bytes(self._segment)]
+            while (yield from self._next_segment()):
+                chunks.append(bytes(self._segment))
+            self._segment = memoryview(b'')
+            self.feed_eof()
+            return b''.join(chunks)
+
+        while not self._segment:
+            if not (yield from self._next_segment()):
+                self.feed_eof()
+                return b''
+
+        chunk, self._segment = bytes(self._segment[:n]), self._segment[n:]
+        return chunk
@@ -0,0 +1,97 @@
+import io
+import asyncio
+import tempfile
+
+from waterbutler.core import settings
+from waterbutler.core.streams import BaseStream
+
+
+class SpooledStream(BaseStream):
+    """Buffers the entirety of another stream so that its exact size is known before it is sent and
+    it may be read again, e.g. to retry a failed upload. Streams smaller than ``max_memory`` bytes
+    are kept in memory, larger ones roll over to a temporary file in ``spool_dir``.
+
+    The source is consumed on the first read, or explicitly with :meth:`spool`. Call :meth:`close`
+    once done, the temporary file, if any, is removed when closed.
+
+    Note: Readers and writers should be attached to the source stream, those attached here are fed
+    again on every pass after a :meth:`rewind`.
+    """
+
+    def __init__(self, stream, max_memory=None, spool_dir=None):
+        super().__init__()
+        self.stream = stream
+        self.max_memory = settings.SPOOL_MAX_MEMORY if max_memory is None else max_memory
+        self.spool_dir = settings.SPOOL_DIR if spool_dir is None else spool_dir
+        self.content_type = getattr(stream, 'content_type', 'application/octet-stream')
+
+        self._file = io.BytesIO()
+        self._size = None
+        self._spooled = False
+        self._on_disk = False
+
+    @property
+    def size(self):
+        if self._spooled:
+            return self._size
+        return self.stream.size
+
+    @property
+    def name(self):
+        return getattr(self.stream, 'name', None)
+
+    @property
+    def in_memory(self):
+        return not self._on_disk
+
+    @asyncio.coroutine
+    def spool(self):
+        """Read the source stream to its end. Safe to call more than once."""
+        if self._spooled:
+            return
+
+        loop = asyncio.get_event_loop()
+        chunk = yield from self.stream.read(settings.CHUNK_SIZE)
+        while chunk:
+            if not self._on_disk and self._file.tell() + len(chunk) > self.max_memory:
+                yield from loop.run_in_executor(None, self._rollover)
+            if self._on_disk:
+                yield from loop.run_in_executor(None, self._file.write, chunk)
+            else:
+                self._file.write(chunk)
+            chunk = yield from self.stream.read(settings.CHUNK_SIZE)
+
+        self._size = self._file.tell()
+        self._file.seek(0)
+        self._spooled = True
+
+    def rewind(self):
+        """Start reading from the first byte again"""
+        assert self._spooled, 'Cannot rewind a stream that has not been spooled'
+        self._file.seek(0)
+        self._eof = False
+
+    def close(self):
+        self._file.close()
+        self.feed_eof()
+
+    @asyncio.coroutine
+    def _read(self, n=-1):
+        yield from self.spool()
+
+        if self._on_disk:
+            data = yield from asyncio.get_event_loop().run_in_executor(None, self._file.read, n)
+        else:
+            data = self._file.read(n)
+
+        if self._file.tell() >= self._size:
+            self.feed_eof()
+
+        return data
+
+    def _rollover(self):
+        spool = tempfile.TemporaryFile(dir=self.spool_dir)
+        spool.write(self._file.getvalue())
+        self._file.close()
+        self._file = spool
+        self._on_disk = True
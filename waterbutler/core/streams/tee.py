@@ -0,0 +1,120 @@
+import asyncio
+
+from waterbutler.core import settings
+from waterbutler.core.streams import BaseStream
+from waterbutler.core.streams.pipe import BufferedPipe
+
+
+class TeeBranch(BaseStream):
+    """One output of a :class:`TeeStream`. Reads like the source stream it was split from, with the
+    same ``size``, ``name`` and ``content_type``, and may carry writers of its own.
+    """
+
+    def __init__(self, tee, high_water, low_water):
+        super().__init__()
+        self.tee = tee
+        self.pipe = BufferedPipe(high_water=high_water, low_water=low_water)
+
+    @property
+    def size(self):
+        return self.tee.stream.size
+
+    @property
+    def name(self):
+        return getattr(self.tee.stream, 'name', None)
+
+    @property
+    def content_type(self):
+        return getattr(self.tee.stream, 'content_type', 'application/octet-stream')
+
+    @property
+    def closed(self):
+        return self.pipe._closed
+
+    def close(self):
+        """Detach this branch, the tee will stop feeding it and no longer wait on it"""
+        self.pipe.close()
+
+    @asyncio.coroutine
+    def _read(self, n=-1):
+        data = yield from self.pipe.read(n)
+        if self.pipe.at_eof():
+            self.feed_eof()
+        return data
+
+
+class TeeStream:
+    """Reads ``stream`` exactly once and copies every chunk to each of its branches, so a single
+    pass over an upload can feed several consumers at the same time. Any readers or writers on the
+    source, hashers or a local file for instance, see the data once as usual.
+
+    Each branch buffers at most ``high_water`` bytes; the source is not read again until every live
+    branch has drained, so the slowest consumer sets the pace and memory stays bounded.
+    """
+
+    def __init__(self, stream, high_water=None, low_water=None):
+        self.stream = stream
+        self.high_water = high_water or settings.TEE_HIGH_WATER
+        self.low_water = low_water
+        self.branches = []
+
+    def branch(self):
+        branch = TeeBranch(self, self.high_water, self.low_water)
+        self.branches.append(branch)
+        return branch
+
+    @asyncio.coroutine
+    def pump(self):
+        """Copy the source into every branch that has not been closed, returning once the source is
+        exhausted or no branch is left to receive it. A failure reading the source is raised in
+        every branch as well as here.
+        """
+        try:
+            while True:
+                live = [branch for branch in self.branches if not branch.closed]
+                if not live:
+                    return
+
+                chunk = yield from self.stream.read(settings.CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                for branch in live:
+                    branch.pipe.write(chunk)
+                yield from asyncio.gather(*[branch.pipe.drain() for branch in live])
+        except Exception as e:
+            for branch in self.branches:
+                branch.pipe.set_exception(e)
+            raise
+
+        for branch in self.branches:
+            branch.pipe.write_eof()
+
+    @asyncio.coroutine
+    def run(self, *consumers):
+        """Give each of ``consumers``, coroutine functions accepting a single stream, a branch of
+        its own and drive them all from one pass over the source.
+
+        :returns: A list of the consumers' results, in order
+        :raises: The first exception raised by a consumer or the source, the rest are cancelled
+        """
+        tasks = []
+        for consumer in consumers:
+            branch = self.branch()
+            task = asyncio.async(consumer(branch))
+            # A consumer that has finished, for better or worse, must not hold up the others
+            task.add_done_callback(lambda _, branch=branch: branch.close())
+            tasks.append(task)
+
+        pump = asyncio.async(self.pump())
+
+        try:
+            results = yield from asyncio.gather(*tasks)
+            yield from pump
+        except Exception:
+            pump.cancel()
+            for task in tasks:
+                task.cancel()
+            raise
+
+        return results
@@ -10,6 +10,48 @@ from waterbutler.core.streams import MultiStream
 from waterbutler.core.streams import StringStream
 
 
+def end_of_central_directory(count, size, offset):
+    """The records closing an archive whose central directory of ``count`` entries is ``size``
+    bytes long and starts ``offset`` bytes in. Preceded by the zip64 end of central directory
+    record and its locator when any of these overflow their 16 or 32 bit fields.
+    """
+    records = b''
+    if count >= 0xFFFF or size > zipfile.ZIP64_LIMIT or offset > zipfile.ZIP64_LIMIT:
+        records += struct.pack(
+            zipfile.structEndArchive64,
+            zipfile.stringEndArchive64,
+            struct.calcsize(zipfile.structEndArchive64) - 12,  # Size of the remaining record
+            zipfile.ZIP64_VERSION,
+            zipfile.ZIP64_VERSION,
+            0,
+            0,
+            count,
+            count,
+            size,
+            offset,
+        )
+        records += struct.pack(
+            zipfile.structEndArchive64Locator,
+            zipfile.stringEndArchive64Locator,
+            0,
+            offset + size,  # Where the zip64 record starts
+            1,
+        )
+        count, size, offset = min(count, 0xFFFF), min(size, 0xFFFFFFFF), min(offset, 0xFFFFFFFF)
+
+    return records + struct.pack(
+        zipfile.structEndArchive,
+        zipfile.stringEndArchive,
+        0,
+        0,
+        count,
+        count,
+        size,
+        offset,
+        0,
+    )
+
+
 class ZipLocalFileDescriptor(BaseStream):
     """The descriptor (footer) for a local file in a zip archive
 
@@ -91,6 +133,10 @@ class ZipLocalFile(MultiStream):
     Note: This class is tightly coupled to ZipStreamReader, and should not be
     used separately
     """
+    # Whether the local header and descriptor carry 64 bit sizes, which must be known before the
+    # header is sent
+    zip64 = False
+
     def __init__(self, file_tuple):
         filename, stream = file_tuple
         filename = filename.strip('/')
@@ -105,6 +151,8 @@ class ZipLocalFile(MultiStream):
         self.zinfo.flag_bits |= 0x08
         # Initial CRC: value will be updated as file is streamed
         self.zinfo.CRC = 0
+        if self.zip64:
+            self.zinfo.extract_version = self.zinfo.create_version = zipfile.ZIP64_VERSION
 
         # define a compressor
         self.compressor = zlib.compressobj(
@@ -119,26 +167,47 @@ class ZipLocalFile(MultiStream):
 
         super().__init__(
             StringStream(self.local_header),
-            ZipLocalFileData(self, stream),
+            self.make_data_stream(stream),
             ZipLocalFileDescriptor(self),
         )
 
+    def make_data_stream(self, stream):
+        return ZipLocalFileData(self, stream)
+
     @property
     def local_header(self):
         """The file's header, for inclusion just before the content stream"""
-        return self.zinfo.FileHeader(zip64=False)
+        return self.zinfo.FileHeader(zip64=self.zip64)
 
     @property
     def directory_header(self):
         """The file's header, for inclusion in the archive's central directory
         """
+        return self.make_directory_header(self.original_size, self.compressed_size, self.zinfo.header_offset)
+
+    def make_directory_header(self, original_size, compressed_size, header_offset):
+        """The file's central directory header were it of these sizes and at this offset. Values
+        that overflow their 32 bit fields are moved to a zip64 extra field.
+        """
         dt = self.zinfo.date_time
 
         # modification date/time, in MSDOS format
         dosdate = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
         dostime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
 
+        zip64 = []
+        if original_size > zipfile.ZIP64_LIMIT or compressed_size > zipfile.ZIP64_LIMIT:
+            zip64 += [original_size, compressed_size]
+            original_size = compressed_size = 0xFFFFFFFF
+        if header_offset > zipfile.ZIP64_LIMIT:
+            zip64.append(header_offset)
+            header_offset = 0xFFFFFFFF
+
         extra_data = self.zinfo.extra
+        extract_version = self.zinfo.extract_version
+        if zip64:
+            extra_data = struct.pack('<HH' + 'Q' * len(zip64), 1, 8 * len(zip64), *zip64) + extra_data
+            extract_version = max(extract_version, zipfile.ZIP64_VERSION)
 
         filename, flag_bits = self.zinfo._encodeFilenameFlags()
         centdir = struct.pack(
@@ -146,22 +215,22 @@ class ZipLocalFile(MultiStream):
             zipfile.stringCentralDir,
             self.zinfo.create_version,
             self.zinfo.create_system,
-            self.zinfo.extract_version,
+            extract_version,
             self.zinfo.reserved,
             flag_bits,
             self.zinfo.compress_type,
             dostime,  # modification time
             dosdate,
             self.zinfo.CRC,
-            self.compressed_size,
-            self.original_size,
+            compressed_size,
+            original_size,
             len(self.zinfo.filename.encode('utf-8')),
             len(extra_data),
             len(self.zinfo.comment),
             0,
             self.zinfo.internal_attr,
             self.zinfo.external_attr,
-            self.zinfo.header_offset,
+            header_offset,
         )
 
         return centdir + filename + extra_data + self.zinfo.comment
@@ -169,7 +238,7 @@ class ZipLocalFile(MultiStream):
     @property
     def descriptor(self):
         """Local file data descriptor"""
-        fmt = '<4sLLL'
+        fmt = '<4sLQQ' if self.zip64 else '<4sLLL'
         signature = b'PK\x07\x08'  # magic number for data descriptor
 
         return struct.pack(
@@ -193,6 +262,99 @@ class ZipLocalFile(MultiStream):
         )
 
 
+class ZipLocalFileStoredData(BaseStream):
+    """Wraps a stream of known size in uncompressed ("stored") deflate blocks. The entry remains a
+    deflated one, which keeps it valid alongside a trailing data descriptor, but its compressed
+    size is known before a single byte has been read.
+
+    Note: This class is tightly coupled to SizedZipStreamReader, and should not be
+    used separately
+    """
+    BLOCK_SIZE = 65535  # The most a stored block may hold
+    BLOCK_HEADER_SIZE = 5  # BFINAL/BTYPE byte, padded to a byte boundary, then LEN and NLEN
+
+    @classmethod
+    def calculate_size(cls, size):
+        blocks = max(1, -(-size // cls.BLOCK_SIZE))
+        return size + blocks * cls.BLOCK_HEADER_SIZE
+
+    def __init__(self, file, stream, *args, **kwargs):
+        self.file = file
+        self.stream = stream
+        self._remaining = stream.size
+        self._size = self.calculate_size(stream.size)
+        self._block_left = 0
+        self._final = False
+        self._buffer = bytearray()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def size(self):
+        return self._size
+
+    @asyncio.coroutine
+    def _read(self, n=-1, *args, **kwargs):
+        ret = self._buffer
+
+        while (n == -1 or len(ret) < n) and not (self._final and self._block_left == 0):
+            if self._block_left == 0:
+                length = min(self.BLOCK_SIZE, self._remaining)
+                self._final = length == self._remaining
+                header = struct.pack('<BHH', int(self._final), length, length ^ 0xFFFF)
+
+                self.file.compressed_size += len(header)
+                self._block_left = length
+                ret += header
+                continue
+
+            chunk = yield from self.stream.read(self._block_left if n == -1 else min(self._block_left, n - len(ret)))
+            if not chunk:
+                raise ValueError('Stream ended {} bytes short of its declared size'.format(self._remaining))
+
+            # Update file info
+            self.file.original_size += len(chunk)
+            self.file.compressed_size += len(chunk)
+            self.file.zinfo.CRC = binascii.crc32(chunk, self.file.zinfo.CRC)
+
+            self._block_left -= len(chunk)
+            self._remaining -= len(chunk)
+            ret += chunk
+
+        # buffer any overages
+        if n != -1 and len(ret) > n:
+            self._buffer = ret[n:]
+            ret = ret[:n]
+        else:
+            self._buffer = bytearray()
+
+        if not self._buffer and self._final and self._block_left == 0:
+            self.feed_eof()
+
+        return bytes(ret)
+
+
+class SizedZipLocalFile(ZipLocalFile):
+    """A local file in a zip archive whose length is known up front
+
+    Note: This class is tightly coupled to SizedZipStreamReader, and should not be
+    used separately
+    """
+    def __init__(self, file_tuple):
+        _, stream = file_tuple
+        if stream.size is None:
+            raise ValueError('Sized zip archives require streams of known size')
+        self.zip64 = ZipLocalFileStoredData.calculate_size(stream.size) > zipfile.ZIP64_LIMIT
+        super().__init__(file_tuple)
+
+    def make_data_stream(self, stream):
+        self.data = ZipLocalFileStoredData(self, stream)
+        return self.data
+
+    @property
+    def size(self):
+        return len(self.local_header) + self.data.size + len(self.descriptor)
+
+
 class ZipArchiveCentralDirectory(BaseStream):
     """The central directory for a zip archive
 
@@ -218,19 +380,7 @@ class ZipArchiveCentralDirectory(BaseStream):
 
         file_headers = b''.join(file_headers)
 
-        count = len(self.files)
-
-        endrec = struct.pack(
-            zipfile.structEndArchive,
-            zipfile.stringEndArchive,
-            0,
-            0,
-            count,
-            count,
-            len(file_headers),
-            cumulative_offset,
-            0,
-        )
+        endrec = end_of_central_directory(len(self.files), len(file_headers), cumulative_offset)
         self.feed_eof()
 
         return b''.join((file_headers, endrec))
@@ -240,9 +390,29 @@ class ZipStreamReader(MultiStream):
     """Combines one or more streams into a single, Zip-compressed stream"""
     def __init__(self, *streams):
         # Each incoming stream should be wrapped in a _ZipFile instance
-        streams = [ZipLocalFile(each) for each in streams]
+        self.files = [self.make_local_file(each) for each in streams]
 
         # Append a stream for the archive's footer (central directory)
-        streams.append(ZipArchiveCentralDirectory(streams.copy()))
+        super().__init__(*(self.files + [ZipArchiveCentralDirectory(self.files.copy())]))
+
+    def make_local_file(self, file_tuple):
+        return ZipLocalFile(file_tuple)
+
 
+class SizedZipStreamReader(ZipStreamReader):
+    """Like ZipStreamReader, but its exact size is available before streaming begins, as is needed
+    to send it with a Content-Length. The files' contents are stored rather than compressed, so
+    each stream must report its size.
+    """
+    def __init__(self, *streams):
         super().__init__(*streams)
+        # Every size and offset is known, so is whether the central directory needs zip64 fields
+        offset, directory_size = 0, 0
+        for file in self.files:
+            directory_size += len(file.make_directory_header(file.data.stream.size, file.data.size, offset))
+            offset += file.size
+        self._size += directory_size
+        self._size += len(end_of_central_directory(len(self.files), directory_size, offset))
+
+    def make_local_file(self, file_tuple):
+        return SizedZipLocalFile(file_tuple)
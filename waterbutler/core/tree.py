@@ -0,0 +1,90 @@
+import asyncio
+import collections
+
+from waterbutler.core import settings
+
+
+class TreeWalker:
+    """Lists every descendant of a folder, breadth first, listing up to ``concurrency`` folders at
+    a time. Children are handed out as soon as their folder has been listed, the walk running
+    ahead of the consumer by at most ``buffer_size`` entries.
+
+    Call :meth:`next` until it returns None, or :meth:`close` to abandon the walk early.
+
+    :param int max_depth: Do not descend further than this, 1 lists the direct children only
+    """
+
+    def __init__(self, provider, path, max_depth=None, concurrency=None, buffer_size=None):
+        self.provider = provider
+        self.path = path
+        self.max_depth = max_depth
+        self.concurrency = concurrency or settings.TREE_CONCURRENCY
+
+        self._results = asyncio.Queue(maxsize=buffer_size or settings.TREE_BUFFER_SIZE)
+        self._walker = None
+        self._error = None
+        self._done = False
+
+    @property
+    def buffered(self):
+        """The number of entries listed but not yet handed out"""
+        return self._results.qsize()
+
+    @asyncio.coroutine
+    def next(self):
+        """The metadata of the next descendant, None once there are no more"""
+        if self._done:
+            return None
+
+        if self._walker is None:
+            self._walker = asyncio.async(self._walk())
+
+        item = yield from self._results.get()
+        if item is None:
+            self._done = True
+            if self._error is not None:
+                raise self._error
+        return item
+
+    def close(self):
+        self._done = True
+        if self._walker is not None:
+            self._walker.cancel()
+
+    @asyncio.coroutine
+    def _walk(self):
+        folders = collections.deque([(None, self.path, 1)])
+        pending = {}
+
+        try:
+            while folders or pending:
+                while folders and len(pending) < self.concurrency:
+                    parent, path, depth = folders.popleft()
+                    pending[asyncio.async(self._list(parent, path))] = depth
+
+                done, _ = yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for future in done:
+                    depth = pending.pop(future)
+                    path, children = future.result()
+
+                    for child in children:
+                        yield from self._results.put(child)
+                        if child.is_folder and (self.max_depth is None or depth < self.max_depth):
+                            folders.append((path, child.name, depth + 1))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e
+        finally:
+            for future in pending:
+                future.cancel()
+
+        yield from self._results.put(None)
+
+    @asyncio.coroutine
+    def _list(self, parent, path):
+        if parent is not None:
+            # Identifier based providers need a lookup to address the child folder
+            path = yield from self.provider.revalidate_path(parent, path, folder=True)
+        return path, (yield from self.provider.metadata(path))
@@ -11,6 +11,7 @@ from stevedore import driver
 
 from waterbutler import settings
 from waterbutler.core import exceptions
+from waterbutler.core import settings as core_settings
 from waterbutler.server import settings as server_settings
 from waterbutler.core.signing import Signer
 
@@ -108,6 +109,37 @@ def async_retry(retries=5, backoff=1, exceptions=(Exception, ), raven=client):
     return _async_retry
 
 
+@asyncio.coroutine
+def retry(func, description, retry_on=None, retries=None, backoff=None):
+    """Calls the coroutine function ``func`` until it succeeds, for the parts and chunks that
+    uploads and copies are sent in. Provider and connection errors are retried up to ``retries``
+    times, waiting ``backoff`` seconds multiplied by the attempt in between.
+
+    :param func: Called with the number of failed attempts so far, a retry may resume where the
+        last attempt left off rather than start over
+    :param str description: What ``func`` sends, for the log
+    :param retry_on: Called with the exception, whether it is worth retrying. Defaults to all
+    :param int retries: Defaults to ``RETRIES``
+    :param int backoff: Defaults to ``RETRY_BACKOFF``
+    """
+    retries = core_settings.RETRIES if retries is None else retries
+    backoff = core_settings.RETRY_BACKOFF if backoff is None else backoff
+
+    for attempt in range(retries + 1):
+        try:
+            return (yield from func(attempt))
+        except (exceptions.ProviderError, aiohttp.errors.ClientError) as e:
+            if attempt == retries or (retry_on is not None and not retry_on(e)):
+                raise
+            logger.warning('{} failed with {!r}, retrying'.format(description, e))
+            yield from asyncio.sleep(backoff * (attempt + 1))
+
+
+def is_transient(exc):
+    """Whether ``exc`` is a connection error or a 5xx response, those that may succeed on a retry"""
+    return isinstance(exc, aiohttp.errors.ClientError) or getattr(exc, 'code', 500) >= 500
+
+
 @asyncio.coroutine
 def send_signed_request(method, url, payload):
     message, signature = signer.sign_payload(payload)
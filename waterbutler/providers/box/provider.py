@@ -1,11 +1,18 @@
 import os
 import http
 import json
+import base64
 import asyncio
+import hashlib
+import logging
 
+import aiohttp
+
+from waterbutler.core import utils
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import settings as core_settings
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.box import settings
@@ -14,6 +21,9 @@ from waterbutler.providers.box.metadata import BoxFileMetadata
 from waterbutler.providers.box.metadata import BoxFolderMetadata
 
 
+logger = logging.getLogger(__name__)
+
+
 class BoxProvider(provider.BaseProvider):
     NAME = 'box'
     BASE_URL = settings.BASE_URL
@@ -146,6 +156,9 @@ class BoxProvider(provider.BaseProvider):
     def can_intra_move(self, other, path=None):
         return self == other
 
+    def can_download_ranges(self, path=None):
+        return True
+
     def can_intra_copy(self, other, path=None):
         return self == other
 
@@ -230,7 +243,7 @@ class BoxProvider(provider.BaseProvider):
             throws=exceptions.DownloadError,
         )
 
-        return streams.ResponseStreamReader(resp)
+        return self.apply_range(streams.ResponseStreamReader(resp), range)
 
     @asyncio.coroutine
     def upload(self, stream, path, conflict='replace', **kwargs):
@@ -238,30 +251,176 @@ class BoxProvider(provider.BaseProvider):
             path, _ = self.handle_name_conflict(path, conflict=conflict, kind='folder')
             path._parts[-1]._id = None
 
-        data_stream = streams.FormDataStream(
-            attributes=json.dumps({
-                'name': path.name,
-                'parent': {
-                    'id': path.parent.identifier
-                }
-            })
-        )
-        data_stream.add_file('file', stream, path.name, disposition='form-data')
+        if stream.size is not None and stream.size > settings.CHUNKED_UPLOAD_THRESHOLD:
+            entry = yield from self._upload_chunked(stream, path)
+        else:
+            data_stream = streams.FormDataStream(
+                attributes=json.dumps({
+                    'name': path.name,
+                    'parent': {
+                        'id': path.parent.identifier
+                    }
+                })
+            )
+            data_stream.add_file('file', stream, path.name, disposition='form-data')
+
+            resp = yield from self.make_request(
+                'POST',
+                self._build_upload_url(*filter(lambda x: x is not None, ('files', path.identifier, 'content'))),
+                data=data_stream,
+                headers=data_stream.headers,
+                expects=(201,),
+                throws=exceptions.UploadError,
+            )
+
+            entry = (yield from resp.json())['entries'][0]
+
+        created = path.identifier is None
+        path._parts[-1]._id = entry['id']
+        return BoxFileMetadata(entry, path), created
+
+    @asyncio.coroutine
+    def _upload_chunked(self, stream, path):
+        """Uploads ``stream`` through an upload session, aborting the session if it cannot be
+        committed.
+
+        :rtype: dict, the uploaded file's entry
+        """
+        stream.add_writer('sha1', streams.HashStreamWriter(hashlib.sha1))
+        session = yield from self._create_upload_session(path, stream.size)
+
+        try:
+            parts = yield from self._upload_parts(stream, session)
+            return (yield from self._commit_upload_session(session, parts, stream.writers['sha1'].digest))
+        except Exception:
+            yield from self._abort_upload_session(session)
+            raise
+
+    @asyncio.coroutine
+    def _create_upload_session(self, path, size):
+        if path.identifier:
+            url = self._build_upload_url('files', path.identifier, 'upload_sessions')
+            payload = {'file_size': size}
+        else:
+            url = self._build_upload_url('files', 'upload_sessions')
+            payload = {'file_size': size, 'file_name': path.name, 'folder_id': path.parent.identifier}
 
         resp = yield from self.make_request(
             'POST',
-            self._build_upload_url(*filter(lambda x: x is not None, ('files', path.identifier, 'content'))),
-            data=data_stream,
-            headers=data_stream.headers,
-            expects=(201,),
+            url,
+            data=json.dumps(payload),
+            headers={'Content-Type': 'application/json'},
+            expects=(201, ),
             throws=exceptions.UploadError,
         )
+        return (yield from resp.json())
 
-        data = yield from resp.json()
+    @asyncio.coroutine
+    def _upload_parts(self, stream, session):
+        """Reads ``stream`` one part, as sized by Box, at a time, keeping at most
+        ``CHUNKED_UPLOAD_CONCURRENCY`` parts buffered and in flight.
 
-        created = path.identifier is None
-        path._parts[-1]._id = data['entries'][0]['id']
-        return BoxFileMetadata(data['entries'][0], path), created
+        :rtype: list of the parts' descriptions, ordered by offset
+        """
+        part_size, pending, parts = session['part_size'], set(), []
+
+        try:
+            for offset in range(0, stream.size, part_size):
+                data = bytearray()
+                while len(data) < part_size:
+                    chunk = yield from stream.read(part_size - len(data))
+                    if not chunk:
+                        break
+                    data.extend(chunk)
+
+                if not data:
+                    raise exceptions.UploadError(
+                        'Upload ended after {} of {} bytes'.format(offset, stream.size)
+                    )
+
+                pending.add(asyncio.async(self._upload_part(session, bytes(data), offset, stream.size)))
+                if len(pending) >= settings.CHUNKED_UPLOAD_CONCURRENCY:
+                    done, pending = yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    parts.extend(future.result() for future in done)
+
+            if pending:
+                done, pending = yield from asyncio.wait(pending)
+                parts.extend(future.result() for future in done)
+        finally:
+            for future in pending:
+                future.cancel()
+
+        return sorted(parts, key=lambda part: part['offset'])
+
+    @asyncio.coroutine
+    def _upload_part(self, session, data, offset, size):
+        """Uploads a single part with its SHA-1 digest, which Box verifies, retrying it on failure
+
+        :rtype: dict
+        """
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Length': str(len(data)),
+            'Content-Range': 'bytes {}-{}/{}'.format(offset, offset + len(data) - 1, size),
+            'Digest': 'sha={}'.format(base64.b64encode(hashlib.sha1(data).digest()).decode('ascii')),
+        }
+
+        @asyncio.coroutine
+        def upload(attempt):
+            resp = yield from self.make_request(
+                'PUT',
+                session['session_endpoints']['upload_part'],
+                data=data,
+                headers=headers,
+                expects=(200, ),
+                throws=exceptions.UploadError,
+            )
+            return (yield from resp.json())['part']
+
+        return (yield from utils.retry(upload, 'Part at {} of session {}'.format(offset, session['id'])))
+
+    @asyncio.coroutine
+    def _commit_upload_session(self, session, parts, sha1):
+        """Commits the session, waiting as told by Retry-After while Box is still assembling
+        the parts
+
+        :rtype: dict, the uploaded file's entry
+        """
+        payload = json.dumps({'parts': parts})
+        headers = {
+            'Content-Type': 'application/json',
+            'Digest': 'sha={}'.format(base64.b64encode(sha1).decode('ascii')),
+        }
+
+        for attempt in range(core_settings.RETRIES + 1):
+            resp = yield from self.make_request(
+                'POST',
+                session['session_endpoints']['commit'],
+                data=payload,
+                headers=headers,
+                expects=(201, 202),
+                throws=exceptions.UploadError,
+            )
+
+            if resp.status == 201:
+                return (yield from resp.json())['entries'][0]
+
+            yield from resp.read_and_close()
+            yield from asyncio.sleep(int(resp.headers.get('RETRY-AFTER', 1)))
+
+        raise exceptions.UploadError('Box did not finish processing upload session {}'.format(session['id']))
+
+    @asyncio.coroutine
+    def _abort_upload_session(self, session):
+        try:
+            yield from self.make_request(
+                'DELETE',
+                session['session_endpoints']['abort'],
+                expects=(204, ),
+                throws=exceptions.UploadError,
+            )
+        except (exceptions.UploadError, aiohttp.errors.ClientError) as e:
+            logger.error('Could not abort upload session {}: {!r}'.format(session['id'], e))
 
     @asyncio.coroutine
     def delete(self, path, **kwargs):
@@ -288,6 +447,34 @@ class BoxProvider(provider.BaseProvider):
             return (yield from self._get_file_meta(path, revision=revision, raw=raw))
         return (yield from self._get_folder_meta(path, raw=raw, folder=folder))
 
+    @asyncio.coroutine
+    def metadata_page(self, path, cursor=None, size=None, **kwargs):
+        """Pages through the folder's items with Box's own offset and limit"""
+        if path.identifier is None:
+            raise exceptions.NotFoundError(str(path))
+        if size is None:
+            return (yield from super().metadata_page(path, cursor=cursor, **kwargs))
+
+        offset = self._parse_offset_cursor(cursor)
+        response = yield from self.make_request(
+            'GET',
+            self.build_url(
+                'folders', path.identifier, 'items',
+                fields='id,name,size,modified_at,etag',
+                offset=offset,
+                limit=size,
+            ),
+            expects=(200, ),
+            throws=exceptions.MetadataError,
+        )
+        data = yield from response.json()
+
+        end = offset + len(data['entries'])
+        return [
+            self._serialize_item(each, path.child(each['name']))
+            for each in data['entries']
+        ], (str(end) if data['entries'] and end < data['total_count'] else None)
+
     @asyncio.coroutine
     def revisions(self, path, **kwargs):
         # from https://developers.box.com/docs/#files-view-versions-of-a-file :
@@ -8,3 +8,9 @@ config = settings.get('BOX_PROVIDER_CONFIG', {})
 
 BASE_URL = config.get('BASE_URL', 'https://api.box.com/2.0')
 BASE_UPLOAD_URL = config.get('BASE_CONTENT_URL', 'https://upload.box.com/api/2.0')
+
+# Uploads larger than CHUNKED_UPLOAD_THRESHOLD use an upload session, Box refuses sessions for files
+# under 20MB. Box chooses the part size, CHUNKED_UPLOAD_CONCURRENCY parts are buffered and sent at once.
+# Failed parts are retried as set by the core RETRIES
+CHUNKED_UPLOAD_THRESHOLD = config.get('CHUNKED_UPLOAD_THRESHOLD', 50 * 1024 * 1024)  # 50MB
+CHUNKED_UPLOAD_CONCURRENCY = config.get('CHUNKED_UPLOAD_CONCURRENCY', 4)
@@ -2,12 +2,17 @@ import os
 import hmac
 import json
 import time
+import uuid
 import asyncio
 import hashlib
+import logging
 import functools
+from urllib import parse
 
 import furl
+import aiohttp
 
+from waterbutler.core import utils
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
@@ -19,6 +24,9 @@ from waterbutler.providers.cloudfiles.metadata import CloudFilesFolderMetadata
 from waterbutler.providers.cloudfiles.metadata import CloudFilesHeaderMetadata
 
 
+logger = logging.getLogger(__name__)
+
+
 def ensure_connection(func):
     """Runs ``_ensure_connection`` before continuing to the method
     """
@@ -46,6 +54,12 @@ class CloudFilesProvider(provider.BaseProvider):
         self.username = self.credentials['username']
         self.container = self.settings['container']
         self.use_public = self.settings.get('use_public', True)
+        self._segment_container_exists = False
+
+    @property
+    def segment_container(self):
+        # Not set in __init__, where the settings argument hides the settings module
+        return self.container + settings.SEGMENT_CONTAINER_SUFFIX
 
     @asyncio.coroutine
     def validate_v1_path(self, path, **kwargs):
@@ -66,7 +80,7 @@ class CloudFilesProvider(provider.BaseProvider):
     @asyncio.coroutine
     def intra_copy(self, dest_provider, source_path, dest_path):
         url = dest_provider.build_url(dest_path.path)
-        exists = yield from dest_provider.exists(dest_path)
+        exists, replaced_segments = yield from dest_provider._large_object_segments(dest_path)
 
         yield from self.make_request(
             'PUT',
@@ -77,6 +91,35 @@ class CloudFilesProvider(provider.BaseProvider):
             expects=(201, ),
             throws=exceptions.IntraCopyError,
         )
+        if replaced_segments:
+            yield from dest_provider._delete_objects(replaced_segments)
+        return (yield from dest_provider.metadata(dest_path)), not exists
+
+    @ensure_connection
+    @asyncio.coroutine
+    def intra_move(self, dest_provider, source_path, dest_path):
+        """Copies a large object's manifest, rather than its contents, so that its segments
+        change hands instead of being duplicated, then removes only the source manifest
+        """
+        exists, replaced_segments = yield from dest_provider._large_object_segments(dest_path)
+
+        yield from self.make_request(
+            'PUT',
+            dest_provider.build_url(dest_path.path, **{'multipart-manifest': 'get'}),
+            headers={
+                'X-Copy-From': os.path.join(self.container, source_path.path)
+            },
+            expects=(201, ),
+            throws=exceptions.IntraMoveError,
+        )
+        yield from self.make_request(
+            'DELETE',
+            self.build_url(source_path.path),
+            expects=(204, ),
+            throws=exceptions.IntraMoveError,
+        )
+        if replaced_segments:
+            yield from dest_provider._delete_objects(replaced_segments)
         return (yield from dest_provider.metadata(dest_path)), not exists
 
     @ensure_connection
@@ -101,7 +144,7 @@ class CloudFilesProvider(provider.BaseProvider):
             expects=(200, 206),
             throws=exceptions.DownloadError,
         )
-        return streams.ResponseStreamReader(resp)
+        return self.apply_range(streams.ResponseStreamReader(resp), range)
 
     @ensure_connection
     @asyncio.coroutine
@@ -109,26 +152,36 @@ class CloudFilesProvider(provider.BaseProvider):
         """Uploads the given stream to CloudFiles
         :param ResponseStreamReader stream: The stream to put to CloudFiles
         :param str path: The full path of the object to upload to/into
+        :param bool check_created: False when the caller knows nothing is stored at ``path``, e.g.
+            osfstorage's content addressed blobs, it is then not looked up at all
         :rtype ResponseStreamReader:
         """
         if check_created:
-            created = not (yield from self.exists(path))
+            # The segments of a large object being replaced are only removed once the new one is written
+            exists, replaced_segments = yield from self._large_object_segments(path)
+            created = not exists
         else:
-            created = None
+            replaced_segments, created = [], None
 
-        stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
-        url = self.sign_url(path, 'PUT')
-        resp = yield from self.make_request(
-            'PUT',
-            url,
-            data=stream,
-            headers={'Content-Length': str(stream.size)},
-            expects=(200, 201),
-            throws=exceptions.UploadError,
-        )
-        # md5 is returned as ETag header as long as server side encryption is not used.
-        # TODO: nice assertion error goes here
-        assert resp.headers['ETag'].replace('"', '') == stream.writers['md5'].hexdigest
+        if stream.size is not None and stream.size > settings.SEGMENTED_UPLOAD_THRESHOLD:
+            yield from self._upload_segmented(stream, path)
+        else:
+            stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
+            url = self.sign_url(path, 'PUT')
+            resp = yield from self.make_request(
+                'PUT',
+                url,
+                data=stream,
+                headers={'Content-Length': str(stream.size)},
+                expects=(200, 201),
+                throws=exceptions.UploadError,
+            )
+            # md5 is returned as ETag header as long as server side encryption is not used.
+            # TODO: nice assertion error goes here
+            assert resp.headers['ETag'].replace('"', '') == stream.writers['md5'].hexdigest
+
+        if replaced_segments:
+            yield from self._delete_objects(replaced_segments)
 
         if fetch_metadata:
             metadata = yield from self.metadata(path)
@@ -145,31 +198,39 @@ class CloudFilesProvider(provider.BaseProvider):
         :rtype ResponseStreamReader:
         """
         if path.is_dir:
-            metadata = yield from self.metadata(path, recursive=True)
-
-            delete_files = [
-                os.path.join('/', self.container, path.child(item['name']).path)
-                for item in metadata
-            ]
-
-            delete_files.append(os.path.join('/', self.container, path.path))
-
-            query = {'bulk-delete': ''}
-            yield from self.make_request(
-                'DELETE',
-                self.build_url(**query),
-                data='\n'.join(delete_files),
-                expects=(200, ),
-                throws=exceptions.DeleteError,
-                headers={
-                    'Content-Type': 'text/plain',
-                },
+            # Includes the folder's own marker object, when it has one
+            items = yield from self._list_objects(path.path)
+
+            # Only a large object's own delete removes its segments, those go one at a time
+            large = [item['name'] for item in items if self._may_be_large_object(item)]
+            yield from self._bulk_delete(
+                '/{}/{}'.format(self.container, item['name'])
+                for item in items
+                if not self._may_be_large_object(item)
             )
+
+            pending = set()
+            try:
+                for name in large:
+                    pending.add(asyncio.async(self._delete_object(name)))
+                    if len(pending) >= settings.DELETE_CONCURRENCY:
+                        done, pending = yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+
+                if pending:
+                    done, pending = yield from asyncio.wait(pending)
+                    for future in done:
+                        future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
         else:
+            # Removes the segments of large objects too, other objects are deleted as usual
             yield from self.make_request(
                 'DELETE',
-                self.build_url(path.path),
-                expects=(204, ),
+                self.build_url(path.path, **{'multipart-manifest': 'delete'}),
+                expects=(200, 204, ),
                 throws=exceptions.DeleteError,
             )
 
@@ -195,6 +256,9 @@ class CloudFilesProvider(provider.BaseProvider):
         endpoint = _endpoint or self.endpoint
         return provider.build_url(endpoint, self.container, *path.split('/'), **query)
 
+    def can_download_ranges(self, path=None):
+        return True
+
     def can_intra_copy(self, dest_provider, path=None):
         return type(self) == type(dest_provider) and not getattr(path, 'is_dir', False)
 
@@ -222,6 +286,244 @@ class CloudFilesProvider(provider.BaseProvider):
         })
         return url.url
 
+    @asyncio.coroutine
+    def _upload_segmented(self, stream, path):
+        """Uploads ``stream`` as a Static Large Object: segments are written to the segment
+        container, then a manifest listing them is written to ``path``. The segments are removed if
+        the upload fails.
+        """
+        prefix = '{}/{}'.format(path.path, uuid.uuid4().hex)
+        yield from self._ensure_segment_container()
+
+        try:
+            segments = yield from self._upload_segments(stream, prefix)
+            yield from self._put_manifest(path, segments)
+        except Exception:
+            yield from self._delete_segments(prefix)
+            raise
+
+    @asyncio.coroutine
+    def _ensure_segment_container(self):
+        if self._segment_container_exists:
+            return
+        yield from self.make_request(
+            'PUT',
+            provider.build_url(self.endpoint, self.segment_container),
+            expects=(201, 202),
+            throws=exceptions.UploadError,
+        )
+        self._segment_container_exists = True
+
+    def _build_segment_url(self, name, **query):
+        return provider.build_url(self.endpoint, self.segment_container, *name.split('/'), **query)
+
+    @asyncio.coroutine
+    def _upload_segments(self, stream, prefix):
+        """Reads ``stream`` a segment at a time, keeping at most ``SEGMENT_CONCURRENCY`` segments in
+        flight. Segments of a stream read from a local file are sliced from that file, any other
+        stream is spooled, only the first ``SPOOL_MAX_MEMORY`` bytes of each segment are kept in
+        memory and the rest goes to disk.
+
+        :rtype: list of the manifest's entries
+        """
+        local_path = self._local_path(stream)
+        pending, segments = set(), {}
+
+        try:
+            for index in range(-(-stream.size // settings.SEGMENT_SIZE)):
+                if local_path is None:
+                    segment = streams.SpooledStream(
+                        streams.PartialStreamReader(stream, 0, settings.SEGMENT_SIZE - 1, stream.size)
+                    )
+                    yield from segment.spool()
+                else:
+                    # A handle each, the segments are read concurrently
+                    start = index * settings.SEGMENT_SIZE
+                    end = min(start + settings.SEGMENT_SIZE, stream.size) - 1
+                    segment = streams.PartialFileStreamReader(open(local_path, 'rb'), start, end)
+
+                if not segment.size:
+                    segment.close()
+                    raise exceptions.UploadError('Upload ended after {} segments'.format(index))
+
+                name = '{}/{:08d}'.format(prefix, index)
+                pending.add(asyncio.async(self._upload_segment(index, name, segment)))
+                if len(pending) >= settings.SEGMENT_CONCURRENCY:
+                    done, pending = yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    segments.update(future.result() for future in done)
+
+            if pending:
+                done, pending = yield from asyncio.wait(pending)
+                segments.update(future.result() for future in done)
+        finally:
+            for future in pending:
+                future.cancel()
+
+        return [segments[index] for index in sorted(segments)]
+
+    def _local_path(self, stream):
+        """The path of the local file ``stream`` reads, when its segments may be sliced from it
+        directly. Never for a stream with readers or writers, those must see every byte.
+        """
+        if not isinstance(stream, streams.FileStreamReader) or stream.readers or stream.writers:
+            return None
+        name = getattr(stream.file_pointer, 'name', None)
+        if not isinstance(name, str) or not os.path.isfile(name):
+            return None
+        return name
+
+    @asyncio.coroutine
+    def _upload_segment(self, index, name, segment):
+        """Uploads a single segment, verifying its ETag and retrying it as set by the core
+        ``RETRIES``. The segment is closed once done.
+
+        :rtype: (index, manifest entry)
+        """
+        @asyncio.coroutine
+        def put(attempt):
+            segment.rewind()
+            # Hashed as it is sent, segments sliced from a file are not read beforehand
+            md5 = streams.HashStreamWriter(hashlib.md5)
+            segment.add_writer('md5', md5)
+            resp = yield from self.make_request(
+                'PUT',
+                self._build_segment_url(name),
+                data=segment,
+                headers={'Content-Length': str(segment.size)},
+                expects=(201, ),
+                throws=exceptions.UploadError,
+            )
+            if resp.headers['ETag'].replace('"', '') != md5.hexdigest:
+                raise exceptions.UploadError('Segment {} was corrupted in transit'.format(name))
+            return md5
+
+        try:
+            md5 = yield from utils.retry(put, 'Segment {}'.format(name))
+            return index, {
+                'path': '/{}/{}'.format(self.segment_container, name),
+                'etag': md5.hexdigest,
+                'size_bytes': segment.size,
+            }
+        finally:
+            segment.close()
+
+    @asyncio.coroutine
+    def _put_manifest(self, path, segments):
+        manifest = json.dumps(segments).encode('utf-8')
+        yield from self.make_request(
+            'PUT',
+            self.build_url(path.path, **{'multipart-manifest': 'put'}),
+            data=manifest,
+            headers={
+                'Content-Length': str(len(manifest)),
+                # Swift refuses the manifest unless this is the md5 of its segments' ETags
+                'ETag': hashlib.md5(''.join(segment['etag'] for segment in segments).encode('utf-8')).hexdigest(),
+            },
+            expects=(201, ),
+            throws=exceptions.UploadError,
+        )
+
+    @asyncio.coroutine
+    def _delete_segments(self, prefix):
+        """Best effort removal of every segment uploaded under ``prefix``"""
+        try:
+            resp = yield from self.make_request(
+                'GET',
+                provider.build_url(self.endpoint, self.segment_container, prefix=prefix + '/', format='json'),
+                expects=(200, 204),
+                throws=exceptions.DeleteError,
+            )
+            names = [item['name'] for item in (yield from resp.json())] if resp.status == 200 else []
+        except (exceptions.ProviderError, aiohttp.errors.ClientError) as e:
+            logger.error('Could not list segments under {}: {!r}'.format(prefix, e))
+            return
+
+        yield from self._delete_objects('/{}/{}'.format(self.segment_container, name) for name in names)
+
+    @asyncio.coroutine
+    def _delete_object(self, name):
+        """Deletes ``name``, along with its segments when it is a large object. Objects already gone
+        are ignored, folders are listed before they are deleted and may change in the meantime.
+        """
+        yield from self.make_request(
+            'DELETE',
+            self.build_url(name, **{'multipart-manifest': 'delete'}),
+            expects=(200, 204, 404),
+            throws=exceptions.DeleteError,
+        )
+
+    @asyncio.coroutine
+    def _list_objects(self, prefix):
+        """Every object under ``prefix``, through as many listing pages as it takes
+
+        :rtype: list of listing entries
+        """
+        items, marker = [], None
+        while True:
+            query = {'prefix': prefix}
+            if marker is not None:
+                query['marker'] = marker
+            data = yield from self._list_folder(**query)
+            if not data:
+                return items
+            items.extend(data)
+            marker = data[-1]['name']
+
+    def _may_be_large_object(self, item):
+        """Whether the listing entry ``item`` may be a Static Large Object. Listings report the
+        total size of a large object, one no bigger than a single segment is never stored as one.
+        Newer Swift versions also list its ``slo_etag``.
+        """
+        return 'slo_etag' in item or item['bytes'] > settings.SEGMENT_SIZE
+
+    @asyncio.coroutine
+    def _bulk_delete(self, paths):
+        """Removes ``paths``, each given as ``/container/name``, ``BULK_DELETE_MAX`` per request"""
+        paths = [parse.quote(path) for path in paths]
+        for start in range(0, len(paths), settings.BULK_DELETE_MAX):
+            yield from self.make_request(
+                'DELETE',
+                provider.build_url(self.endpoint, **{'bulk-delete': ''}),
+                data='\n'.join(paths[start:start + settings.BULK_DELETE_MAX]),
+                headers={'Content-Type': 'text/plain'},
+                expects=(200, ),
+                throws=exceptions.DeleteError,
+            )
+
+    @asyncio.coroutine
+    def _delete_objects(self, paths):
+        """Best effort :meth:`_bulk_delete`, for segments no longer referenced by any manifest"""
+        paths = list(paths)
+        try:
+            yield from self._bulk_delete(paths)
+        except (exceptions.ProviderError, aiohttp.errors.ClientError) as e:
+            logger.error('Could not remove {} objects: {!r}'.format(len(paths), e))
+
+    @asyncio.coroutine
+    def _large_object_segments(self, path):
+        """Whether ``path`` exists and, when it is a Static Large Object, the paths of its segments
+
+        :rtype: (bool, list of ``/container/name``)
+        """
+        resp = yield from self.make_request(
+            'HEAD',
+            self.build_url(path.path),
+            expects=(200, 404),
+            throws=exceptions.MetadataError,
+        )
+        if resp.status == 404:
+            return False, []
+        if resp.headers.get('X-Static-Large-Object', '').lower() != 'true':
+            return True, []
+
+        resp = yield from self.make_request(
+            'GET',
+            self.build_url(path.path, **{'multipart-manifest': 'get'}),
+            expects=(200, ),
+            throws=exceptions.MetadataError,
+        )
+        return True, [segment['name'] for segment in (yield from resp.json())]
+
     @asyncio.coroutine
     def _ensure_connection(self):
         """Defines token, endpoint and temp_url_key if they are not already defined
@@ -314,16 +616,48 @@ class CloudFilesProvider(provider.BaseProvider):
         query = {'prefix': path.path}
         if not recursive:
             query.update({'delimiter': '/'})
+        data = yield from self._list_folder(**query)
+
+        if not data:
+            yield from self._check_folder_exists(path, **kwargs)
+
+        return self._serialize_folder_listing(data)
+
+    @asyncio.coroutine
+    def metadata_page(self, path, cursor=None, size=None, **kwargs):
+        """Pages through the container listing with Cloud Files' own marker and limit, the cursor is
+        the name of the last object or pseudo-directory listed.
+        """
+        query = {'prefix': path.path, 'delimiter': '/'}
+        if size is not None:
+            query['limit'] = size
+        if cursor is not None:
+            query['marker'] = cursor
+        data = yield from self._list_folder(**query)
+
+        if not data and cursor is None:
+            yield from self._check_folder_exists(path, **kwargs)
+
+        next_marker = None
+        if size is not None and len(data) >= size:
+            next_marker = data[-1].get('subdir') or data[-1]['name']
+
+        return self._serialize_folder_listing(data), next_marker
+
+    @asyncio.coroutine
+    def _list_folder(self, **query):
         resp = yield from self.make_request(
             'GET',
             self.build_url('', **query),
             expects=(200, ),
             throws=exceptions.MetadataError,
         )
-        data = yield from resp.json()
+        return (yield from resp.json())
 
+    @asyncio.coroutine
+    def _check_folder_exists(self, path, **kwargs):
         # no data and the provider path is not root, we are left with either a file or a directory marker
-        if not data and not path.is_root:
+        if not path.is_root:
             # Convert the parent path into a directory marker (file) and check for an empty folder
             dir_marker = path.parent.child(path.name, folder=False)
             metadata = yield from self._metadata_file(dir_marker, is_folder=True, **kwargs)
@@ -333,6 +667,7 @@ class CloudFilesProvider(provider.BaseProvider):
                     code=404,
                 )
 
+    def _serialize_folder_listing(self, data):
         # normalized metadata, remove extraneous directory markers
         for item in data:
             if 'subdir' in item:
@@ -8,3 +8,19 @@ config = settings.get('CLOUDFILES_PROVIDER_CONFIG', {})
 
 TEMP_URL_SECS = config.get('TEMP_URL_SECS', 100)
 AUTH_URL = config.get('AUTH_URL', 'https://identity.api.rackspacecloud.com/v2.0/tokens')
+
+# Uploads larger than SEGMENTED_UPLOAD_THRESHOLD are stored as a Static Large Object, Swift refuses
+# single objects over 5GB. Its SEGMENT_SIZE segments are kept in the container named after the
+# provider's with SEGMENT_CONTAINER_SUFFIX appended and SEGMENT_CONCURRENCY are sent at once. Segments
+# are sliced from local files, those of other streams are spooled, holding at most the core
+# SPOOL_MAX_MEMORY in memory and the rest on disk. Failed segments are retried as set by the core
+# RETRIES
+SEGMENTED_UPLOAD_THRESHOLD = config.get('SEGMENTED_UPLOAD_THRESHOLD', 256 * 1024 * 1024)  # 256MB
+SEGMENT_SIZE = config.get('SEGMENT_SIZE', 64 * 1024 * 1024)  # 64MB
+SEGMENT_CONCURRENCY = config.get('SEGMENT_CONCURRENCY', 4)
+SEGMENT_CONTAINER_SUFFIX = config.get('SEGMENT_CONTAINER_SUFFIX', '_segments')
+
+# Folders are deleted in bulk, at most BULK_DELETE_MAX names per request, except for objects that may
+# be large objects. Those are deleted on their own, DELETE_CONCURRENCY at once, to take their segments
+DELETE_CONCURRENCY = config.get('DELETE_CONCURRENCY', 8)
+BULK_DELETE_MAX = config.get('BULK_DELETE_MAX', 10000)
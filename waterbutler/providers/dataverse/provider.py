@@ -1,6 +1,5 @@
 import asyncio
 import http
-import tempfile
 
 from waterbutler.core import streams
 from waterbutler.core import provider
@@ -120,7 +119,7 @@ class DataverseProvider(provider.BaseProvider):
             expects=(200, 206),
             throws=exceptions.DownloadError,
         )
-        return streams.ResponseStreamReader(resp)
+        return self.apply_range(streams.ResponseStreamReader(resp), range)
 
     @asyncio.coroutine
     def upload(self, stream, path, **kwargs):
@@ -133,15 +132,13 @@ class DataverseProvider(provider.BaseProvider):
         :rtype: dict, bool
         """
 
-        stream = streams.ZipStreamReader((path.name, stream))
-
-        # Write stream to disk (Necessary to find zip file size)
-        f = tempfile.TemporaryFile()
-        chunk = yield from stream.read()
-        while chunk:
-            f.write(chunk)
-            chunk = yield from stream.read()
-        stream = streams.FileStreamReader(f)
+        if stream.size is not None:
+            # The archive's length follows from the file's, so it can be streamed straight through
+            stream = streams.SizedZipStreamReader((path.name, stream))
+        else:
+            # Spool the zip (Necessary to find zip file size)
+            stream = streams.SpooledStream(streams.ZipStreamReader((path.name, stream)))
+            yield from stream.spool()
 
         dv_headers = {
             "Content-Disposition": "filename=temp.zip",
@@ -154,15 +151,19 @@ class DataverseProvider(provider.BaseProvider):
         if path.identifier:
             yield from self.delete(path)
 
-        yield from self.make_request(
-            'POST',
-            self.build_url(settings.EDIT_MEDIA_BASE_URL, 'study', self.doi),
-            headers=dv_headers,
-            auth=(self.token, ),
-            data=stream,
-            expects=(201, ),
-            throws=exceptions.UploadError
-        )
+        try:
+            yield from self.make_request(
+                'POST',
+                self.build_url(settings.EDIT_MEDIA_BASE_URL, 'study', self.doi),
+                headers=dv_headers,
+                auth=(self.token, ),
+                data=stream,
+                expects=(201, ),
+                throws=exceptions.UploadError
+            )
+        finally:
+            if isinstance(stream, streams.SpooledStream):
+                stream.close()
 
         # Find appropriate version of file
         metadata = yield from self._get_data('latest')
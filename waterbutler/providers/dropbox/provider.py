@@ -2,6 +2,7 @@ import json
 import http
 import asyncio
 
+from waterbutler.core import utils
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
@@ -173,12 +174,16 @@ class DropboxProvider(provider.BaseProvider):
         else:
             size = None
 
-        return streams.ResponseStreamReader(resp, size=size)
+        return self.apply_range(streams.ResponseStreamReader(resp, size=size), range)
 
     @asyncio.coroutine
     def upload(self, stream, path, conflict='replace', **kwargs):
         path, exists = yield from self.handle_name_conflict(path, conflict=conflict)
 
+        if stream.size is not None and stream.size > settings.CHUNKED_UPLOAD_THRESHOLD:
+            data = yield from self._upload_chunked(stream, path)
+            return DropboxFileMetadata(data, self.folder), not exists
+
         resp = yield from self.make_request(
             'PUT',
             self._build_content_url('files_put', 'auto', path.full_path),
@@ -191,6 +196,108 @@ class DropboxProvider(provider.BaseProvider):
         data = yield from resp.json()
         return DropboxFileMetadata(data, self.folder), not exists
 
+    @asyncio.coroutine
+    def _upload_chunked(self, stream, path):
+        """Sends ``stream`` with chunked_upload, reading each chunk from the stream while the
+        previous one is being sent, then commits it to ``path``.
+
+        :rtype: dict
+        """
+        upload_id, offset = None, 0
+        next_chunk = asyncio.async(self._read_chunk(stream, settings.CHUNKED_UPLOAD_CHUNK_SIZE))
+
+        try:
+            while True:
+                chunk = yield from next_chunk
+                if not chunk:
+                    break
+                next_chunk = asyncio.async(self._read_chunk(stream, settings.CHUNKED_UPLOAD_CHUNK_SIZE))
+                upload_id, offset = yield from self._upload_chunk(upload_id, chunk, offset)
+        finally:
+            next_chunk.cancel()
+
+        if offset != stream.size:
+            raise exceptions.UploadError('Upload ended after {} of {} bytes'.format(offset, stream.size))
+
+        resp = yield from self.make_request(
+            'POST',
+            self._build_content_url('commit_chunked_upload', 'auto', path.full_path),
+            data={'upload_id': upload_id, 'overwrite': 'true'},
+            expects=(200, ),
+            throws=exceptions.UploadError,
+        )
+        return (yield from resp.json())
+
+    @asyncio.coroutine
+    def _read_chunk(self, stream, size):
+        chunk = bytearray()
+        while len(chunk) < size:
+            data = yield from stream.read(size - len(chunk))
+            if not data:
+                break
+            chunk.extend(data)
+        return bytes(chunk)
+
+    @asyncio.coroutine
+    def _upload_chunk(self, upload_id, chunk, offset):
+        """Appends ``chunk``, which starts at ``offset``, to the upload ``upload_id``, or starts a
+        new upload if it is None. Transient failures are retried from the offset Dropbox last
+        acknowledged.
+
+        :rtype: (upload id, offset)
+        """
+        start, end = offset, offset + len(chunk)
+
+        @asyncio.coroutine
+        def append(attempt):
+            nonlocal upload_id, offset
+            if offset == end:
+                # Dropbox reported having the whole chunk already
+                return
+
+            query = {'offset': offset}
+            if upload_id is not None:
+                query['upload_id'] = upload_id
+
+            try:
+                resp = yield from self.make_request(
+                    'PUT',
+                    self._build_content_url('chunked_upload', **query),
+                    headers={'Content-Length': str(end - offset)},
+                    data=chunk[offset - start:],
+                    expects=(200, ),
+                    throws=exceptions.UploadError,
+                )
+            except exceptions.UploadError as e:
+                if self._is_offset_mismatch(e):
+                    # Dropbox has a different number of bytes than expected, continue from its count
+                    upload_id, offset = e.data['upload_id'], e.data['offset']
+                raise
+
+            data = yield from resp.json()
+            upload_id, offset = data['upload_id'], data['offset']
+
+        def retry_on(error):
+            # Only resumable from within this chunk
+            return start <= offset <= end and (utils.is_transient(error) or self._is_offset_mismatch(error))
+
+        while offset < end:
+            yield from utils.retry(append, 'Chunk at {} of upload {}'.format(offset, upload_id), retry_on=retry_on)
+
+            if not start <= offset <= end:
+                raise exceptions.UploadError(
+                    'Cannot resume upload {} from byte {}, expected {} to {}'.format(upload_id, offset, start, end)
+                )
+
+        return upload_id, offset
+
+    def _is_offset_mismatch(self, error):
+        return (
+            getattr(error, 'code', None) == 400 and
+            isinstance(getattr(error, 'data', None), dict) and
+            'offset' in error.data and 'upload_id' in error.data
+        )
+
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         yield from self.make_request(
@@ -292,6 +399,9 @@ class DropboxProvider(provider.BaseProvider):
 
         return DropboxFolderMetadata(data, self.folder)
 
+    def can_download_ranges(self, path=None):
+        return True
+
     def can_intra_copy(self, dest_provider, path=None):
         return type(self) == type(dest_provider)
 
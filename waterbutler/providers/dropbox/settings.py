@@ -8,3 +8,8 @@ config = settings.get('DROPBOX_PROVIDER_CONFIG', {})
 
 BASE_URL = config.get('BASE_URL', 'https://api.dropbox.com/1/')
 BASE_CONTENT_URL = config.get('BASE_CONTENT_URL', 'https://api-content.dropbox.com/1/')
+
+# files_put refuses files over 150MB, larger uploads are sent as CHUNKED_UPLOAD_CHUNK_SIZE chunks,
+# each retried as set by the core RETRIES
+CHUNKED_UPLOAD_THRESHOLD = config.get('CHUNKED_UPLOAD_THRESHOLD', 64 * 1024 * 1024)  # 64MB
+CHUNKED_UPLOAD_CHUNK_SIZE = config.get('CHUNKED_UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024)  # 4MB
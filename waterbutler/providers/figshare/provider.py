@@ -309,12 +309,13 @@ class FigshareArticleProvider(BaseFigshareProvider):
         return self._serialize_item(article_json, article_json)
 
     @asyncio.coroutine
-    def download(self, path, **kwargs):
+    def download(self, path, range=None, **kwargs):
         """Download a file. Note: Although Figshare may return a download URL,
         the `accept_url` parameter is ignored here, since Figshare does not
         support HTTPS for downloads.
 
         :param str path: Path to the key you want to download
+        :param tuple range: An optional byte range, see :meth:`BaseProvider.download`
         :rtype ResponseWrapper:
         """
         if path.identifier is None:
@@ -327,8 +328,11 @@ class FigshareArticleProvider(BaseFigshareProvider):
                 'Cannot download private files',
                 code=http.client.FORBIDDEN,
             )
-        resp = yield from aiohttp.request('GET', download_url)
-        return streams.ResponseStreamReader(resp)
+        headers = {}
+        if range:
+            headers['Range'] = self._build_range_header(range)
+        resp = yield from aiohttp.request('GET', download_url, headers=headers)
+        return self.apply_range(streams.ResponseStreamReader(resp), range)
 
     @asyncio.coroutine
     def delete(self, path, **kwargs):
@@ -1,8 +1,15 @@
 import os
+import uuid
 import shutil
 import asyncio
 import datetime
 import mimetypes
+from stat import S_ISDIR
+
+try:
+    from os import scandir
+except ImportError:  # Python < 3.5
+    from scandir import scandir
 
 from waterbutler.core import streams
 from waterbutler.core import provider
@@ -51,8 +58,7 @@ class FileSystemProvider(provider.BaseProvider):
         return (yield from dest_provider.metadata(dest_path)), not exists
 
     @asyncio.coroutine
-    def download(self, path, revision=None, **kwargs):
-        # TODO implement range requests
+    def download(self, path, revision=None, range=None, **kwargs):
         if not os.path.exists(path.full_path):
             raise exceptions.DownloadError(
                 'Could not retrieve file \'{0}\''.format(path),
@@ -60,19 +66,51 @@ class FileSystemProvider(provider.BaseProvider):
             )
 
         file_pointer = open(path.full_path, 'rb')
-        return streams.FileStreamReader(file_pointer)
+        if range is None:
+            return streams.FileStreamReader(file_pointer)
+
+        try:
+            start, end = self._resolve_range(range, os.fstat(file_pointer.fileno()).st_size)
+        except exceptions.DownloadError:
+            file_pointer.close()
+            raise
+
+        return streams.PartialFileStreamReader(file_pointer, start, end)
 
     @asyncio.coroutine
     def upload(self, stream, path, **kwargs):
         created = not (yield from self.exists(path))
-
-        os.makedirs(os.path.split(path.full_path)[0], exist_ok=True)
-
-        with open(path.full_path, 'wb') as file_pointer:
-            chunk = yield from stream.read(settings.CHUNK_SIZE)
-            while chunk:
-                file_pointer.write(chunk)
-                chunk = yield from stream.read(settings.CHUNK_SIZE)
+        loop = asyncio.get_event_loop()
+
+        directory = os.path.split(path.full_path)[0]
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file in the destination folder so the final rename is atomic
+        temp_path = os.path.join(directory, settings.TEMP_PREFIX + uuid.uuid4().hex)
+
+        try:
+            with open(temp_path, 'xb') as file_pointer:
+                # Writes happen in the executor, overlapping with the read of the next chunk
+                write = None
+                try:
+                    chunk = yield from stream.read(settings.CHUNK_SIZE)
+                    while chunk:
+                        write = loop.run_in_executor(None, file_pointer.write, chunk)
+                        chunk = yield from stream.read(settings.CHUNK_SIZE)
+                        yield from write
+                        write = None
+                finally:
+                    if write is not None:
+                        # The read failed, let the write in flight finish before the file is
+                        # closed and removed under it. Its own error, if any, is superseded
+                        yield from asyncio.wait([write])
+                        if not write.cancelled():
+                            write.exception()
+            os.replace(temp_path, path.full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
 
         metadata = yield from self.metadata(path)
         return metadata, created
@@ -88,38 +126,53 @@ class FileSystemProvider(provider.BaseProvider):
 
     @asyncio.coroutine
     def metadata(self, path, **kwargs):
+        loop = asyncio.get_event_loop()
         if path.is_dir:
-            if not os.path.exists(path.full_path) or not os.path.isdir(path.full_path):
-                raise exceptions.MetadataError(
-                    'Could not retrieve folder \'{0}\''.format(path),
-                    code=404,
-                )
-
-            ret = []
-            for item in os.listdir(path.full_path):
-                if os.path.isdir(os.path.join(path.full_path, item)):
-                    metadata = self._metadata_folder(path, item)
-                    ret.append(FileSystemFolderMetadata(metadata, self.folder))
-                else:
-                    metadata = self._metadata_file(path, item)
-                    ret.append(FileSystemFileMetadata(metadata, self.folder))
-            return ret
-        else:
-            if not os.path.exists(path.full_path) or os.path.isdir(path.full_path):
-                raise exceptions.MetadataError(
-                    'Could not retrieve file \'{0}\''.format(path),
-                    code=404,
-                )
+            return (yield from loop.run_in_executor(None, self._metadata_folder_listing, path))
+        return (yield from loop.run_in_executor(None, self._metadata_single_file, path))
+
+    def _metadata_folder_listing(self, path):
+        if not os.path.isdir(path.full_path):
+            raise exceptions.MetadataError(
+                'Could not retrieve folder \'{0}\''.format(path),
+                code=404,
+            )
+
+        ret = []
+        # scandir reports the entry type without a stat call, files need exactly one
+        for entry in scandir(path.full_path):
+            if entry.name.startswith(settings.TEMP_PREFIX):
+                continue
+            if entry.is_dir():
+                metadata = self._metadata_folder(path, entry.name)
+                ret.append(FileSystemFolderMetadata(metadata, self.folder))
+            else:
+                metadata = self._metadata_file(path, entry.name, stat=entry.stat())
+                ret.append(FileSystemFileMetadata(metadata, self.folder))
+        return ret
+
+    def _metadata_single_file(self, path):
+        try:
+            stat = os.stat(path.full_path)
+        except FileNotFoundError:
+            stat = None
+
+        if stat is None or S_ISDIR(stat.st_mode):
+            raise exceptions.MetadataError(
+                'Could not retrieve file \'{0}\''.format(path),
+                code=404,
+            )
 
-            metadata = self._metadata_file(path)
-            return FileSystemFileMetadata(metadata, self.folder)
+        metadata = self._metadata_file(path, stat=stat)
+        return FileSystemFileMetadata(metadata, self.folder)
 
-    def _metadata_file(self, path, file_name=''):
+    def _metadata_file(self, path, file_name='', stat=None):
         full_path = path.full_path if file_name == '' else os.path.join(path.full_path, file_name)
-        modified = datetime.datetime.fromtimestamp(os.path.getmtime(full_path))
+        stat = stat or os.stat(full_path)
+        modified = datetime.datetime.fromtimestamp(stat.st_mtime)
         return {
             'path': full_path,
-            'size': os.path.getsize(full_path),
+            'size': stat.st_size,
             'modified': modified.strftime('%a, %d %b %Y %H:%M:%S %z'),
             'mime_type': mimetypes.guess_type(full_path)[0],
         }
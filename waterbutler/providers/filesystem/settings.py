@@ -7,3 +7,6 @@ config = settings.get('FILESYSTEM_PROVIDER_CONFIG', {})
 
 
 CHUNK_SIZE = config.get('CHUNK_SIZE', 65536)  # 64KB
+
+# Prefix of the temporary files uploads are written to before being renamed into place
+TEMP_PREFIX = config.get('TEMP_PREFIX', '.wb-upload-')
@@ -149,11 +149,12 @@ class GitHubProvider(provider.BaseProvider):
         return (yield from self._do_intra_move_or_copy(src_path, dest_path, False))
 
     @asyncio.coroutine
-    def download(self, path, revision=None, **kwargs):
+    def download(self, path, revision=None, range=None, **kwargs):
         '''Get the stream to the specified file on github
         :param str path: The path to the file on github
         :param str ref: The git 'ref' a branch or commit sha at which to get the file from
         :param str fileSha: The sha of file to be downloaded if specifed path will be ignored
+        :param tuple range: An optional byte range, served by skipping through the blob
         :param dict kwargs: Ignored
         '''
         data = yield from self.metadata(path, revision=revision)
@@ -167,7 +168,7 @@ class GitHubProvider(provider.BaseProvider):
             throws=exceptions.DownloadError,
         )
 
-        return streams.ResponseStreamReader(resp, size=data.size)
+        return self.apply_range(streams.ResponseStreamReader(resp, size=data.size), range)
 
     @asyncio.coroutine
     def upload(self, stream, path, message=None, branch=None, **kwargs):
@@ -504,7 +505,7 @@ class GitHubProvider(provider.BaseProvider):
     def _create_blob(self, stream):
         blob_stream = streams.JSONStream({
             'encoding': 'base64',
-            'content': streams.Base64EncodeStream(stream),
+            'content': streams.BatchedBase64EncodeStream(stream),
         })
 
         resp = yield from self.make_request(
@@ -8,6 +8,7 @@ from urllib import parse
 import furl
 
 from waterbutler.core import path
+from waterbutler.core import utils
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
@@ -175,7 +176,7 @@ class GoogleDriveProvider(provider.BaseProvider):
         )
 
         if 'fileSize' in data:
-            return streams.ResponseStreamReader(download_resp, size=data['fileSize'])
+            return self.apply_range(streams.ResponseStreamReader(download_resp, size=data['fileSize']), range)
 
         # google docs, not drive files, have no way to get the file size
         # must buffer the entire file into memory
@@ -184,7 +185,7 @@ class GoogleDriveProvider(provider.BaseProvider):
             stream.content_type = download_resp.headers['Content-Type']
         if drive_utils.is_docs_file(data):
             stream.name = path.name + drive_utils.get_download_extension(data)
-        return stream
+        return self.apply_range(stream, range)
 
     @asyncio.coroutine
     def upload(self, stream, path, **kwargs):
@@ -233,6 +234,31 @@ class GoogleDriveProvider(provider.BaseProvider):
 
         return (yield from self._file_metadata(path, revision=revision, raw=raw))
 
+    @asyncio.coroutine
+    def metadata_page(self, path, cursor=None, size=None, raw=False, **kwargs):
+        """Pages through the folder's children with Drive's own page tokens"""
+        if path.identifier is None:
+            raise exceptions.MetadataError('{} not found'.format(str(path)), code=404)
+
+        query = {'q': self._build_query(path.identifier), 'alt': 'json'}
+        if size is not None:
+            query['maxResults'] = size
+        if cursor is not None:
+            query['pageToken'] = cursor
+
+        resp = yield from self.make_request(
+            'GET',
+            self.build_url('files', **query),
+            expects=(200, ),
+            throws=exceptions.MetadataError,
+        )
+        data = yield from resp.json()
+
+        return [
+            self._serialize_item(path.child(item['title']), item, raw=raw)
+            for item in data['items']
+        ], data.get('nextPageToken')
+
     @asyncio.coroutine
     def revisions(self, path, **kwargs):
         if path.identifier is None:
@@ -308,13 +334,15 @@ class GoogleDriveProvider(provider.BaseProvider):
 
     @asyncio.coroutine
     def _start_resumable_upload(self, created, segments, size, metadata):
+        headers = {'Content-Type': 'application/json'}
+        # Optional, unknown for chunked request bodies
+        if size is not None:
+            headers['X-Upload-Content-Length'] = str(size)
+
         resp = yield from self.make_request(
             'POST' if created else 'PUT',
             self._build_upload_url('files', *segments, uploadType='resumable'),
-            headers={
-                'Content-Type': 'application/json',
-                'X-Upload-Content-Length': str(size),
-            },
+            headers=headers,
             data=json.dumps(metadata),
             expects=(200, ),
             throws=exceptions.UploadError,
@@ -324,15 +352,114 @@ class GoogleDriveProvider(provider.BaseProvider):
 
     @asyncio.coroutine
     def _finish_resumable_upload(self, segments, stream, upload_id):
-        resp = yield from self.make_request(
+        """Sends ``stream`` to the resumable session ``upload_id`` one chunk at a time. Only the
+        current chunk is held in memory, so that it can be resent from whichever byte Drive last
+        committed should the connection drop.
+
+        Streams of unknown size are sent with an unknown total until a chunk comes up short, the
+        total is sent along with that last chunk, which may be empty.
+        """
+        url = self._build_upload_url('files', *segments, uploadType='resumable', upload_id=upload_id)
+        # Every chunk but the last must be a multiple of 256KB
+        chunk_size = max(settings.UPLOAD_CHUNK_SIZE // (256 * 1024), 1) * 256 * 1024
+
+        offset = 0
+        while True:
+            chunk = bytearray()
+            while len(chunk) < chunk_size:
+                data = yield from stream.read(chunk_size - len(chunk))
+                if not data:
+                    break
+                chunk.extend(data)
+
+            last = len(chunk) < chunk_size
+            total = stream.size
+            if total is None and last:
+                total = offset + len(chunk)
+
+            resp, offset = yield from self._upload_chunk(url, bytes(chunk), offset, total)
+            if resp is not None:
+                return (yield from resp.json())
+
+            if last:
+                raise exceptions.UploadError(
+                    'Upload ended after {} of {} bytes'.format(offset, total)
+                )
+
+    @asyncio.coroutine
+    def _upload_chunk(self, url, chunk, start, total):
+        """Sends ``chunk``, which begins at byte ``start`` of the upload. After a transient failure
+        Drive is asked how much it has received and the chunk is resent from there, on every
+        attempt the core retry helper makes.
+
+        :param int total: The size of the whole upload, None while it is unknown
+        :returns: The final response, or None if more chunks are expected, and the new offset
+        """
+        end = start + len(chunk)
+        offset = start
+
+        @asyncio.coroutine
+        def send(attempt):
+            nonlocal offset
+            if attempt:
+                resp = yield from self._send_upload_chunk(url, b'', None, total)
+                if resp.status != 308:
+                    return resp
+                offset = yield from self._committed_offset(resp, start, end)
+                if offset == end:
+                    return None
+            return (yield from self._send_upload_chunk(url, chunk[offset - start:], offset, total))
+
+        while True:
+            resp = yield from utils.retry(
+                send,
+                'Chunk at byte {} of {}'.format(offset, url),
+                retry_on=utils.is_transient,
+            )
+            # Drive already had the rest of the chunk when asked after a failure
+            if resp is None:
+                return None, end
+            if resp.status != 308:
+                return resp, end
+
+            offset = yield from self._committed_offset(resp, start, end)
+            if offset == end:
+                return None, end
+
+    @asyncio.coroutine
+    def _committed_offset(self, resp, start, end):
+        """The offset to continue from after a "Resume Incomplete" response, its Range holds the
+        bytes Drive has committed so far
+        """
+        committed = resp.headers.get('RANGE')
+        # Has no body, but must be read to hand the connection back to the pool
+        yield from resp.release()
+
+        offset = int(committed.rsplit('-', 1)[1]) + 1 if committed else 0
+        if not start <= offset <= end:
+            raise exceptions.UploadError(
+                'Cannot resume upload from byte {}, expected {} to {}'.format(offset, start, end)
+            )
+        return offset
+
+    @asyncio.coroutine
+    def _send_upload_chunk(self, url, data, offset, total):
+        total = '*' if total is None else total
+        if data:
+            content_range = 'bytes {}-{}/{}'.format(offset, offset + len(data) - 1, total)
+        else:
+            # Asks how much has been received, or finishes an upload whose last chunk was full
+            content_range = 'bytes */{}'.format(total)
+
+        return (yield from self.make_request(
             'PUT',
-            self._build_upload_url('files', *segments, uploadType='resumable', upload_id=upload_id),
-            headers={'Content-Length': str(stream.size)},
-            data=stream,
-            expects=(200, ),
+            url,
+            headers={'Content-Length': str(len(data)), 'Content-Range': content_range},
+            data=data,
+            allow_redirects=False,
+            expects=(200, 201, 308),
             throws=exceptions.UploadError,
-        )
-        return (yield from resp.json())
+        ))
 
     @asyncio.coroutine
     def _materialized_path_to_id(self, path, parent_id=None):
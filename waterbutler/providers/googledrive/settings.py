@@ -9,3 +9,7 @@ config = settings.get('GOOGLEDRIVE_PROVIDER_CONFIG', {})
 BASE_URL = config.get('BASE_URL', 'https://www.googleapis.com/drive/v2')
 BASE_UPLOAD_URL = config.get('BASE_UPLOAD_URL', 'https://www.googleapis.com/upload/drive/v2')
 DRIVE_IGNORE_VERSION = config.get('DRIVE_IGNORE_VERSION', '0000000000000000000000000000000000000')
+
+# Uploads are sent in chunks of UPLOAD_CHUNK_SIZE, rounded down to a multiple of 256KB as Drive
+# requires. A chunk that fails is resumed from the last byte Drive committed, as set by the core RETRIES
+UPLOAD_CHUNK_SIZE = config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)  # 8MB
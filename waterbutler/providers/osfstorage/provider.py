@@ -41,6 +41,9 @@ class OSFStorageProvider(provider.BaseProvider):
         self.archive_settings = settings.get('archive')
         self.archive_credentials = credentials.get('archive')
 
+        self.replica_settings = settings.get('replica')
+        self.replica_credentials = credentials.get('replica')
+
     @asyncio.coroutine
     def validate_v1_path(self, path, **kwargs):
         if path == '/':
@@ -126,6 +129,17 @@ class OSFStorageProvider(provider.BaseProvider):
             self.settings['storage'],
         )
 
+    def make_replica_provider(self):
+        """Creates a provider for the storage that uploads are replicated to as they are received.
+        Only meaningful when ``replica`` settings were given.
+        """
+        return utils.make_provider(
+            self.replica_settings['provider'],
+            self.auth,
+            self.replica_credentials,
+            self.replica_settings,
+        )
+
     def can_intra_copy(self, other, path=None):
         return isinstance(other, self.__class__)
 
@@ -242,37 +256,130 @@ class OSFStorageProvider(provider.BaseProvider):
         self._create_paths()
 
         pending_name = str(uuid.uuid4())
-        provider = self.make_provider(self.settings)
         local_pending_path = os.path.join(settings.FILE_PATH_PENDING, pending_name)
-        remote_pending_path = yield from provider.validate_path('/' + pending_name)
 
         stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
         stream.add_writer('sha1', streams.HashStreamWriter(hashlib.sha1))
         stream.add_writer('sha256', streams.HashStreamWriter(hashlib.sha256))
+        # Glacier's checksum, so archiving does not have to read the file again just to hash it
+        stream.add_writer('sha256_tree', streams.TreeHashStreamWriter())
 
+        # Spool the upload locally first, blobs are stored under their sha256 which is only known
+        # once the whole file has been received
         with open(local_pending_path, 'wb') as file_pointer:
             stream.add_writer('file', file_pointer)
-            yield from provider.upload(stream, remote_pending_path, check_created=False, fetch_metadata=False, **kwargs)
+            chunk = yield from stream.read(settings.SPOOL_CHUNK_SIZE)
+            while chunk:
+                chunk = yield from stream.read(settings.SPOOL_CHUNK_SIZE)
 
         complete_name = stream.writers['sha256'].hexdigest
         local_complete_path = os.path.join(settings.FILE_PATH_COMPLETE, complete_name)
-        remote_complete_path = yield from provider.validate_path('/' + complete_name)
-
-        try:
-            metadata = yield from provider.metadata(remote_complete_path)
-        except exceptions.MetadataError as e:
-            if e.code != 404:
-                raise
-            metadata, _ = yield from provider.move(provider, remote_pending_path, remote_complete_path)
-        else:
-            yield from provider.delete(remote_pending_path)
-        finally:
-            metadata = metadata.serialized()
 
         # Due to cross volume movement in unix we leverage shutil.move which properly handles this case.
         # http://bytes.com/topic/python/answers/41652-errno-18-invalid-cross-device-link-using-os-rename#post157964
         shutil.move(local_pending_path, local_complete_path)
 
+        hashes = {
+            'md5': stream.writers['md5'].hexdigest,
+            'sha1': stream.writers['sha1'].hexdigest,
+            'sha256': stream.writers['sha256'].hexdigest,
+        }
+        self._store_hashes(hashes)
+
+        targets = [self.make_provider(self.settings)]
+        if self.replica_settings:
+            targets.append(self.make_replica_provider())
+
+        blobs = yield from asyncio.gather(*[self._find_blob(target, complete_name) for target in targets])
+        # Only send the file to the storage that does not hold it yet
+        missing = [
+            (index, target, blob_path)
+            for index, (target, (blob_path, blob)) in enumerate(zip(targets, blobs))
+            if blob is None
+        ]
+
+        if missing:
+            with open(local_complete_path, 'rb') as file_pointer:
+                uploads = [
+                    # Bind the loop variables now, the uploads run after the loop has finished
+                    lambda stream, target=target, blob_path=blob_path: target.upload(
+                        stream, blob_path, **self._blob_upload_kwargs(target, kwargs)
+                    )
+                    for _, target, blob_path in missing
+                ]
+                if len(uploads) == 1:
+                    results = [(yield from uploads[0](streams.FileStreamReader(file_pointer)))]
+                else:
+                    # Replicate from the same single read of the spooled file
+                    results = yield from streams.TeeStream(streams.FileStreamReader(file_pointer)).run(*uploads)
+
+            for (index, target, blob_path), (blob, _) in zip(missing, results):
+                blobs[index] = blob_path, blob
+
+        _, metadata = blobs[0]
+        metadata = metadata.serialized()
+
+        return (yield from self._register_upload(
+            path, metadata, hashes, local_complete_path, tree_hash=stream.writers['sha256_tree'].hexdigest
+        ))
+
+    def _blob_upload_kwargs(self, target, kwargs):
+        """The keyword arguments to upload a blob ``target`` is known not to hold with. Only those
+        providers listed here accept more than the usual arguments.
+        """
+        if target.NAME == 'cloudfiles':
+            # Skips its lookup of the object being replaced
+            return dict(kwargs, check_created=False)
+        return kwargs
+
+    @asyncio.coroutine
+    def upload_from_digest(self, path, hashes, **kwargs):
+        """Registers a new version of ``path`` pointing at an already stored blob, for clients that
+        announce the sha256 of their upload. Blobs are stored under their sha256 so the body never
+        has to be read when it succeeds. Only the sha256 is taken from the client, the hashes sent
+        to the OSF are those recorded when this worker first received the blob. Its parity and
+        archive tasks ran back then, they are not started again.
+        """
+        if not settings.UPLOAD_DEDUP_PRECHECK or not hashes.get('sha256'):
+            return None
+
+        stored = self._load_hashes(hashes['sha256'])
+        if stored is None:
+            # Received by another worker, or never, the body is needed to know its other hashes
+            return None
+
+        _, metadata = yield from self._find_blob(self.make_provider(self.settings), stored['sha256'])
+        if metadata is None:
+            return None
+
+        return (yield from self._register_upload(path, metadata.serialized(), stored))
+
+    def _hashes_path(self, sha256):
+        return os.path.join(settings.FILE_PATH_COMPLETE, sha256 + '.json')
+
+    def _store_hashes(self, hashes):
+        """Records the hashes of a blob next to it, for :meth:`upload_from_digest` to register it
+        again without reading it. A partially written record is treated as missing.
+        """
+        with open(self._hashes_path(hashes['sha256']), 'w') as file_pointer:
+            json.dump(hashes, file_pointer)
+
+    def _load_hashes(self, sha256):
+        """The hashes recorded for the blob stored as ``sha256``, None if there are none."""
+        try:
+            with open(self._hashes_path(sha256)) as file_pointer:
+                hashes = json.load(file_pointer)
+        except (OSError, ValueError):
+            return None
+        if hashes.get('sha256') != sha256:
+            return None
+        return hashes
+
+    @asyncio.coroutine
+    def _register_upload(self, path, metadata, hashes, local_complete_path=None, tree_hash=None):
+        """Tells the OSF about a new version of ``path`` stored as ``metadata`` and, when the file
+        is available locally at ``local_complete_path``, kicks off its parity and archive tasks.
+        """
         response = yield from self.make_signed_request(
             'POST',
             self.build_url(path.parent.identifier, 'children'),
@@ -282,11 +389,7 @@ class OSFStorageProvider(provider.BaseProvider):
                 'user': self.auth['id'],
                 'settings': self.settings['storage'],
                 'metadata': metadata,
-                'hashes': {
-                    'md5': stream.writers['md5'].hexdigest,
-                    'sha1': stream.writers['sha1'].hexdigest,
-                    'sha256': stream.writers['sha256'].hexdigest,
-                },
+                'hashes': hashes,
                 'worker': {
                     'host': os.uname()[1],
                     # TODO: Include additional information
@@ -300,7 +403,7 @@ class OSFStorageProvider(provider.BaseProvider):
         created = response.status == 201
         data = yield from response.json()
 
-        if settings.RUN_TASKS and data.pop('archive', True):
+        if settings.RUN_TASKS and data.pop('archive', True) and local_complete_path:
             parity.main(
                 local_complete_path,
                 self.parity_credentials,
@@ -312,6 +415,7 @@ class OSFStorageProvider(provider.BaseProvider):
                 self.build_url('hooks', 'metadata') + '/',
                 self.archive_credentials,
                 self.archive_settings,
+                tree_hash=tree_hash,
             )
 
         name = path.name
@@ -329,6 +433,21 @@ class OSFStorageProvider(provider.BaseProvider):
         path._parts[-1]._id = metadata['path'].strip('/')
         return OsfStorageFileMetadata(metadata, str(path)), created
 
+    @asyncio.coroutine
+    def _find_blob(self, provider, name):
+        """Looks up the blob stored as ``name`` in ``provider``.
+
+        :rtype: (:class:`WaterButlerPath`, metadata or None if it is not stored there)
+        """
+        blob_path = yield from provider.validate_path('/' + name)
+
+        try:
+            return blob_path, (yield from provider.metadata(blob_path))
+        except exceptions.MetadataError as e:
+            if e.code != 404:
+                raise
+            return blob_path, None
+
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         if path.identifier is None:
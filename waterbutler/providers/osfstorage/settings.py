@@ -13,6 +13,15 @@ FILE_PATH_COMPLETE = config.get('FILE_PATH_COMPLETE', '/tmp/complete')
 
 RUN_TASKS = config.get('RUN_TASKS', False)
 
+# Uploads are written to FILE_PATH_PENDING, and hashed, in chunks of this size
+SPOOL_CHUNK_SIZE = config.get('SPOOL_CHUNK_SIZE', 64 * 1024)  # 64KB
+
+# Uploads sent with "Expect: 100-continue" and a sha256 (X-Content-SHA256 or Digest) of a blob that
+# this worker holds are registered without reading their body. Nothing proves the client has the
+# content, anyone knowing a file's sha256 may attach it to their own project, so only enable this
+# where every user may read every stored file
+UPLOAD_DEDUP_PRECHECK = config.get('UPLOAD_DEDUP_PRECHECK', False)
+
 HMAC_ALGORITHM = getattr(hashlib, config.get('HMAC_ALGORITHM', 'sha256'))
 
 HMAC_SECRET = config.get('HMAC_SECRET', None)
@@ -46,3 +55,18 @@ PARITY_REDUNDANCY = config.get('PARITY_REDUNDANCY', 5)
 PARITY_PROVIDER_NAME = config.get('PARITY_PROVIDER_NAME', 'cloudfiles')
 PARITY_PROVIDER_CREDENTIALS = config.get('PARITY_PROVIDER_CREDENTIALS', {})
 PARITY_PROVIDER_SETTINGS = config.get('PARITY_PROVIDER_SETTINGS', {})
+
+# Archive options
+# Files larger than ARCHIVE_MULTIPART_THRESHOLD are sent to Glacier in ARCHIVE_PART_SIZE parts,
+# ARCHIVE_CONCURRENCY of them at a time. Glacier requires the part size to be a power of two megabytes,
+# it is doubled as needed to stay within 10,000 parts
+ARCHIVE_MULTIPART_THRESHOLD = config.get('ARCHIVE_MULTIPART_THRESHOLD', 100 * 1024 * 1024)  # 100MB
+ARCHIVE_PART_SIZE = config.get('ARCHIVE_PART_SIZE', 32 * 1024 * 1024)  # 32MB
+ARCHIVE_CONCURRENCY = config.get('ARCHIVE_CONCURRENCY', 4)
+# Each part is retried on its own, waiting ARCHIVE_PART_RETRY_BACKOFF * attempt seconds in between
+ARCHIVE_PART_RETRIES = config.get('ARCHIVE_PART_RETRIES', 3)
+ARCHIVE_PART_RETRY_BACKOFF = config.get('ARCHIVE_PART_RETRY_BACKOFF', 1)
+
+# Checked here rather than by Glacier once an archive is already being uploaded
+assert ARCHIVE_PART_SIZE in [1024 * 1024 * 2 ** n for n in range(13)], \
+    'ARCHIVE_PART_SIZE must be a power of two megabytes between 1MB and 4GB, not {}'.format(ARCHIVE_PART_SIZE)
@@ -1,16 +1,29 @@
 import os
 import http
 import json
+import time
+import socket
 import asyncio
+import binascii
+import hashlib
+import concurrent.futures
 
 import aiohttp
 from boto.glacier.layer2 import Layer2
+from boto.glacier.utils import minimum_part_size
 from boto.glacier.exceptions import UnexpectedHTTPResponseError
+from celery.utils.log import get_task_logger
 
 from waterbutler.core import signing
 from waterbutler.core.utils import async_retry
+from waterbutler.core.streams.metadata import tree_hash as combine_tree_hashes
+from waterbutler.core.streams.metadata import TreeHashStreamWriter
 from waterbutler.providers.osfstorage import settings
 from waterbutler.providers.osfstorage.tasks import utils
+from waterbutler.providers.osfstorage.tasks import exceptions
+
+
+logger = get_task_logger(__name__)
 
 
 def get_vault(credentials, settings):
@@ -21,14 +34,99 @@ def get_vault(credentials, settings):
     return layer2.get_vault(settings['vault'])
 
 
+def upload_archive(vault, local_path, description, tree_hash=None):
+    """Archives the file at ``local_path``, in concurrent parts if it is large.
+
+    :param str tree_hash: The hex SHA-256 tree hash of the file if it was computed while the file was
+        received. Saves reading the file just to hash it, and the uploaded archive is checked against it.
+    :rtype: str
+    :returns: The archive id
+    """
+    size = os.path.getsize(local_path)
+    if size > settings.ARCHIVE_MULTIPART_THRESHOLD:
+        return _upload_archive_multipart(vault, local_path, size, description, tree_hash)
+
+    if tree_hash is None:
+        return vault.upload_archive(local_path, description=description)
+
+    # Completed files are named after their sha256, which is the linear hash Glacier wants
+    _, linear_hash = os.path.split(local_path)
+    with open(local_path, 'rb') as file_pointer:
+        response = vault.layer1.upload_archive(vault.name, file_pointer, linear_hash, tree_hash, description)
+    return response['ArchiveId']
+
+
+def _upload_archive_multipart(vault, local_path, size, description, expected_tree_hash=None):
+    part_size = minimum_part_size(size, settings.ARCHIVE_PART_SIZE)
+    upload_id = vault.layer1.initiate_multipart_upload(vault.name, part_size, description)['UploadId']
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(settings.ARCHIVE_CONCURRENCY) as executor:
+            futures = [
+                executor.submit(_upload_archive_part, vault, upload_id, local_path, start, min(part_size, size - start))
+                for start in range(0, size, part_size)
+            ]
+            try:
+                part_hashes = [future.result() for future in futures]
+            except Exception:
+                # Parts that have not started yet are dropped rather than sent for nothing
+                for future in futures:
+                    future.cancel()
+                raise
+
+        # The tree hashes of power of two megabyte parts combine into that of the whole file
+        archive_tree_hash = binascii.hexlify(combine_tree_hashes(part_hashes)).decode()
+        if expected_tree_hash is not None and archive_tree_hash != expected_tree_hash:
+            raise exceptions.ArchiveError('{} changed on disk, tree hash {} != {}'.format(
+                local_path, archive_tree_hash, expected_tree_hash
+            ))
+
+        response = vault.layer1.complete_multipart_upload(vault.name, upload_id, archive_tree_hash, size)
+    except Exception:
+        try:
+            vault.layer1.abort_multipart_upload(vault.name, upload_id)
+        except Exception:
+            logger.exception('Failed to abort multipart upload {} to vault {}'.format(upload_id, vault.name))
+        raise
+
+    return response['ArchiveId']
+
+
+def _upload_archive_part(vault, upload_id, local_path, start, length):
+    """Reads and uploads a single part, hashing it on the way. Only this part is retried if sending
+    it fails.
+
+    :rtype: bytes
+    :returns: The binary tree hash of the part
+    """
+    with open(local_path, 'rb') as file_pointer:
+        file_pointer.seek(start)
+        data = file_pointer.read(length)
+
+    tree_hasher = TreeHashStreamWriter()
+    tree_hasher.write(data)
+    linear_hash = hashlib.sha256(data).hexdigest()
+    byte_range = (start, start + len(data) - 1)
+
+    for attempt in range(settings.ARCHIVE_PART_RETRIES + 1):
+        try:
+            vault.layer1.upload_part(vault.name, upload_id, linear_hash, tree_hasher.hexdigest, byte_range, data)
+            return tree_hasher.digest
+        except (UnexpectedHTTPResponseError, http.client.HTTPException, socket.error) as error:
+            if attempt == settings.ARCHIVE_PART_RETRIES:
+                raise
+            logger.warning('Archive part {}-{} of {} failed ({!r}), retrying'.format(byte_range[0], byte_range[1], local_path, error))
+            time.sleep(settings.ARCHIVE_PART_RETRY_BACKOFF * (attempt + 1))
+
+
 @utils.task
 def _push_file_archive(self, local_path, version_id, callback_url,
-                       credentials, settings):
+                       credentials, settings, tree_hash=None):
     _, name = os.path.split(local_path)
     with utils.RetryUpload(self):
         vault = get_vault(credentials, settings)
         try:
-            glacier_id = vault.upload_archive(local_path, description=name)
+            glacier_id = upload_archive(vault, local_path, name, tree_hash)
         except UnexpectedHTTPResponseError as error:
             # Glacier doesn't allow empty files; catch this exception but raise
             # other errors
@@ -69,5 +167,5 @@ def _push_archive_complete(self, version_id, callback_url, metadata):
 
 
 @async_retry(retries=5, backoff=5)
-def main(local_path, version_id, callback_url, credentials, settings):
-    return _push_file_archive.delay(local_path, version_id, callback_url, credentials, settings)
+def main(local_path, version_id, callback_url, credentials, settings, tree_hash=None):
+    return _push_file_archive.delay(local_path, version_id, callback_url, credentials, settings, tree_hash=tree_hash)
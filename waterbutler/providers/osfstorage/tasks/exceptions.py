@@ -1,2 +1,6 @@
 class ParchiveError(Exception):
     pass
+
+
+class ArchiveError(Exception):
+    pass
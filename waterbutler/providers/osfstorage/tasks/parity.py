@@ -4,44 +4,61 @@ import asyncio
 from waterbutler.core import streams
 from waterbutler.core.utils import async_retry
 from waterbutler.core.utils import make_provider
+from waterbutler.tasks import settings as tasks_settings
 
 from waterbutler.providers.osfstorage.tasks import utils
 from waterbutler.providers.osfstorage import settings as osf_settings
 
 
-@utils.task
+@utils.task(queue=tasks_settings.PARITY_QUEUE)
 def _parity_create_files(self, name, credentials, settings):
     path = os.path.join(osf_settings.FILE_PATH_COMPLETE, name)
     loop = asyncio.get_event_loop()
     with utils.RetryUpload(self):
-        parity_paths = utils.create_parity_files(
-            path,
-            redundancy=osf_settings.PARITY_REDUNDANCY,
-        )
-        if not parity_paths:
-            # create_parity_files will return [] for empty files
-            return
-        futures = [asyncio.async(_upload_parity(each, credentials, settings)) for each in parity_paths]
-        results, _ = loop.run_until_complete(asyncio.wait(futures, return_when=asyncio.FIRST_EXCEPTION))
-        # Errors are not raised in `wait`; explicitly check results for errors
-        # and raise if any found
-        for each in results:
-            error = each.exception()
-            if error:
-                raise error
+        loop.run_until_complete(_create_and_upload_parity(path, credentials, settings))
 
 
 @asyncio.coroutine
-def _upload_parity(path, credentials, settings):
+def _create_and_upload_parity(path, credentials, settings):
+    parity_paths = yield from utils.create_parity_files(
+        path,
+        redundancy=osf_settings.PARITY_REDUNDANCY,
+    )
+    if not parity_paths:
+        # create_parity_files will return [] for empty files
+        return
+
+    # One provider for every volume of this file
+    provider = make_provider(settings.get('provider'), {}, credentials, settings)
+    futures = [asyncio.async(_upload_parity(provider, each)) for each in parity_paths]
+    try:
+        yield from asyncio.gather(*futures)
+    except Exception:
+        # Stop the remaining uploads and let them remove their files before giving up
+        for future in futures:
+            future.cancel()
+        yield from asyncio.wait(futures)
+        raise
+
+
+@asyncio.coroutine
+def _upload_parity(provider, path):
+    """Uploads a single parity volume, removing the local copy once it is no longer needed. Should
+    the task be retried par2 is run again, so failed volumes are removed as well.
+    """
     _, name = os.path.split(path)
-    provider_name = settings.get('provider')
-    provider = make_provider(provider_name, {}, credentials, settings)
-    with open(path, 'rb') as file_pointer:
-        stream = streams.FileStreamReader(file_pointer)
-        yield from provider.upload(
-            stream,
-            (yield from provider.validate_path('/' + name))
-        )
+    try:
+        with open(path, 'rb') as file_pointer:
+            stream = streams.FileStreamReader(file_pointer)
+            yield from provider.upload(
+                stream,
+                (yield from provider.validate_path('/' + name))
+            )
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
 
 
 @async_retry(retries=5, backoff=5)
@@ -1,6 +1,7 @@
 import os
 import glob
 import errno
+import asyncio
 import logging
 import functools
 import contextlib
@@ -34,8 +35,11 @@ def ensure_paths():
         ensure_path(path)
 
 
+@asyncio.coroutine
 def create_parity_files(file_path, redundancy=5):
-    """
+    """Runs par2 on ``file_path`` without blocking the event loop.
+
+    :rtype: list of the paths of the index and recovery volumes, empty for empty files
     :raise: `ParchiveError` if creation of parity files fails
     """
     try:
@@ -45,25 +49,29 @@ def create_parity_files(file_path, redundancy=5):
     except OSError as error:
         raise exceptions.ParchiveError('Could not read file: {0}'.format(error.strerror))
     path, name = os.path.split(file_path)
-    with open(os.devnull, 'wb') as DEVNULL:
-        args = [
-            'par2',
-            'c',
-            '-r{0}'.format(redundancy),
-            os.path.join(path, '{0}.par2'.format(name)),
-            file_path,
-        ]
-
-        ret_code = subprocess.call(args, stdout=DEVNULL, stderr=DEVNULL)
-
-        if ret_code != 0:
-            raise exceptions.ParchiveError('{0} failed with code {1}'.format(' '.join(args), ret_code))
-
-        return [
-            os.path.abspath(fpath)
-            for fpath in
-            glob.glob(os.path.join(path, '{0}*.par2'.format(name)))
-        ]
+    args = [
+        'par2',
+        'c',
+        '-r{0}'.format(redundancy),
+        os.path.join(path, '{0}.par2'.format(name)),
+        file_path,
+    ]
+
+    process = yield from asyncio.create_subprocess_exec(
+        *args,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    ret_code = yield from process.wait()
+
+    if ret_code != 0:
+        raise exceptions.ParchiveError('{0} failed with code {1}'.format(' '.join(args), ret_code))
+
+    return [
+        os.path.abspath(fpath)
+        for fpath in
+        glob.glob(os.path.join(path, '{0}*.par2'.format(name)))
+    ]
 
 
 def sanitize_request(request):
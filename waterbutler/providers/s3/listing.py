@@ -0,0 +1,172 @@
+import asyncio
+import collections
+from xml.etree import ElementTree
+
+from waterbutler.core import exceptions
+
+from waterbutler.providers.s3 import settings
+from waterbutler.providers.s3.metadata import S3FileMetadata
+from waterbutler.providers.s3.metadata import S3FolderMetadata
+from waterbutler.providers.s3.metadata import S3FolderKeyMetadata
+
+
+def _local_name(tag):
+    return tag.rpartition('}')[2]
+
+
+def _element_to_dict(element):
+    return {
+        _local_name(child.tag): _element_to_dict(child) if len(child) else child.text
+        for child in element
+    }
+
+
+class S3FolderListing:
+    """Lists the children of a folder lazily, through as many ListBucketResult pages as it takes.
+    Pages are requested one at a time as they are needed and parsed incrementally while they are
+    received, so only a single page of metadata is held however large the folder is.
+
+    Call :meth:`next` until it returns None. :attr:`marker` names the last child handed out and
+    may be given to a later listing to resume right after it.
+
+    :param str marker: Only list children that sort after this key or prefix
+    :param int page_size: The ``max-keys`` of each request, S3 caps it at 1,000
+    :param bool recursive: List every key under the folder, its own included, rather than its
+        immediate children
+    """
+
+    def __init__(self, provider, path, marker=None, page_size=None, recursive=False):
+        self.provider = provider
+        self.path = path
+        self.marker = marker
+        self.page_size = page_size
+        self.recursive = recursive
+        # Number of entries S3 has returned, including the folder's own key
+        self.seen = 0
+
+        self._page = collections.deque()
+        self._next_marker = marker
+        self._exhausted = False
+
+    @property
+    def exhausted(self):
+        return self._exhausted and not self._page
+
+    @asyncio.coroutine
+    def next(self):
+        """The metadata of the next child, None once there are no more"""
+        while not self._page:
+            if self._exhausted:
+                return None
+            yield from self._fetch_page()
+
+        name, item = self._page.popleft()
+        self.marker = name
+        return item
+
+    @asyncio.coroutine
+    def next_page(self):
+        """The metadata of the children left in the current page, fetching the next one once it
+        has been handed out. None once there are no more
+        """
+        while not self._page:
+            if self._exhausted:
+                return None
+            yield from self._fetch_page()
+
+        self.marker = self._page[-1][0]
+        items = [item for _, item in self._page]
+        self._page.clear()
+        return items
+
+    @asyncio.coroutine
+    def all(self):
+        items = []
+        item = yield from self.next()
+        while item is not None:
+            items.append(item)
+            item = yield from self.next()
+        return items
+
+    @asyncio.coroutine
+    def _fetch_page(self):
+        params = {'prefix': self.path.path}
+        if not self.recursive:
+            params['delimiter'] = '/'
+        if self._next_marker is not None:
+            params['marker'] = self._next_marker
+        if self.page_size is not None:
+            params['max-keys'] = str(self.page_size)
+
+        resp = yield from self.provider.make_request(
+            'GET',
+            self.provider.bucket.generate_url(settings.TEMP_URL_SECS, 'GET'),
+            params=params,
+            expects=(200, ),
+            throws=exceptions.MetadataError,
+        )
+
+        entries, truncated, next_marker = yield from self._parse_page(resp)
+        self.seen += len(entries)
+
+        # Keys and prefixes come back in separate runs; hand them out in S3's own order so that
+        # the marker of any child is a correct place to resume from
+        entries.sort(key=lambda entry: entry[0])
+        last = entries[-1][0] if entries else None
+
+        for name, item in entries:
+            if self.recursive or name != self.path.path:
+                self._page.append((name, item))
+
+        if truncated and (next_marker or last):
+            self._next_marker = next_marker or last
+        else:
+            self._exhausted = True
+
+    @asyncio.coroutine
+    def _parse_page(self, resp):
+        parser = ElementTree.XMLPullParser(events=('start', 'end'))
+        entries, truncated, next_marker = [], False, None
+        root, depth = None, 0
+
+        try:
+            while True:
+                chunk = yield from resp.content.read(settings.LISTING_CHUNK_SIZE)
+                if not chunk:
+                    break
+                parser.feed(chunk)
+
+                for event, element in parser.read_events():
+                    if event == 'start':
+                        depth += 1
+                        if root is None:
+                            root = element
+                        continue
+
+                    depth -= 1
+                    if depth != 1:
+                        continue
+
+                    tag = _local_name(element.tag)
+                    if tag == 'Contents':
+                        item = _element_to_dict(element)
+                        if item['Key'].endswith('/'):
+                            entries.append((item['Key'], S3FolderKeyMetadata(item)))
+                        else:
+                            entries.append((item['Key'], S3FileMetadata(item)))
+                    elif tag == 'CommonPrefixes':
+                        item = _element_to_dict(element)
+                        entries.append((item['Prefix'], S3FolderMetadata(item)))
+                    elif tag == 'IsTruncated':
+                        truncated = element.text == 'true'
+                    elif tag == 'NextMarker':
+                        next_marker = element.text
+
+                    # Done with it, drop it so the document never accumulates
+                    root.remove(element)
+        finally:
+            # Released once read through, a page abandoned part way also drops its connection
+            resp.close()
+
+        parser.close()
+        return entries, truncated, next_marker
@@ -5,6 +5,9 @@ from waterbutler.core import metadata
 
 class S3Metadata(metadata.BaseMetadata):
 
+    # Listings create one of these per key, keep them free of a __dict__
+    __slots__ = ()
+
     @property
     def provider(self):
         return 's3'
@@ -16,6 +19,8 @@ class S3Metadata(metadata.BaseMetadata):
 
 class S3FileMetadataHeaders(S3Metadata, metadata.BaseFileMetadata):
 
+    __slots__ = ('_path', )
+
     def __init__(self, path, headers):
         self._path = path
         # Cast to dict to clone as the headers will
@@ -52,6 +57,8 @@ class S3FileMetadataHeaders(S3Metadata, metadata.BaseFileMetadata):
 
 class S3FileMetadata(S3Metadata, metadata.BaseFileMetadata):
 
+    __slots__ = ()
+
     @property
     def path(self):
         return '/' + self.raw['Key']
@@ -81,6 +88,8 @@ class S3FileMetadata(S3Metadata, metadata.BaseFileMetadata):
 
 class S3FolderKeyMetadata(S3Metadata, metadata.BaseFolderMetadata):
 
+    __slots__ = ()
+
     @property
     def name(self):
         return self.raw['Key'].split('/')[-2]
@@ -92,6 +101,8 @@ class S3FolderKeyMetadata(S3Metadata, metadata.BaseFolderMetadata):
 
 class S3FolderMetadata(S3Metadata, metadata.BaseFolderMetadata):
 
+    __slots__ = ()
+
     @property
     def name(self):
         return self.raw['Prefix'].split('/')[-2]
@@ -104,6 +115,8 @@ class S3FolderMetadata(S3Metadata, metadata.BaseFolderMetadata):
 # TODO dates!
 class S3Revision(metadata.BaseFileRevisionMetadata):
 
+    __slots__ = ()
+
     @property
     def version_identifier(self):
         return 'version'
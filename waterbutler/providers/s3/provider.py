@@ -1,8 +1,12 @@
 import os
+import base64
 import asyncio
 import hashlib
+import logging
 from urllib import parse
 
+import aiohttp
+
 import xmltodict
 
 import xml.sax.saxutils
@@ -13,19 +17,22 @@ from boto.s3.connection import S3Connection
 from boto.s3.connection import OrdinaryCallingFormat
 from boto.s3.connection import SubdomainCallingFormat
 
+from waterbutler.core import utils
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.s3 import settings
+from waterbutler.providers.s3.listing import S3FolderListing
 from waterbutler.providers.s3.metadata import S3Revision
-from waterbutler.providers.s3.metadata import S3FileMetadata
 from waterbutler.providers.s3.metadata import S3FolderMetadata
-from waterbutler.providers.s3.metadata import S3FolderKeyMetadata
 from waterbutler.providers.s3.metadata import S3FileMetadataHeaders
 
 
+logger = logging.getLogger(__name__)
+
+
 class S3Provider(provider.BaseProvider):
     """Provider for the Amazon's S3
     """
@@ -89,6 +96,9 @@ class S3Provider(provider.BaseProvider):
     def validate_path(self, path, **kwargs):
         return WaterButlerPath(path)
 
+    def can_download_ranges(self, path=None):
+        return True
+
     def can_intra_copy(self, dest_provider, path=None):
         return type(self) == type(dest_provider) and not getattr(path, 'is_dir', False)
 
@@ -98,14 +108,22 @@ class S3Provider(provider.BaseProvider):
     @asyncio.coroutine
     def intra_copy(self, dest_provider, source_path, dest_path):
         """Copy key from one S3 bucket to another. The credentials specified in
-        `dest_provider` must have read access to `source.bucket`.
+        `dest_provider` must have read access to `source.bucket`. Keys larger than
+        ``MULTIPART_COPY_THRESHOLD`` are copied as a multipart upload of ranges of the source,
+        single copies being limited to 5GB.
         """
         exists = yield from dest_provider.exists(dest_path)
-        dest_key = dest_provider.bucket.new_key(dest_path.path)
+        source_metadata = yield from self._metadata_file(source_path)
 
         # ensure no left slash when joining paths
-        source_path = '/' + os.path.join(self.settings['bucket'], source_path.path)
-        headers = {'x-amz-copy-source': parse.quote(source_path)}
+        copy_source = parse.quote('/' + os.path.join(self.settings['bucket'], source_path.path))
+
+        if int(source_metadata.size) > settings.MULTIPART_COPY_THRESHOLD:
+            yield from dest_provider._copy_multipart(copy_source, int(source_metadata.size), dest_path)
+            return (yield from dest_provider.metadata(dest_path)), not exists
+
+        dest_key = dest_provider.bucket.new_key(dest_path.path)
+        headers = {'x-amz-copy-source': copy_source}
         url = dest_key.generate_url(
             settings.TEMP_URL_SECS,
             'PUT',
@@ -119,6 +137,80 @@ class S3Provider(provider.BaseProvider):
         )
         return (yield from dest_provider.metadata(dest_path)), not exists
 
+    @asyncio.coroutine
+    def _copy_multipart(self, copy_source, size, path):
+        """Copies ``size`` bytes of the key ``copy_source`` to ``path`` with UploadPartCopy, up to
+        ``MULTIPART_COPY_CONCURRENCY`` parts at a time. No data passes through WaterButler.
+        """
+        part_size = max(settings.MULTIPART_COPY_PART_SIZE, self._multipart_part_size(size))
+        ranges = [
+            (start, min(start + part_size, size) - 1)
+            for start in range(0, size, part_size)
+        ]
+
+        upload_id = yield from self._create_multipart_upload(path)
+
+        try:
+            pending, etags = set(), {}
+            try:
+                for part_number, (start, end) in enumerate(ranges, 1):
+                    pending.add(asyncio.async(
+                        self._copy_part(path, upload_id, part_number, copy_source, start, end)
+                    ))
+                    if len(pending) >= settings.MULTIPART_COPY_CONCURRENCY:
+                        done, pending = yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        etags.update(future.result() for future in done)
+
+                if pending:
+                    done, pending = yield from asyncio.wait(pending)
+                    etags.update(future.result() for future in done)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+            yield from self._complete_multipart_upload(path, upload_id, sorted(etags.items()))
+        except Exception:
+            yield from self._abort_multipart_upload(path, upload_id)
+            raise
+
+    @asyncio.coroutine
+    def _copy_part(self, path, upload_id, part_number, copy_source, start, end):
+        """Copies bytes ``start`` through ``end`` of ``copy_source`` into a single part
+
+        :rtype: (part number, etag)
+        """
+        headers = {
+            'x-amz-copy-source': copy_source,
+            'x-amz-copy-source-range': 'bytes={}-{}'.format(start, end),
+        }
+
+        @asyncio.coroutine
+        def copy(attempt):
+            resp = yield from self.make_request(
+                'PUT',
+                self.bucket.new_key(path.path).generate_url(
+                    settings.TEMP_URL_SECS,
+                    'PUT',
+                    query_parameters={'partNumber': str(part_number), 'uploadId': upload_id},
+                    headers=headers,
+                ),
+                headers=headers,
+                expects=(200, ),
+                throws=exceptions.IntraCopyError,
+            )
+
+            # As with completing an upload, a failed copy may still be answered with a 200
+            parsed = xmltodict.parse((yield from resp.read_and_close()))
+            if 'CopyPartResult' not in parsed:
+                raise exceptions.IntraCopyError(
+                    'Could not copy part {} of {}: {}'.format(
+                        part_number, path, parsed.get('Error', {}).get('Message')
+                    )
+                )
+            return part_number, parsed['CopyPartResult']['ETag'].replace('"', '')
+
+        return (yield from utils.retry(copy, 'Part {} of {}'.format(part_number, path)))
+
     @asyncio.coroutine
     def download(self, path, accept_url=False, version=None, range=None, **kwargs):
         """Returns a ResponseWrapper (Stream) for the specified path
@@ -161,7 +253,7 @@ class S3Provider(provider.BaseProvider):
             throws=exceptions.DownloadError,
         )
 
-        return streams.ResponseStreamReader(resp)
+        return self.apply_range(streams.ResponseStreamReader(resp), range)
 
     @asyncio.coroutine
     def upload(self, stream, path, conflict='replace', **kwargs):
@@ -173,6 +265,11 @@ class S3Provider(provider.BaseProvider):
         :rtype: dict, bool
         """
         path, exists = yield from self.handle_name_conflict(path, conflict=conflict)
+
+        if stream.size is not None and stream.size > settings.MULTIPART_THRESHOLD:
+            yield from self._upload_multipart(stream, path)
+            return (yield from self.metadata(path, **kwargs)), not exists
+
         stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
 
         resp = yield from self.make_request(
@@ -193,6 +290,186 @@ class S3Provider(provider.BaseProvider):
 
         return (yield from self.metadata(path, **kwargs)), not exists
 
+    @asyncio.coroutine
+    def _upload_multipart(self, stream, path):
+        """Uploads ``stream`` as a multipart upload, aborting it if any part ultimately fails so
+        that S3 does not keep, and bill for, the orphaned parts.
+        """
+        upload_id = yield from self._create_multipart_upload(path)
+
+        try:
+            parts = yield from self._upload_parts(stream, path, upload_id)
+            yield from self._complete_multipart_upload(path, upload_id, parts)
+        except Exception:
+            yield from self._abort_multipart_upload(path, upload_id)
+            raise
+
+    def _multipart_part_size(self, size):
+        """The smallest part size, rounded up to a whole MB, that fits ``size`` bytes within
+        ``MULTIPART_MAX_PARTS`` parts
+        """
+        mb = 1024 * 1024
+        part_size = -(-size // settings.MULTIPART_MAX_PARTS)
+        return max(settings.MULTIPART_MIN_PART_SIZE, -(-part_size // mb) * mb)
+
+    @asyncio.coroutine
+    def _create_multipart_upload(self, path):
+        resp = yield from self.make_request(
+            'POST',
+            self.bucket.new_key(path.path).generate_url(
+                settings.TEMP_URL_SECS,
+                'POST',
+                query_parameters={'uploads': ''},
+                encrypt_key=self.encrypt_uploads,
+            ),
+            expects=(200, ),
+            throws=exceptions.UploadError,
+        )
+        contents = yield from resp.read_and_close()
+        return xmltodict.parse(contents)['InitiateMultipartUploadResult']['UploadId']
+
+    @asyncio.coroutine
+    def _upload_parts(self, stream, path, upload_id):
+        """Reads ``stream`` a part at a time, keeping at most ``MULTIPART_CONCURRENCY`` parts
+        buffered and in flight.
+
+        :rtype: list of (part number, etag) tuples
+        :raises UploadError: If ``stream`` ends short of its size, e.g. the client disconnected
+        """
+        part_size = self._multipart_part_size(stream.size)
+        pending, etags = set(), {}
+        received = 0
+
+        try:
+            for part_number in range(1, settings.MULTIPART_MAX_PARTS + 1):
+                data = yield from self._read_part(stream, part_size)
+                if not data:
+                    break
+                received += len(data)
+
+                pending.add(asyncio.async(self._upload_part(path, upload_id, part_number, data)))
+                if len(pending) >= settings.MULTIPART_CONCURRENCY:
+                    done, pending = yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    etags.update(future.result() for future in done)
+
+                if len(data) < part_size:
+                    break
+
+            # A closed request body reads as EOF, the upload must not be completed with what arrived
+            if received != stream.size:
+                raise exceptions.UploadError(
+                    'Expected {} bytes for {}, received {}'.format(stream.size, path, received)
+                )
+
+            if pending:
+                done, pending = yield from asyncio.wait(pending)
+                etags.update(future.result() for future in done)
+        finally:
+            for future in pending:
+                future.cancel()
+
+        return sorted(etags.items())
+
+    @asyncio.coroutine
+    def _read_part(self, stream, part_size):
+        data = bytearray()
+        while len(data) < part_size:
+            chunk = yield from stream.read(part_size - len(data))
+            if not chunk:
+                break
+            data.extend(chunk)
+        return bytes(data)
+
+    @asyncio.coroutine
+    def _upload_part(self, path, upload_id, part_number, data):
+        """Uploads a single part, retrying it on failure. S3 verifies the body against Content-MD5
+        and the returned ETag is checked against it as well.
+
+        :rtype: (part number, etag)
+        """
+        md5 = hashlib.md5(data)
+        headers = {'Content-MD5': base64.b64encode(md5.digest()).decode('ascii')}
+
+        @asyncio.coroutine
+        def upload(attempt):
+            resp = yield from self.make_request(
+                'PUT',
+                self.bucket.new_key(path.path).generate_url(
+                    settings.TEMP_URL_SECS,
+                    'PUT',
+                    query_parameters={'partNumber': str(part_number), 'uploadId': upload_id},
+                    headers=headers,
+                ),
+                data=data,
+                headers=dict(headers, **{'Content-Length': str(len(data))}),
+                expects=(200, ),
+                throws=exceptions.UploadError,
+            )
+
+            etag = resp.headers['ETag'].replace('"', '')
+            if etag != md5.hexdigest():
+                raise exceptions.UploadError(
+                    'Part {} of {} was corrupted in transit'.format(part_number, path)
+                )
+            return part_number, etag
+
+        return (yield from utils.retry(upload, 'Part {} of {}'.format(part_number, path)))
+
+    @asyncio.coroutine
+    def _complete_multipart_upload(self, path, upload_id, parts):
+        payload = '<?xml version="1.0" encoding="UTF-8"?>'
+        payload += '<CompleteMultipartUpload>'
+        payload += ''.join(
+            '<Part><PartNumber>{}</PartNumber><ETag>"{}"</ETag></Part>'.format(number, etag)
+            for number, etag in parts
+        )
+        payload += '</CompleteMultipartUpload>'
+        payload = payload.encode('utf-8')
+
+        resp = yield from self.make_request(
+            'POST',
+            self.bucket.new_key(path.path).generate_url(
+                settings.TEMP_URL_SECS,
+                'POST',
+                query_parameters={'uploadId': upload_id},
+            ),
+            data=payload,
+            headers={'Content-Length': str(len(payload))},
+            expects=(200, ),
+            throws=exceptions.UploadError,
+        )
+
+        # S3 may report a failure with a 200 once it has started processing the request
+        parsed = xmltodict.parse((yield from resp.read_and_close()))
+        if 'Error' in parsed:
+            raise exceptions.UploadError(
+                'Could not complete the upload of {}: {}'.format(path, parsed['Error'].get('Message'))
+            )
+
+        # The ETag of a multipart upload is the md5 of its parts' md5s and the number of parts
+        expected = '{}-{}'.format(
+            hashlib.md5(b''.join(bytes.fromhex(etag) for _, etag in parts)).hexdigest(),
+            len(parts),
+        )
+        if parsed['CompleteMultipartUploadResult']['ETag'].replace('"', '') != expected:
+            raise exceptions.UploadError('Upload of {} was corrupted in transit'.format(path))
+
+    @asyncio.coroutine
+    def _abort_multipart_upload(self, path, upload_id):
+        try:
+            yield from self.make_request(
+                'DELETE',
+                self.bucket.new_key(path.path).generate_url(
+                    settings.TEMP_URL_SECS,
+                    'DELETE',
+                    query_parameters={'uploadId': upload_id},
+                ),
+                expects=(204, ),
+                throws=exceptions.UploadError,
+            )
+        except (exceptions.UploadError, aiohttp.errors.ClientError) as e:
+            logger.error('Could not abort multipart upload {} of {}: {!r}'.format(upload_id, path, e))
+
     @asyncio.coroutine
     def delete(self, path, **kwargs):
         """Deletes the key at the specified path
@@ -216,75 +493,73 @@ class S3Provider(provider.BaseProvider):
         of their children.  A regular DELETE request issued against a folder will not work unless
         that folder is completely empty.  To fully delete an occupied folder, we must delete all
         of the comprising objects.  Amazon provides a bulk delete operation to simplify this.
-        """
-
-        more_to_come = True
-        content_keys = []
-        query_params = {'prefix': path.path}
-        marker = None
 
-        while more_to_come:
-            if marker is not None:
-                query_params['marker'] = marker
-
-            resp = yield from self.make_request(
-                'GET',
-                self.bucket.generate_url(settings.TEMP_URL_SECS, 'GET'),
-                params=query_params,
-                expects=(200, ),
-                throws=exceptions.MetadataError,
-            )
+        Each page of the listing, at most 1,000 keys, is deleted while the next one is fetched,
+        with up to DELETE_CONCURRENCY bulk deletes in flight. Listing continues from the last key
+        seen so deleting earlier keys does not disturb it, and only that many pages are ever held.
+        """
+        pending = set()
+        listing = self.list_folder(path, recursive=True)
+
+        try:
+            while True:
+                items = yield from listing.next_page()
+                if items is None:
+                    break
+
+                if len(pending) >= settings.DELETE_CONCURRENCY:
+                    done, pending = yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(asyncio.async(self._delete_keys([item.raw['Key'] for item in items])))
+
+            if pending:
+                done, pending = yield from asyncio.wait(pending)
+                for future in done:
+                    future.result()
+        except Exception:
+            for future in pending:
+                future.cancel()
+            raise
 
-            contents = yield from resp.read_and_close()
-            parsed = xmltodict.parse(contents, strip_whitespace=False)['ListBucketResult']
-            more_to_come = parsed.get('IsTruncated') == 'true'
-            contents = parsed.get('Contents', [])
-
-            if isinstance(contents, dict):
-                contents = [contents]
-
-            content_keys.extend([content['Key'] for content in contents])
-            if len(content_keys) > 0:
-                marker = content_keys[-1]
-
-        while len(content_keys) > 0:
-            key_batch = content_keys[:1000]
-            del content_keys[:1000]
-
-            payload = '<?xml version="1.0" encoding="UTF-8"?>'
-            payload += '<Delete>'
-            payload += ''.join(map(
-                lambda x: '<Object><Key>{}</Key></Object>'.format(xml.sax.saxutils.escape(x)),
-                key_batch
-            ))
-            payload += '</Delete>'
-            payload = payload.encode('utf-8')
-            md5 = compute_md5(BytesIO(payload))
-
-            query_params = {'delete': ''}
-            headers = {
-                'Content-Length': str(len(payload)),
-                'Content-MD5': md5[1],
-                'Content-Type': 'text/xml',
-            }
-
-            # We depend on a customized version of boto that can make query parameters part of
-            # the signature.
-            url = self.bucket.generate_url(
-                settings.TEMP_URL_SECS,
-                'POST',
-                query_parameters=query_params,
-                headers=headers,
-            )
-            yield from self.make_request(
-                'POST',
-                url,
-                params=query_params,
-                data=payload,
-                headers=headers,
-                expects=(200, 204, ),
-                throws=exceptions.DeleteError,
-            )
+    @asyncio.coroutine
+    def _delete_keys(self, keys):
+        """Delete up to 1,000 keys with a single bulk delete request"""
+        payload = '<?xml version="1.0" encoding="UTF-8"?>'
+        payload += '<Delete>'
+        payload += ''.join(map(
+            lambda x: '<Object><Key>{}</Key></Object>'.format(xml.sax.saxutils.escape(x)),
+            keys
+        ))
+        payload += '</Delete>'
+        payload = payload.encode('utf-8')
+        md5 = compute_md5(BytesIO(payload))
+
+        query_params = {'delete': ''}
+        headers = {
+            'Content-Length': str(len(payload)),
+            'Content-MD5': md5[1],
+            'Content-Type': 'text/xml',
+        }
+
+        # We depend on a customized version of boto that can make query parameters part of
+        # the signature.
+        url = self.bucket.generate_url(
+            settings.TEMP_URL_SECS,
+            'POST',
+            query_parameters=query_params,
+            headers=headers,
+        )
+        resp = yield from self.make_request(
+            'POST',
+            url,
+            params=query_params,
+            data=payload,
+            headers=headers,
+            expects=(200, 204, ),
+            throws=exceptions.DeleteError,
+        )
+        yield from resp.read_and_close()
 
     @asyncio.coroutine
     def revisions(self, path, **kwargs):
@@ -362,24 +637,48 @@ class S3Provider(provider.BaseProvider):
         )
         return S3FileMetadataHeaders(path.path, resp.headers)
 
+    def list_folder(self, path, marker=None, page_size=None, recursive=False):
+        """Lazily list the children of the folder ``path``, page by page.
+
+        :rtype: :class:`waterbutler.providers.s3.listing.S3FolderListing`
+        """
+        return S3FolderListing(self, path, marker=marker, page_size=page_size, recursive=recursive)
+
     @asyncio.coroutine
-    def _metadata_folder(self, path):
-        resp = yield from self.make_request(
-            'GET',
-            self.bucket.generate_url(settings.TEMP_URL_SECS, 'GET'),
-            params={'prefix': path.path, 'delimiter': '/'},
-            expects=(200, ),
-            throws=exceptions.MetadataError,
-        )
+    def metadata_page(self, path, cursor=None, size=None, **kwargs):
+        """Pages through S3's own listing, the cursor is the marker of the last child returned.
+        Children come in S3's order, prefixes are not moved to the front.
+        """
+        listing = self.list_folder(path, marker=cursor, page_size=size)
 
-        contents = yield from resp.read_and_close()
+        children = []
+        while size is None or len(children) < size:
+            child = yield from listing.next()
+            if child is None:
+                break
+            children.append(child)
+
+        if cursor is None:
+            yield from self._check_folder_exists(path, listing)
+
+        return children, (None if listing.exhausted else listing.marker)
 
-        parsed = xmltodict.parse(contents, strip_whitespace=False)['ListBucketResult']
+    @asyncio.coroutine
+    def _metadata_folder(self, path):
+        listing = self.list_folder(path)
+        children = yield from listing.all()
 
-        contents = parsed.get('Contents', [])
-        prefixes = parsed.get('CommonPrefixes', [])
+        yield from self._check_folder_exists(path, listing)
+
+        # Common prefixes first, as they always have been
+        return (
+            [item for item in children if isinstance(item, S3FolderMetadata)] +
+            [item for item in children if not isinstance(item, S3FolderMetadata)]
+        )
 
-        if not contents and not prefixes and not path.is_root:
+    @asyncio.coroutine
+    def _check_folder_exists(self, path, listing):
+        if not listing.seen and not path.is_root:
             # If contents and prefixes are empty then this "folder"
             # must exist as a key with a / at the end of the name
             # if the path is root there is no need to test if it exists
@@ -389,25 +688,3 @@ class S3Provider(provider.BaseProvider):
                 expects=(200, ),
                 throws=exceptions.MetadataError,
             )
-
-        if isinstance(contents, dict):
-            contents = [contents]
-
-        if isinstance(prefixes, dict):
-            prefixes = [prefixes]
-
-        items = [
-            S3FolderMetadata(item)
-            for item in prefixes
-        ]
-
-        for content in contents:
-            if content['Key'] == path.path:
-                continue
-
-            if content['Key'].endswith('/'):
-                items.append(S3FolderKeyMetadata(content))
-            else:
-                items.append(S3FileMetadata(content))
-
-        return items
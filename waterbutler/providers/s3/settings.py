@@ -7,3 +7,25 @@ config = settings.get('S3_PROVIDER_CONFIG', {})
 
 
 TEMP_URL_SECS = config.get('TEMP_URL_SECS', 100)
+
+# Uploads larger than MULTIPART_THRESHOLD are sent as a multipart upload. Parts are at least
+# MULTIPART_MIN_PART_SIZE, larger if needed to stay within S3's 10,000 part limit, and
+# MULTIPART_CONCURRENCY of them are buffered and sent at once. Failed parts are retried as set by the
+# core RETRIES
+MULTIPART_THRESHOLD = config.get('MULTIPART_THRESHOLD', 64 * 1024 * 1024)  # 64MB
+MULTIPART_MIN_PART_SIZE = config.get('MULTIPART_MIN_PART_SIZE', 8 * 1024 * 1024)  # 8MB
+MULTIPART_MAX_PARTS = config.get('MULTIPART_MAX_PARTS', 10000)
+MULTIPART_CONCURRENCY = config.get('MULTIPART_CONCURRENCY', 4)
+
+# Keys larger than MULTIPART_COPY_THRESHOLD are copied within S3 as MULTIPART_COPY_PART_SIZE ranges,
+# MULTIPART_COPY_CONCURRENCY at a time. A single copy request is limited to 5GB
+MULTIPART_COPY_THRESHOLD = config.get('MULTIPART_COPY_THRESHOLD', 512 * 1024 * 1024)  # 512MB
+MULTIPART_COPY_PART_SIZE = config.get('MULTIPART_COPY_PART_SIZE', 128 * 1024 * 1024)  # 128MB
+MULTIPART_COPY_CONCURRENCY = config.get('MULTIPART_COPY_CONCURRENCY', 8)
+
+# Folders are deleted a listing page (1,000 keys) at a time, with up to DELETE_CONCURRENCY bulk deletes
+# in flight while the following pages are listed
+DELETE_CONCURRENCY = config.get('DELETE_CONCURRENCY', 4)
+
+# Folder listings are parsed as they arrive, read from the response this many bytes at a time
+LISTING_CHUNK_SIZE = config.get('LISTING_CHUNK_SIZE', 64 * 1024)  # 64KB
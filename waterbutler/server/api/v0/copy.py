@@ -3,6 +3,7 @@ import time
 import tornado.gen
 
 from waterbutler import tasks
+from waterbutler.core import cache
 from waterbutler.server.api.v0 import core
 
 
@@ -14,35 +15,38 @@ class CopyHandler(core.BaseCrossProviderHandler):
 
     @tornado.gen.coroutine
     def post(self):
-        if not self.source_provider.can_intra_copy(self.destination_provider, self.json['source']['path']):
-            result = yield from tasks.copy.adelay({
-                'nid': self.json['source']['nid'],
-                'path': self.json['source']['path'],
-                'provider': self.source_provider.serialized()
-            }, {
-                'nid': self.json['destination']['nid'],
-                'path': self.json['destination']['path'],
-                'provider': self.destination_provider.serialized()
-            },
-                self.callback_url,
-                self.auth,
-                rename=self.json.get('rename'),
-                conflict=self.json.get('conflict', 'replace'),
-                start_time=time.time()
-            )
-
-            metadata, created = yield from tasks.wait_on_celery(result)
-        else:
-            metadata, created = (
-                yield from tasks.backgrounded(
-                    self.source_provider.copy,
-                    self.destination_provider,
-                    self.json['source']['path'],
-                    self.json['destination']['path'],
+        try:
+            if not self.source_provider.can_intra_copy(self.destination_provider, self.json['source']['path']):
+                result = yield from tasks.copy.adelay({
+                    'nid': self.json['source']['nid'],
+                    'path': self.json['source']['path'],
+                    'provider': self.source_provider.serialized()
+                }, {
+                    'nid': self.json['destination']['nid'],
+                    'path': self.json['destination']['path'],
+                    'provider': self.destination_provider.serialized()
+                },
+                    self.callback_url,
+                    self.auth,
                     rename=self.json.get('rename'),
                     conflict=self.json.get('conflict', 'replace'),
+                    start_time=time.time()
+                )
+
+                metadata, created = yield from tasks.wait_on_celery(result)
+            else:
+                metadata, created = (
+                    yield from tasks.backgrounded(
+                        self.source_provider.copy,
+                        self.destination_provider,
+                        self.json['source']['path'],
+                        self.json['destination']['path'],
+                        rename=self.json.get('rename'),
+                        conflict=self.json.get('conflict', 'replace'),
+                    )
                 )
-            )
+        finally:
+            yield from cache.get_metadata_cache().invalidate(self.destination_provider)
 
         metadata = metadata.serialized()
 
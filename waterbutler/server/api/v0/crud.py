@@ -1,16 +1,17 @@
 import os
 import http
 import asyncio
-import socket
 
 import tornado.web
 import tornado.gen
-import tornado.httputil
 import tornado.platform.asyncio
 
-from waterbutler.core import mime_types
+from waterbutler.core import cache
 from waterbutler.server import utils
+from waterbutler.core import mime_types
+from waterbutler.server import settings
 from waterbutler.server.api.v0 import core
+from waterbutler.core.streams import BufferedPipe
 from waterbutler.core.streams import RequestStreamReader
 
 
@@ -39,16 +40,14 @@ class CRUDHandler(core.BaseProviderHandler):
     @asyncio.coroutine
     def prepare_stream(self):
         if self.request.method in self.STREAM_METHODS:
-            self.rsock, self.wsock = socket.socketpair()
+            self.pipe = BufferedPipe(high_water=settings.UPLOAD_HIGH_WATER, low_water=settings.UPLOAD_LOW_WATER)
 
-            self.reader, _ = yield from asyncio.open_unix_connection(sock=self.rsock)
-            _, self.writer = yield from asyncio.open_unix_connection(sock=self.wsock)
-
-            self.stream = RequestStreamReader(self.request, self.reader)
+            self.stream = RequestStreamReader(self.request, self.pipe)
 
             self.uploader = asyncio.async(
                 self.provider.upload(self.stream, **self.arguments)
             )
+            self.uploader.add_done_callback(lambda _: self.pipe.close())
         else:
             self.stream = None
 
@@ -56,8 +55,8 @@ class CRUDHandler(core.BaseProviderHandler):
     def data_received(self, chunk):
         """Note: Only called during uploads."""
         if self.stream:
-            self.writer.write(chunk)
-            yield from self.writer.drain()
+            self.pipe.write(chunk)
+            yield from self.pipe.drain()
 
     @tornado.gen.coroutine
     def get(self):
@@ -68,7 +67,7 @@ class CRUDHandler(core.BaseProviderHandler):
             raise tornado.web.HTTPError(status_code=400)
 
         if 'Range' in self.request.headers:
-            request_range = tornado.httputil._parse_request_range(self.request.headers['Range'])
+            request_range = utils.parse_request_range(self.request.headers['Range'])
         else:
             request_range = None
 
@@ -105,7 +104,10 @@ class CRUDHandler(core.BaseProviderHandler):
     @tornado.gen.coroutine
     def post(self):
         """Create a folder"""
-        metadata = (yield from self.provider.create_folder(**self.arguments)).serialized()
+        try:
+            metadata = (yield from self.provider.create_folder(**self.arguments)).serialized()
+        finally:
+            yield from cache.get_metadata_cache().invalidate(self.provider)
 
         self.set_status(201)
         self.write(metadata)
@@ -115,18 +117,18 @@ class CRUDHandler(core.BaseProviderHandler):
     @tornado.gen.coroutine
     def put(self):
         """Upload a file."""
-        self.writer.write_eof()
+        self.pipe.write_eof()
 
-        metadata, created = yield from self.uploader
+        try:
+            metadata, created = yield from self.uploader
+        finally:
+            yield from cache.get_metadata_cache().invalidate(self.provider)
         metadata = metadata.serialized()
 
         if created:
             self.set_status(201)
         self.write(metadata)
 
-        self.writer.close()
-        self.wsock.close()
-
         self._send_hook(
             'create' if created else 'update',
             metadata,
@@ -136,7 +138,10 @@ class CRUDHandler(core.BaseProviderHandler):
     def delete(self):
         """Delete a file."""
 
-        yield from self.provider.delete(**self.arguments)
+        try:
+            yield from self.provider.delete(**self.arguments)
+        finally:
+            yield from cache.get_metadata_cache().invalidate(self.provider)
         self.set_status(http.client.NO_CONTENT)
 
         self._send_hook(
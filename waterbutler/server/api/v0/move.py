@@ -3,6 +3,7 @@ import time
 import tornado.gen
 
 from waterbutler import tasks
+from waterbutler.core import cache
 from waterbutler.server.api.v0 import core
 
 
@@ -14,36 +15,40 @@ class MoveHandler(core.BaseCrossProviderHandler):
 
     @tornado.gen.coroutine
     def post(self):
-        if not self.source_provider.can_intra_move(self.destination_provider, self.json['source']['path']):
-            resp = yield from tasks.move.adelay({
-                'nid': self.json['source']['nid'],
-                'path': self.json['source']['path'],
-                'provider': self.source_provider.serialized()
-            }, {
-                'nid': self.json['destination']['nid'],
-                'path': self.json['destination']['path'],
-                'provider': self.destination_provider.serialized()
-            },
-                self.callback_url,
-                self.auth,
-                rename=self.json.get('rename'),
-                conflict=self.json.get('conflict', 'replace'),
-                start_time=time.time()
-            )
-
-            metadata, created = yield from tasks.wait_on_celery(resp)
-
-        else:
-            metadata, created = (
-                yield from tasks.backgrounded(
-                    self.source_provider.move,
-                    self.destination_provider,
-                    self.json['source']['path'],
-                    self.json['destination']['path'],
+        try:
+            if not self.source_provider.can_intra_move(self.destination_provider, self.json['source']['path']):
+                resp = yield from tasks.move.adelay({
+                    'nid': self.json['source']['nid'],
+                    'path': self.json['source']['path'],
+                    'provider': self.source_provider.serialized()
+                }, {
+                    'nid': self.json['destination']['nid'],
+                    'path': self.json['destination']['path'],
+                    'provider': self.destination_provider.serialized()
+                },
+                    self.callback_url,
+                    self.auth,
                     rename=self.json.get('rename'),
                     conflict=self.json.get('conflict', 'replace'),
+                    start_time=time.time()
+                )
+
+                metadata, created = yield from tasks.wait_on_celery(resp)
+
+            else:
+                metadata, created = (
+                    yield from tasks.backgrounded(
+                        self.source_provider.move,
+                        self.destination_provider,
+                        self.json['source']['path'],
+                        self.json['destination']['path'],
+                        rename=self.json.get('rename'),
+                        conflict=self.json.get('conflict', 'replace'),
+                    )
                 )
-            )
+        finally:
+            yield from cache.get_metadata_cache().invalidate(self.destination_provider)
+            yield from cache.get_metadata_cache().invalidate(self.source_provider)
 
         metadata = metadata.serialized()
 
@@ -1,15 +1,16 @@
 import http
 import time
-import socket
 import asyncio
 import logging
 
 import tornado.gen
 
 from waterbutler.core import utils
+from waterbutler.core import cache
 from waterbutler.server import settings
 from waterbutler.server.api.v1 import core
 from waterbutler.server.auth import AuthHandler
+from waterbutler.core.streams import BufferedPipe
 from waterbutler.core.streams import RequestStreamReader
 from waterbutler.server.api.v1.provider.create import CreateMixin
 from waterbutler.server.api.v1.provider.metadata import MetadataMixin
@@ -50,7 +51,14 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
 
         self.auth = yield from auth_handler.get(self.resource, provider, self.request)
         self.provider = utils.make_provider(provider, self.auth['auth'], self.auth['credentials'], self.auth['settings'])
-        self.path = yield from self.provider.validate_v1_path(self.path)
+
+        # Only requests that read may be answered from the cache, writes must see the provider's
+        # current state
+        self.metadata_cache = cache.get_metadata_cache()
+        if method in ('get', 'head'):
+            self.path = yield from self.metadata_cache.validate_v1_path(self.provider, self.path)
+        else:
+            self.path = yield from self.provider.validate_v1_path(self.path)
 
         self.target_path = None
 
@@ -61,6 +69,9 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
 
         # The one special case
         if method == 'put' and self.target_path.is_file:
+            if (yield from self.upload_without_body()):
+                yield from self.metadata_cache.invalidate(self.provider)
+                return
             yield from self.prepare_stream()
         else:
             self.stream = None
@@ -87,40 +98,53 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
     @tornado.gen.coroutine
     def put(self, **_):
         """Defined in CreateMixin"""
-        if self.target_path.is_file:
-            return (yield from self.upload_file())
-        return(yield from self.create_folder())
+        try:
+            if self.target_path.is_file:
+                yield from self.upload_file()
+            else:
+                yield from self.create_folder()
+        finally:
+            yield from self.metadata_cache.invalidate(self.provider)
 
     @tornado.gen.coroutine
     def post(self, **_):
-        return (yield from self.move_or_copy())
+        try:
+            return (yield from self.move_or_copy())
+        finally:
+            # Backgrounded moves and copies may still be running, they are covered by the TTL
+            if getattr(self, 'dest_path', None) is not None:
+                yield from self.metadata_cache.invalidate(self.dest_provider)
+                if self.json['action'] != 'copy':
+                    yield from self.metadata_cache.invalidate(self.provider)
 
     @tornado.gen.coroutine
     def delete(self, **_):
-        yield from self.provider.delete(self.path)
+        try:
+            yield from self.provider.delete(self.path)
+        finally:
+            yield from self.metadata_cache.invalidate(self.provider)
         self.set_status(http.client.NO_CONTENT)
 
     @tornado.gen.coroutine
     def data_received(self, chunk):
         """Note: Only called during uploads."""
         if self.stream:
-            self.writer.write(chunk)
-            yield from self.writer.drain()
+            self.pipe.write(chunk)
+            yield from self.pipe.drain()
         else:
             self.body += chunk
 
     @asyncio.coroutine
     def prepare_stream(self):
-        """Sets up an asyncio pipe from client to server
+        """Sets up an in-memory pipe from client to server
         Only called on PUT when path is to a file
         """
-        self.rsock, self.wsock = socket.socketpair()
-
-        self.reader, _ = yield from asyncio.open_unix_connection(sock=self.rsock)
-        _, self.writer = yield from asyncio.open_unix_connection(sock=self.wsock)
+        self.pipe = BufferedPipe(high_water=settings.UPLOAD_HIGH_WATER, low_water=settings.UPLOAD_LOW_WATER)
 
-        self.stream = RequestStreamReader(self.request, self.reader)
+        self.stream = RequestStreamReader(self.request, self.pipe)
         self.uploader = asyncio.async(self.provider.upload(self.stream, self.target_path))
+        # Should the upload fail early, stop buffering the rest of the body
+        self.uploader.add_done_callback(lambda _: self.pipe.close())
 
     def on_finish(self):
         status, method = self.get_status(), self.request.method.upper()
@@ -1,6 +1,7 @@
 import asyncio
 
 from waterbutler.core import exceptions
+from waterbutler.server import utils
 
 
 class CreateMixin:
@@ -65,13 +66,40 @@ class CreateMixin:
         self.set_status(201)
         self.write({'data': metadata.json_api_serialized(self.resource)})
 
+    @asyncio.coroutine
+    def upload_without_body(self):
+        """Completes an upload before its body is read when the client sent ``Expect: 100-continue``
+        along with the hashes of the body, and the provider already holds that content. Tornado
+        only sends the 100 Continue once prepare has returned without finishing the request, so
+        the client never transmits the body.
+
+        :rtype: bool
+        :returns: Whether the request has been finished
+        """
+        if self.request.headers.get('Expect', '').lower() != '100-continue':
+            return False
+
+        hashes = utils.parse_content_digests(self.request.headers)
+        if not hashes:
+            return False
+
+        result = yield from self.provider.upload_from_digest(self.target_path, hashes)
+        if result is None:
+            return False
+
+        metadata, created = result
+        if created:
+            self.set_status(201)
+
+        self.write({'data': metadata.json_api_serialized(self.resource)})
+        self.finish()
+        return True
+
     @asyncio.coroutine
     def upload_file(self):
-        self.writer.write_eof()
+        self.pipe.write_eof()
 
         metadata, created = yield from self.uploader
-        self.writer.close()
-        self.wsock.close()
         if created:
             self.set_status(201)
 
@@ -2,10 +2,14 @@ import os
 import json
 import asyncio
 
-import tornado.httputil
+import furl
+import tornado.gen
+import tornado.iostream
 
 from waterbutler.core import mime_types
+from waterbutler.core import exceptions
 from waterbutler.server import utils
+from waterbutler.server import settings
 
 
 # TODO split this into metadata.py and data.py
@@ -18,7 +22,7 @@ class MetadataMixin:
         # TODO Change all references of revision to version @chrisseto
         # revisions will still be accepted until necessary changes are made to OSF
         version = self.get_query_argument('version', default=None) or self.get_query_argument('revision', default=None)
-        data = yield from self.provider.metadata(self.path, revision=version)
+        data = yield from self.metadata_cache.metadata(self.provider, self.path, revision=version)
 
         # Not setting etag for the moment
         # self.set_header('Etag', data.etag)  # This may not be appropriate
@@ -34,8 +38,110 @@ class MetadataMixin:
         if 'zip' in self.request.query_arguments:
             return (yield from self.download_folder_as_zip())
 
-        data = yield from self.provider.metadata(self.path)
-        return self.write({'data': [x.json_api_serialized(self.resource) for x in data]})
+        if 'tree' in self.request.query_arguments:
+            return (yield from self.get_folder_tree())
+
+        if 'page[size]' in self.request.query_arguments or 'page[cursor]' in self.request.query_arguments:
+            return (yield from self.get_folder_page())
+
+        data = yield from self.metadata_cache.metadata(self.provider, self.path)
+        return self.write_json({'data': [x.json_api_serialized(self.resource) for x in data]})
+
+    @asyncio.coroutine
+    def get_folder_page(self):
+        size = self.get_query_argument('page[size]', default=None)
+        cursor = self.get_query_argument('page[cursor]', default=None)
+
+        try:
+            size = settings.FOLDER_PAGE_SIZE if size is None else int(size)
+        except ValueError:
+            size = 0
+        if not 0 < size <= settings.FOLDER_PAGE_SIZE_MAX:
+            raise exceptions.InvalidParameters(
+                'page[size] must be between 1 and {}'.format(settings.FOLDER_PAGE_SIZE_MAX)
+            )
+
+        token = None
+        if cursor:
+            token = utils.decode_page_cursor(cursor)
+            if token is None:
+                raise exceptions.InvalidParameters('Invalid page cursor')
+
+        data, next_token = yield from self.provider.metadata_page(self.path, cursor=token, size=size)
+
+        next_url = None
+        if next_token is not None:
+            next_url = furl.furl(self.request.full_url())
+            next_url.args['page[size]'] = size
+            next_url.args['page[cursor]'] = utils.encode_page_cursor(next_token)
+            next_url = next_url.url
+
+        return self.write_json({
+            'data': [x.json_api_serialized(self.resource) for x in data],
+            'links': {'next': next_url},
+        })
+
+    @asyncio.coroutine
+    def get_folder_tree(self):
+        depth = self.get_query_argument('depth', default=None)
+        kind = self.get_query_argument('kind', default=None)
+
+        if depth is not None:
+            try:
+                depth = int(depth)
+            except ValueError:
+                depth = 0
+            if depth < 1:
+                raise exceptions.InvalidParameters('depth must be a positive integer')
+
+        if kind not in (None, 'file', 'folder'):
+            raise exceptions.InvalidParameters('Kind must be file, folder or unspecified, not {}'.format(kind))
+
+        self.set_header('Content-Type', 'application/x-ndjson')
+        yield self.write_tree(self.provider.walk(self.path, max_depth=depth), kind=kind)
+
+    @tornado.gen.coroutine
+    def write_tree(self, walker, kind=None):
+        """Writes each entry of ``walker`` as a line of JSON as soon as it is listed. Output is flushed
+        whenever the walk has nothing more ready or CHUNK_SIZE bytes have built up.
+
+        Should the walk fail once output has been flushed the status can no longer change, the error
+        is written as a last line, ``{"code": ..., "message": ...}``, so that a partial tree can be told
+        apart from a complete one.
+        """
+        unflushed = 0
+        try:
+            while True:
+                item = yield from walker.next()
+                if item is None:
+                    break
+                if kind is not None and item.kind != kind:
+                    continue
+
+                line = utils.json_encode(item.json_api_serialized(self.resource)) + '\n'
+                self.write(line)
+                unflushed += len(line)
+
+                if unflushed >= settings.CHUNK_SIZE or not walker.buffered:
+                    unflushed = 0
+                    yield self.flush()
+        except tornado.iostream.StreamClosedError:
+            # Client has disconnected early.
+            return
+        except Exception as exc:
+            if not self._headers_written:
+                # Nothing sent yet, the usual error response replaces what was buffered
+                raise
+
+            if isinstance(exc, exceptions.WaterButlerError):
+                error = {'code': exc.code, 'message': exc.message}
+            else:
+                error = {'code': 500, 'message': 'Internal Server Error'}
+            self.write(utils.json_encode(error) + '\n')
+            # Still raised to be logged, tornado then finishes the response as is
+            raise
+        finally:
+            walker.close()
 
     @asyncio.coroutine
     def get_file(self):
@@ -54,7 +160,7 @@ class MetadataMixin:
         if 'Range' not in self.request.headers:
             request_range = None
         else:
-            request_range = tornado.httputil._parse_request_range(self.request.headers['Range'])
+            request_range = utils.parse_request_range(self.request.headers['Range'])
 
         version = self.get_query_argument('version', default=None) or self.get_query_argument('revision', default=None)
         stream = yield from self.provider.download(
@@ -98,7 +204,9 @@ class MetadataMixin:
         version = self.get_query_argument('version', default=None) or self.get_query_argument('revision', default=None)
 
         return self.write({
-            'data': (yield from self.provider.metadata(self.path, revision=version)).json_api_serialized(self.resource)
+            'data': (yield from self.metadata_cache.metadata(
+                self.provider, self.path, revision=version
+            )).json_api_serialized(self.resource)
         })
 
     @asyncio.coroutine
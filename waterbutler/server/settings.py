@@ -22,6 +22,16 @@ CORS_ALLOW_ORIGIN = config.get('CORS_ALLOW_ORIGIN', '*')
 
 CHUNK_SIZE = config.get('CHUNK_SIZE', 65536)  # 64KB
 MAX_BODY_SIZE = config.get('MAX_BODY_SIZE', int(4.9 * (1024 ** 3)))  # 4.9 GB
+# Request bodies are buffered up to UPLOAD_HIGH_WATER bytes before reading from the client pauses,
+# reading resumes once the provider has consumed all but UPLOAD_LOW_WATER bytes
+UPLOAD_HIGH_WATER = config.get('UPLOAD_HIGH_WATER', 2 * 1024 * 1024)  # 2MB
+UPLOAD_LOW_WATER = config.get('UPLOAD_LOW_WATER', 512 * 1024)  # 512KB
+SENDFILE = config.get('SENDFILE', True)  # zero-copy file downloads over non-TLS connections
+
+# Folder listings requested with page[cursor] but no page[size] get FOLDER_PAGE_SIZE children,
+# page[size] may not exceed FOLDER_PAGE_SIZE_MAX
+FOLDER_PAGE_SIZE = config.get('FOLDER_PAGE_SIZE', 100)
+FOLDER_PAGE_SIZE_MAX = config.get('FOLDER_PAGE_SIZE_MAX', 1000)
 
 AUTH_HANDLERS = config.get('AUTH_HANDLERS', [
     'osf',
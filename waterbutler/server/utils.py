@@ -1,5 +1,17 @@
+import json
+import base64
+import binascii
+
+import tornado
 import tornado.gen
+import tornado.ioloop
+import tornado.httputil
+import tornado.iostream
+import tornado.http1connection
+import tornado.platform.asyncio
+
 from waterbutler.server import settings
+from waterbutler.core.streams import FileStreamReader
 
 
 CORS_ACCEPT_HEADERS = [
@@ -8,6 +20,8 @@ CORS_ACCEPT_HEADERS = [
     'Authorization',
     'Cache-Control',
     'X-Requested-With',
+    'Digest',
+    'X-Content-SHA256',
 ]
 
 CORS_EXPOSE_HEADERS = [
@@ -18,16 +32,99 @@ CORS_EXPOSE_HEADERS = [
     'Content-Encoding',
 ]
 
+# Digest header (RFC 3230) algorithm names and the digest length in bytes
+DIGEST_ALGORITHMS = {
+    'md5': ('md5', 16),
+    'sha': ('sha1', 20),
+    'sha-256': ('sha256', 32),
+}
+
+# Compact output, and no check for circular references as API responses are plain trees
+JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), check_circular=False)
+
+# Sendfile relies on HTTP1Connection internals, _chunking_output and _expected_content_remaining,
+# and is only used with the tornado versions it has been checked against
+SENDFILE_TORNADO_VERSIONS = ((4, 2), )
+
 HTTP_REASONS = {
     422: 'Unprocessable Entity',
     461: 'Unavailable For Legal Reasons',
 }
 
 
+def json_encode(value):
+    """Like :func:`tornado.escape.json_encode`, through :data:`JSON_ENCODER`"""
+    # Safe for embedding in a <script> tag, as tornado does
+    return JSON_ENCODER.encode(value).replace('</', '<\\/')
+
+
 def make_disposition(filename):
     return 'attachment;filename="{}"'.format(filename.replace('"', '\\"'))
 
 
+def parse_request_range(range_header):
+    """Parses a Range header into the ``(start, end)`` tuple :meth:`BaseProvider.download` expects.
+    Tornado's parser returns slice semantics, an exclusive end and a negative start for suffixes,
+    which is converted back to the header's own inclusive form. Returns None for malformed headers.
+    """
+    request_range = tornado.httputil._parse_request_range(range_header)
+    if request_range is None:
+        return None
+
+    start, end = request_range
+    if start is not None and start < 0:
+        return None, -start
+    if start is None:
+        return None, 0
+    return start, None if end is None else end - 1
+
+
+def parse_content_digests(headers):
+    """Collects the hashes a client declared for its request body, from ``X-Content-SHA256`` as a
+    hex digest and from ``Digest`` as base64 ``algorithm=value`` pairs. Unknown algorithms and
+    malformed values are ignored.
+
+    :rtype: dict mapping ``md5``, ``sha1`` and ``sha256`` to lowercase hex digests
+    """
+    hashes = {}
+
+    for item in headers.get('Digest', '').split(','):
+        algorithm, _, value = item.strip().partition('=')
+        name, length = DIGEST_ALGORITHMS.get(algorithm.lower(), (None, None))
+        if name is None:
+            continue
+        try:
+            digest = base64.b64decode(value.strip(), validate=True)
+        except (binascii.Error, ValueError):
+            continue
+        if len(digest) == length:
+            hashes[name] = binascii.hexlify(digest).decode()
+
+    sha256 = headers.get('X-Content-SHA256', '').strip().lower()
+    if len(sha256) == 64:
+        try:
+            bytes.fromhex(sha256)
+        except ValueError:
+            pass
+        else:
+            hashes['sha256'] = sha256
+
+    return hashes
+
+
+def encode_page_cursor(token):
+    """Wraps a provider's continuation token into the opaque ``page[cursor]`` handed to clients"""
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_page_cursor(cursor):
+    """Reverses :func:`encode_page_cursor`, returns None for anything it did not produce"""
+    try:
+        return base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+    except (binascii.Error, ValueError):
+        return None
+
+
 class CORsMixin:
 
     def set_default_headers(self):
@@ -62,9 +159,17 @@ class UtilMixin:
     def set_status(self, code, reason=None):
         return super().set_status(code, reason or HTTP_REASONS.get(code))
 
+    def write_json(self, value):
+        """Writes ``value`` as JSON with :func:`json_encode`, for large responses such as listings"""
+        self.set_header('Content-Type', 'application/json; charset=UTF-8')
+        self.write(json_encode(value))
+
     @tornado.gen.coroutine
     def write_stream(self, stream):
         try:
+            if self._can_sendfile(stream) and (yield self._sendfile(stream)):
+                return
+
             while True:
                 chunk = yield from stream.read(settings.CHUNK_SIZE)
                 if not chunk:
@@ -76,3 +181,66 @@ class UtilMixin:
             # Client has disconnected early.
             # No need for any exception to be raised
             return
+
+    def _can_sendfile(self, stream):
+        """Whether ``stream`` may be written with :func:`os.sendfile`. Only possible when the stream
+        is backed by a real file, a Content-Length has been set and the response body goes to the
+        client's socket untouched, i.e. no TLS or output transforms. Chunked encoding is ruled out
+        by :meth:`_sendfile` once the headers are written.
+
+        .. note::
+            Depends on tornado's private HTTP1Connection state and on tornado running on the asyncio
+            event loop, see :data:`SENDFILE_TORNADO_VERSIONS`
+        """
+        if not settings.SENDFILE or not isinstance(stream, FileStreamReader) or not stream.can_sendfile:
+            return False
+
+        if tornado.version_info[:2] not in SENDFILE_TORNADO_VERSIONS:
+            return False
+
+        # The socket is waited on through the asyncio loop, tornado's own must be that loop
+        if not isinstance(tornado.ioloop.IOLoop.current(), tornado.platform.asyncio.BaseAsyncIOLoop):
+            return False
+
+        connection = self.request.connection
+        if not isinstance(connection, tornado.http1connection.HTTP1Connection):
+            return False
+
+        return not (
+            'Content-Length' not in self._headers or
+            self._transforms or
+            isinstance(connection.stream, tornado.iostream.SSLIOStream) or
+            self.request.method == 'HEAD'
+        )
+
+    @tornado.gen.coroutine
+    def _sendfile(self, stream):
+        """Writes the headers, then ``stream`` with :func:`os.sendfile`.
+
+        :rtype: bool
+        :returns: False, having written only the headers, when the body must be chunked
+        """
+        # Flush the headers, the returned future resolves once tornado's write buffer is empty, so
+        # tornado no longer waits on the socket being writable while the file is sent
+        yield self.flush()
+        connection = self.request.connection
+
+        # Decided by tornado as the headers are written, e.g. for HTTP/1.1 without Content-Length
+        if connection._chunking_output:
+            return False
+
+        try:
+            sent = yield from stream.sendfile(connection.stream.socket)
+        except Exception as exc:
+            # Written behind tornado's back, it has not noticed the socket failing. Close the
+            # connection, the client must not take a response short of its length as complete
+            connection.stream.close()
+            if isinstance(exc, (BrokenPipeError, ConnectionResetError)):
+                # The client has disconnected, as tornado reports it for its own writes
+                raise tornado.iostream.StreamClosedError()
+            raise
+
+        # Bytes written behind tornado's back still count against the declared Content-Length
+        if connection._expected_content_remaining is not None:
+            connection._expected_content_remaining -= sent
+        return True
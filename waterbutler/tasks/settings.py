@@ -25,8 +25,13 @@ ADHOC_BACKEND_PATH = config.get('ADHOC_BACKEND_PATH', '/tmp')
 
 CELERY_CREATE_MISSING_QUEUES = config.get('CELERY_CREATE_MISSING_QUEUES', False)
 CELERY_DEFAULT_QUEUE = config.get('CELERY_DEFAULT_QUEUE', 'waterbutler')
+# osfstorage parity tasks each run par2 on a whole file. They have a queue of their own so that a
+# dedicated worker, e.g. `invoke celery --queues waterbutler.parity --concurrency 2`, bounds how
+# many run at once. Workers started without --queues consume both
+PARITY_QUEUE = config.get('PARITY_QUEUE', 'waterbutler.parity')
 CELERY_QUEUES = (
     Queue('waterbutler', Exchange('waterbutler'), routing_key='waterbutler'),
+    Queue(PARITY_QUEUE, Exchange(PARITY_QUEUE), routing_key=PARITY_QUEUE),
 )
 # CELERY_ALWAYS_EAGER = config.get('CELERY_ALWAYS_EAGER', True)
 CELERY_ALWAYS_EAGER = config.get('CELERY_ALWAYS_EAGER', False)